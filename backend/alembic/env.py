@@ -6,7 +6,8 @@ from db import Base
 from models import *
 
 config = context.config
-config.set_main_option("sqlalchemy.url", settings.database_url_sync)
+# ConfigParser interpolation: URL-encoded passwords contain "%"
+config.set_main_option("sqlalchemy.url", settings.database_url_sync.replace("%", "%%"))
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
@@ -28,6 +29,14 @@ def run_migrations_offline() -> None:
 
 
 def run_migrations_online() -> None:
+    # migration/run_all.py passes the connection that holds its migration lock
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
@@ -0,0 +1,28 @@
+"""User search indexes
+
+Revision ID: a1c4e9f2b7d3
+Revises: d3fd67eb7257
+Create Date: 2026-10-19 09:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c4e9f2b7d3'
+down_revision: Union[str, None] = 'd3fd67eb7257'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # phone, email and serial_number already carry B-tree indexes that serve
+    # left-anchored LIKE lookups; full_name needs FULLTEXT for word matching.
+    op.create_index('ix_users_full_name_ft', 'users', ['full_name'], unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_full_name_ft', table_name='users')
@@ -0,0 +1,31 @@
+"""App meta table
+
+Revision ID: a7c2e9d4f1b3
+Revises: f2c8d4a1b639
+Create Date: 2026-10-19 14:02:37.418250
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c2e9d4f1b3'
+down_revision: Union[str, None] = 'f2c8d4a1b639'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('app_meta',
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('value', sa.String(length=255), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('app_meta')
@@ -0,0 +1,42 @@
+"""Audit log
+
+Revision ID: b4d8f2a6c913
+Revises: a7c2e9d4f1b3
+Create Date: 2026-10-19 15:10:52.206418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d8f2a6c913'
+down_revision: Union[str, None] = 'a7c2e9d4f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('audit_log',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('actor_id', sa.BigInteger(), nullable=True),
+    sa.Column('entity', sa.String(length=30), nullable=False),
+    sa.Column('entity_id', sa.BigInteger(), nullable=True),
+    sa.Column('action', sa.String(length=10), nullable=False),
+    sa.Column('changes', sa.JSON(), nullable=True),
+    sa.Column('request', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_audit_log_entity', 'audit_log', ['entity', 'entity_id', 'id'], unique=False)
+    op.create_index('ix_audit_log_actor', 'audit_log', ['actor_id', 'id'], unique=False)
+    op.create_index(op.f('ix_audit_log_created_at'), 'audit_log', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_audit_log_created_at'), table_name='audit_log')
+    op.drop_index('ix_audit_log_actor', table_name='audit_log')
+    op.drop_index('ix_audit_log_entity', table_name='audit_log')
+    op.drop_table('audit_log')
@@ -0,0 +1,101 @@
+"""User phone key
+
+Revision ID: b7e2d5c8a914
+Revises: a1c4e9f2b7d3
+Create Date: 2026-10-19 10:02:17.884502
+
+"""
+from typing import Sequence, Union
+
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+from core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d5c8a914'
+down_revision: Union[str, None] = 'a1c4e9f2b7d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+_non_digits_re = re.compile(r"\D+")
+
+
+def normalize_phone(phone):
+    """``core.phone.normalize_phone`` (strict) as of this revision.
+
+    Copied so later changes to the application's rules don't change what
+    this migration writes; the country code and national number length are
+    still the deployment's settings.
+    """
+    raw = (phone or "").strip()
+    digits = _non_digits_re.sub("", raw)
+    country_code = settings.PHONE_DEFAULT_COUNTRY_CODE
+
+    if raw.startswith("+"):
+        key = digits
+    elif digits.startswith("00"):
+        key = digits[2:]
+    elif digits.startswith(country_code) and len(digits) > settings.PHONE_NATIONAL_LENGTH:
+        key = digits
+    else:
+        key = country_code + digits.lstrip("0")
+
+    if not (6 <= len(key) <= 15):
+        raise ValueError("Invalid phone number")
+    return "+" + key
+
+
+def _phone_keys(conn):
+    """{user id: phone key}, scanned in id order; raises if any phone has no usable key"""
+    keys = {}
+    owners = {}
+    problems = []
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text("SELECT id, phone FROM users WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+        for user_id, phone in rows:
+            try:
+                key = normalize_phone(phone)
+            except ValueError:
+                problems.append(f"user {user_id}: cannot normalize phone {phone!r}")
+                continue
+            if key in owners:
+                problems.append(f"user {user_id}: phone {phone!r} is the same number ({key}) as user {owners[key]}")
+                continue
+            owners[key] = user_id
+            keys[user_id] = key
+        last_id = rows[-1][0]
+    if problems:
+        # Login looks users up by phone_key, so a user without one could no
+        # longer sign in. Fix (or merge) these accounts and run the migration again.
+        raise RuntimeError("Cannot backfill users.phone_key:\n  " + "\n  ".join(problems))
+    return keys
+
+
+def upgrade() -> None:
+    # Checked before any DDL, which MySQL cannot roll back
+    conn = op.get_bind()
+    keys = _phone_keys(conn)
+
+    op.add_column('users', sa.Column('phone_key', sa.String(length=20), nullable=True))
+    updates = [{"id": user_id, "phone_key": key} for user_id, key in keys.items()]
+    for start in range(0, len(updates), BATCH_SIZE):
+        conn.execute(sa.text("UPDATE users SET phone_key = :phone_key WHERE id = :id"), updates[start:start + BATCH_SIZE])
+
+    op.create_index(op.f('ix_users_phone_key'), 'users', ['phone_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_phone_key'), table_name='users')
+    op.drop_column('users', 'phone_key')
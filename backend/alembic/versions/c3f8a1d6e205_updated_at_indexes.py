@@ -0,0 +1,32 @@
+"""updated_at indexes for the change feed
+
+Revision ID: c3f8a1d6e205
+Revises: b7e2d5c8a914
+Create Date: 2026-10-19 11:26:53.140277
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a1d6e205'
+down_revision: Union[str, None] = 'b7e2d5c8a914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # InnoDB secondary indexes carry the primary key, so these also serve the
+    # (updated_at, id) ordering used by /v1/changes.
+    op.create_index(op.f('ix_orders_updated_at'), 'orders', ['updated_at'], unique=False)
+    op.create_index(op.f('ix_payments_updated_at'), 'payments', ['updated_at'], unique=False)
+    op.create_index(op.f('ix_devices_updated_at'), 'devices', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_devices_updated_at'), table_name='devices')
+    op.drop_index(op.f('ix_payments_updated_at'), table_name='payments')
+    op.drop_index(op.f('ix_orders_updated_at'), table_name='orders')
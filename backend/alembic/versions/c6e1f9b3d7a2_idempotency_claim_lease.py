@@ -0,0 +1,26 @@
+"""Idempotency key claim lease
+
+Revision ID: c6e1f9b3d7a2
+Revises: b4d8f2a6c913
+Create Date: 2026-10-19 16:02:41.517390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e1f9b3d7a2'
+down_revision: Union[str, None] = 'b4d8f2a6c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('idempotency_keys', sa.Column('claimed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'claimed_at')
@@ -0,0 +1,49 @@
+"""Change log
+
+Revision ID: d1a7c3e8f542
+Revises: c6e1f9b3d7a2
+Create Date: 2026-10-19 16:48:09.662184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1a7c3e8f542'
+down_revision: Union[str, None] = 'c6e1f9b3d7a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('change_log',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('entity', sa.String(length=30), nullable=False),
+    sa.Column('entity_id', sa.BigInteger(), nullable=False),
+    sa.Column('action', sa.String(length=10), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_change_log_entity', 'change_log', ['entity', 'entity_id'], unique=False)
+    op.create_index(op.f('ix_change_log_created_at'), 'change_log', ['created_at'], unique=False)
+
+    # One entry per existing row, oldest change first, so a full sync
+    # (no cursor) still returns everything
+    op.execute("""
+        INSERT INTO change_log (entity, entity_id, action, created_at)
+        SELECT entity, entity_id, 'upsert', changed_at FROM (
+            SELECT 'orders' AS entity, id AS entity_id, COALESCE(updated_at, created_at, CURRENT_TIMESTAMP) AS changed_at FROM orders
+            UNION ALL SELECT 'payments', id, COALESCE(updated_at, created_at, CURRENT_TIMESTAMP) FROM payments
+            UNION ALL SELECT 'devices', id, COALESCE(updated_at, created_at, CURRENT_TIMESTAMP) FROM devices
+        ) AS current_rows
+        ORDER BY changed_at, entity_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_change_log_created_at'), table_name='change_log')
+    op.drop_index('ix_change_log_entity', table_name='change_log')
+    op.drop_table('change_log')
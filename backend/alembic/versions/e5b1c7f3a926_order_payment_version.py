@@ -0,0 +1,28 @@
+"""Order and payment version columns
+
+Revision ID: e5b1c7f3a926
+Revises: d9a2b6e4f718
+Create Date: 2026-10-19 13:55:32.018464
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b1c7f3a926'
+down_revision: Union[str, None] = 'd9a2b6e4f718'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('orders', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('payments', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('payments', 'version')
+    op.drop_column('orders', 'version')
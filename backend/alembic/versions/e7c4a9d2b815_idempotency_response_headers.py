@@ -0,0 +1,26 @@
+"""Idempotency key response headers
+
+Revision ID: e7c4a9d2b815
+Revises: d1a7c3e8f542
+Create Date: 2026-10-19 18:21:07.304512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c4a9d2b815'
+down_revision: Union[str, None] = 'd1a7c3e8f542'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('idempotency_keys', sa.Column('response_headers', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'response_headers')
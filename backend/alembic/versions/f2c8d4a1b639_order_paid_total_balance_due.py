@@ -0,0 +1,42 @@
+"""Order paid_total and balance_due
+
+Revision ID: f2c8d4a1b639
+Revises: e5b1c7f3a926
+Create Date: 2026-10-19 14:40:11.502317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8d4a1b639'
+down_revision: Union[str, None] = 'e5b1c7f3a926'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('orders', sa.Column('paid_total', sa.Numeric(precision=10, scale=2), server_default='0.00', nullable=False))
+    op.add_column('orders', sa.Column('balance_due', sa.Numeric(precision=10, scale=2), server_default='0.00', nullable=False))
+    op.create_index(op.f('ix_orders_balance_due'), 'orders', ['balance_due'], unique=False)
+    # Backfill from existing payments
+    op.execute("""
+        UPDATE orders o
+        LEFT JOIN (
+            SELECT order_id, SUM(amount) AS paid
+            FROM payments
+            WHERE status IN ('Paid', 'Partial')
+            GROUP BY order_id
+        ) p ON p.order_id = o.id
+        SET o.paid_total = COALESCE(p.paid, 0),
+            o.balance_due = GREATEST(COALESCE(o.total_cost, 0) - COALESCE(p.paid, 0), 0)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_orders_balance_due'), table_name='orders')
+    op.drop_column('orders', 'balance_due')
+    op.drop_column('orders', 'paid_total')
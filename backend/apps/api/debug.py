@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from core import sqlstats, profiling
+from utils.dependencies import require_admin
+
+router = APIRouter(prefix="/debug", tags=["debug"], dependencies=[Depends(require_admin)])
+
+profiles_router = APIRouter(prefix="/debug/profiles", tags=["debug"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/queries")
+async def query_stats(
+    limit: int = Query(20, ge=1, le=200),
+    order_by: str = Query("total", pattern="^(total|count|max)$"),
+    reset: bool = Query(False)
+):
+    result = {
+        "statements": sqlstats.top_statements(limit, order_by),
+        "routes": sqlstats.route_summary(),
+    }
+    if reset:
+        sqlstats.reset()
+    return result
+
+
+@profiles_router.get("")
+async def list_profiles(limit: int = Query(50, ge=1, le=200)):
+    return await run_in_threadpool(profiling.list_profiles, limit)
+
+
+@profiles_router.get("/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    path = await run_in_threadpool(profiling.profile_path, profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(await run_in_threadpool(path.read_text))
@@ -1,19 +1,40 @@
-from fastapi import APIRouter
-from .auth import router as auth_router
-from .users import router as users_router
-from .devices import router as devices_router
-from .orders import router as orders_router
-from .payments import router as payments_router
-from .assigns import router as assigns_router
+"""
+v1 API routers.
 
-api_router = APIRouter(prefix="/v1")
+Routers are imported only when registered, so a process started with a subset
+(``API_ROUTERS``) doesn't import the rest. Each one is added to the app
+directly under ``/v1``: collecting them in an intermediate ``APIRouter`` first
+made FastAPI build every route one extra time at startup.
+"""
+from importlib import import_module
+from typing import Iterable, Optional
+from fastapi import FastAPI
 
-api_router.include_router(auth_router)
-api_router.include_router(users_router)
-api_router.include_router(devices_router)
-api_router.include_router(orders_router)
-api_router.include_router(payments_router)
-api_router.include_router(assigns_router)
+PREFIX = "/v1"
 
-__all__ = ["api_router"]
+ROUTERS = (
+    "auth",
+    "users",
+    "devices",
+    "orders",
+    "payments",
+    "assigns",
+    "search",
+    "changes",
+    "problems",
+    "estimates",
+    "audit",
+)
 
+
+def include_routers(app: FastAPI, names: Optional[Iterable[str]] = None) -> None:
+    """Register the named v1 routers (all of them by default) on ``app``"""
+    names = list(names or ROUTERS)
+    unknown = set(names) - set(ROUTERS)
+    if unknown:
+        raise ValueError(f"Unknown API routers: {', '.join(sorted(unknown))}")
+    for name in names:
+        app.include_router(import_module(f"{__name__}.{name}").router, prefix=PREFIX)
+
+
+__all__ = ["ROUTERS", "include_routers"]
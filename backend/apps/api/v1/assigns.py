@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
@@ -6,6 +6,10 @@ from db import get_db
 from models.order import OrderAssign, Order
 from models.user import User
 from schemas.order import OrderAssignCreate, OrderAssignResponse
+from schemas.batch import BatchGetRequest, BatchGetResponse
+from core.batch import fetch_by_ids
+from core.counts import set_total_count
+from core.sqlstats import query_budget
 
 router = APIRouter(prefix="/assigns", tags=["assigns"])
 
@@ -38,10 +42,12 @@ async def create_assign(data: OrderAssignCreate, db: AsyncSession = Depends(get_
 
 @router.get("", response_model=List[OrderAssignResponse])
 async def list_assigns(
+    response: Response,
     order_id: Optional[int] = Query(None),
     user_id: Optional[int] = Query(None),
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    include_total: bool = Query(False),
     db: AsyncSession = Depends(get_db)
 ):
     query = select(OrderAssign)
@@ -49,11 +55,20 @@ async def list_assigns(
         query = query.where(OrderAssign.order_id == order_id)
     if user_id:
         query = query.where(OrderAssign.user_id == user_id)
+    if include_total:
+        await set_total_count(response, db, query)
     query = query.limit(limit).offset(offset)
     result = await db.execute(query)
     return result.scalars().all()
 
 
+@router.post("/batch-get", response_model=BatchGetResponse[OrderAssignResponse])
+@query_budget(1)
+async def batch_get_assigns(data: BatchGetRequest, db: AsyncSession = Depends(get_db)):
+    items, missing = await fetch_by_ids(db, OrderAssign, data.ids)
+    return {"items": items, "missing": missing}
+
+
 @router.get("/{assign_id}", response_model=OrderAssignResponse)
 async def get_assign(assign_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(OrderAssign).where(OrderAssign.id == assign_id))
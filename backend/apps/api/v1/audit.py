@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Literal, Optional
+from db import get_db
+from models.audit import AuditLog
+from schemas.audit import AuditLogResponse
+from utils.dependencies import require_admin
+from core.sqlstats import query_budget
+
+router = APIRouter(prefix="/audit", tags=["audit"])
+
+
+@router.get("", response_model=List[AuditLogResponse])
+@query_budget(3)  # + the admin check
+async def list_audit_log(
+    entity: Optional[Literal["users", "devices", "orders", "payments"]] = Query(None),
+    entity_id: Optional[int] = Query(None),
+    actor_id: Optional[int] = Query(None),
+    action: Optional[Literal["create", "update", "delete"]] = Query(None),
+    before_id: Optional[int] = Query(None, description="Return entries older than this id (the last id of the previous page)"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    _admin=Depends(require_admin),
+):
+    query = select(AuditLog)
+    if entity:
+        query = query.where(AuditLog.entity == entity)
+    if entity_id is not None:
+        query = query.where(AuditLog.entity_id == entity_id)
+    if actor_id is not None:
+        query = query.where(AuditLog.actor_id == actor_id)
+    if action:
+        query = query.where(AuditLog.action == action)
+    if before_id is not None:
+        query = query.where(AuditLog.id < before_id)
+    result = await db.execute(query.order_by(AuditLog.id.desc()).limit(limit))
+    return result.scalars().all()
@@ -1,39 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta, timezone
-from db import get_db
+from db import get_db, AsyncSessionLocal
 from models.user import User, RefreshToken
 from schemas.auth import RegisterRequest, LoginRequest, LoginResponse, RefreshRequest, RefreshResponse, TokenResponse
-from utils.security import hash_password, verify_password, create_access_token, create_refresh_token, decode_token
+from utils.security import hash_password, verify_password, needs_rehash, create_access_token, create_refresh_token, decode_token
 from core.config import settings
 from schemas.user import UserResponse
+from core.search import index_user
+from core.phone import normalize_phone
+from core.utils import duplicate_key_column
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+async def _upgrade_password_hash(user_id: int, password: str, old_hash: str):
+    """Re-hash with the current cost after a successful login.
+
+    Runs after the response is sent. The UPDATE only applies if the hash is
+    still the one that was verified, so a password change in the meantime wins.
+    """
+    try:
+        new_hash = await run_in_threadpool(hash_password, password)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(User)
+                .where(User.id == user_id, User.password_hash == old_hash)
+                .values(password_hash=new_hash)
+            )
+            await db.commit()
+    except Exception:
+        logger.exception("Failed to upgrade password hash for user %s", user_id)
+
+
 @router.post("/register", response_model=UserResponse, status_code=201)
 async def register(data: RegisterRequest, db: AsyncSession = Depends(get_db)):
-    existing = await db.execute(select(User).where(User.phone == data.phone))
-    if existing.scalar_one_or_none():
-        raise HTTPException(status_code=400, detail="Phone already registered")
+    try:
+        phone_key = normalize_phone(data.phone)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     user = User(
         full_name=data.full_name,
         phone=data.phone,
+        phone_key=phone_key,
         email=data.email,
-        password_hash=hash_password(data.password)
+        password_hash=await run_in_threadpool(hash_password, data.password)
     )
     db.add(user)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if duplicate_key_column(e, "users", ("phone", "phone_key", "email")) == "email":
+            raise HTTPException(status_code=400, detail="Email already registered")
+        raise HTTPException(status_code=400, detail="Phone already registered")
     await db.refresh(user)
+    index_user(user)
     return user
 
 
 @router.post("/login", response_model=LoginResponse)
-async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
+async def login(data: LoginRequest, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(select(User).where(User.phone == data.phone))
+        try:
+            phone_key = normalize_phone(data.phone)
+        except ValueError:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        
+        result = await db.execute(select(User).where(User.phone_key == phone_key))
         user = result.scalar_one_or_none()
         
         if not user:
@@ -49,12 +90,16 @@ async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
                 detail="User password hash is corrupted. Please contact administrator to reset password."
             )
         
-        if not verify_password(data.password, user.password_hash):
+        # bcrypt is deliberately slow; keep it off the event loop
+        if not await run_in_threadpool(verify_password, data.password, user.password_hash):
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         if not user.is_active:
             raise HTTPException(status_code=403, detail="User is inactive")
         
+        if needs_rehash(user.password_hash):
+            background_tasks.add_task(_upgrade_password_hash, user.id, data.password, user.password_hash)
+        
         access_token = create_access_token({"sub": str(user.id), "phone": user.phone})
         refresh_token = create_refresh_token({"sub": str(user.id)})
         
@@ -0,0 +1,127 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from typing import Dict, List, Optional, Union
+from datetime import datetime, timedelta, timezone
+import base64
+import time
+import orjson
+from db import get_db
+from models.change_log import ChangeLog
+from models.order import Order
+from models.payment import Payment
+from models.device import Device
+from schemas.order import OrderResponse
+from schemas.payment import PaymentResponse
+from schemas.device import DeviceResponse
+from schemas.changes import ChangesResponse, DeletedIds
+from core.changelog import DELETE
+from core.config import settings
+from core.events import broker, change_key
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+ENTITIES = {
+    "orders": (Order, OrderResponse),
+    "payments": (Payment, PaymentResponse),
+    "devices": (Device, DeviceResponse),
+}
+
+
+def encode_cursor(position: int) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps({"log": position})).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Union[int, datetime]:
+    """Change-log position, or the oldest timestamp of a cursor from before the change log"""
+    if not cursor:
+        return 0
+    try:
+        data = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if "log" in data:
+            return int(data["log"])
+        # Legacy {entity: [updated_at, last_id]} cursor
+        timestamps = [datetime.fromisoformat(ts) for name, (ts, _) in data.items() if name in ENTITIES and ts]
+        return min(timestamps) if timestamps else 0
+    except (ValueError, TypeError, AttributeError, orjson.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def _legacy_position(db: AsyncSession, since: datetime) -> int:
+    """Log position just before ``since``; resuming there may repeat a few rows"""
+    return await db.scalar(select(func.coalesce(func.max(ChangeLog.id), 0)).where(ChangeLog.created_at < since))
+
+
+async def _fetch_changes(db: AsyncSession, entities: List[str], position: int, limit: int):
+    """Rows changed and ids deleted after ``position`` in the change log, oldest change first.
+
+    Returns serialized rows because the read transaction is ended right after,
+    which both frees the pooled connection while long-polling and lets the next
+    poll see rows committed in the meantime.
+    """
+    entries = (await db.execute(
+        select(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.action, ChangeLog.created_at)
+        .where(ChangeLog.id > position)
+        .order_by(ChangeLog.id)
+        .limit(limit + 1)
+    )).all()
+    has_more = len(entries) > limit
+    settled = datetime.now(timezone.utc) - timedelta(seconds=settings.CHANGES_SETTLE_SECONDS)
+
+    latest: Dict[tuple, str] = {}  # (entity, id) -> last action, in log order
+    for entry in entries[:limit]:
+        if entry.id != position + 1 and entry.created_at.replace(tzinfo=timezone.utc) > settled:
+            # The missing ids may belong to transactions that haven't committed yet
+            has_more = False
+            break
+        position = entry.id
+        if entry.entity in entities:
+            latest.pop((entry.entity, entry.entity_id), None)
+            latest[(entry.entity, entry.entity_id)] = entry.action
+
+    changes, deleted = {}, {}
+    for name in entities:
+        model, schema = ENTITIES[name]
+        order = [entity_id for (entity, entity_id), action in latest.items() if entity == name and action != DELETE]
+        deleted[name] = [entity_id for (entity, entity_id), action in latest.items() if entity == name and action == DELETE]
+        rows = (await db.execute(select(model).where(model.id.in_(order)))).scalars().all() if order else []
+        # Rows deleted since their entry are skipped; their delete entry follows
+        by_id = {row.id: row for row in rows}
+        changes[name] = [schema.model_validate(by_id[entity_id]) for entity_id in order if entity_id in by_id]
+    await db.rollback()
+    return changes, deleted, position, has_more
+
+
+@router.get("", response_model=ChangesResponse)
+async def list_changes(
+    since: Optional[str] = Query(None, description="Cursor from a previous response; omit for a full sync"),
+    entities: str = Query("orders,payments,devices"),
+    limit: int = Query(100, ge=1, le=500),
+    wait: int = Query(0, ge=0, le=settings.CHANGES_MAX_WAIT_SECONDS, description="Seconds to long-poll when nothing changed"),
+    db: AsyncSession = Depends(get_db)
+):
+    requested = [e.strip() for e in entities.split(",") if e.strip()]
+    unknown = set(requested) - ENTITIES.keys()
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"Unknown entities: {', '.join(sorted(unknown)) or '(none)'}")
+    position = decode_cursor(since)
+    if isinstance(position, datetime):
+        position = await _legacy_position(db, position)
+
+    # Subscribe before the first read so a write landing in between still wakes us
+    subscription = await broker.subscribe([change_key(e) for e in requested]) if wait else None
+    try:
+        changes, deleted, position, has_more = await _fetch_changes(db, requested, position, limit)
+        deadline = time.monotonic() + wait
+        while subscription and not any(changes.values()) and not any(deleted.values()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Periodic re-check covers writes made by workers we get no events from
+            await subscription.get(timeout=min(remaining, settings.CHANGES_POLL_SECONDS))
+            changes, deleted, position, has_more = await _fetch_changes(db, requested, position, limit)
+    finally:
+        if subscription:
+            broker.unsubscribe(subscription)
+
+    return ChangesResponse(cursor=encode_cursor(position), has_more=has_more, deleted=DeletedIds(**deleted), **changes)
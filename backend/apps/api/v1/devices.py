@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
 from db import get_db
 from models.device import DeviceType, Brand, Model, Device
 from schemas.device import DeviceTypeCreate, DeviceTypeResponse, BrandCreate, BrandResponse, ModelCreate, ModelResponse, DeviceCreate, DeviceResponse, DeviceUpdate
+from schemas.batch import BatchGetRequest, BatchGetResponse
+from core.search import index_device, unindex
+from core.events import publish_change
+from core.sqlstats import query_budget
+from core.cache import cache, cached
+from core.singleflight import coalesce
+from core.batch import fetch_by_ids
+from core.counts import set_total_count
 
 router = APIRouter(prefix="/devices", tags=["devices"])
 
@@ -19,10 +27,13 @@ async def create_device_type(data: DeviceTypeCreate, db: AsyncSession = Depends(
     db.add(device_type)
     await db.commit()
     await db.refresh(device_type)
+    await cache.invalidate("device_types")
     return device_type
 
 
 @router.get("/types", response_model=List[DeviceTypeResponse])
+@coalesce()
+@cached(tags=["device_types"], model=List[DeviceTypeResponse])
 async def list_device_types(db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(DeviceType))
     return result.scalars().all()
@@ -38,10 +49,13 @@ async def create_brand(data: BrandCreate, db: AsyncSession = Depends(get_db)):
     db.add(brand)
     await db.commit()
     await db.refresh(brand)
+    await cache.invalidate("brands")
     return brand
 
 
 @router.get("/brands", response_model=List[BrandResponse])
+@coalesce()
+@cached(tags=["brands"], model=List[BrandResponse])
 async def list_brands(db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Brand))
     return result.scalars().all()
@@ -90,20 +104,35 @@ async def create_device(data: DeviceCreate, db: AsyncSession = Depends(get_db)):
     db.add(device)
     await db.commit()
     await db.refresh(device)
+    index_device(device)
+    await publish_change("devices", {"type": "device.created", "device_id": device.id})
     return device
 
 
 @router.get("", response_model=List[DeviceResponse])
+@query_budget(1)
 async def list_devices(
+    response: Response,
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    include_total: bool = Query(False),
     db: AsyncSession = Depends(get_db)
 ):
+    if include_total:
+        await set_total_count(response, db, select(Device))
     result = await db.execute(select(Device).limit(limit).offset(offset))
     return result.scalars().all()
 
 
+@router.post("/batch-get", response_model=BatchGetResponse[DeviceResponse])
+@query_budget(1)
+async def batch_get_devices(data: BatchGetRequest, db: AsyncSession = Depends(get_db)):
+    items, missing = await fetch_by_ids(db, Device, data.ids)
+    return {"items": items, "missing": missing}
+
+
 @router.get("/{device_id}", response_model=DeviceResponse)
+@query_budget(1)
 async def get_device(device_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Device).where(Device.id == device_id))
     device = result.scalar_one_or_none()
@@ -125,6 +154,8 @@ async def update_device(device_id: int, data: DeviceUpdate, db: AsyncSession = D
     
     await db.commit()
     await db.refresh(device)
+    index_device(device)
+    await publish_change("devices", {"type": "device.updated", "device_id": device.id})
     return device
 
 
@@ -136,4 +167,6 @@ async def delete_device(device_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Device not found")
     await db.delete(device)
     await db.commit()
+    unindex("device", device_id)
+    await publish_change("devices", {"type": "device.deleted", "device_id": device_id})
 
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_db
+from schemas.problem import EstimateItem, EstimateResponse
+from core.pricing import price_table, ZERO
+
+router = APIRouter(prefix="/estimates", tags=["estimates"])
+
+MAX_PROBLEMS = 50
+
+
+@router.get("", response_model=EstimateResponse)
+async def get_estimate(
+    device_type_id: int = Query(...),
+    problem_ids: str = Query(..., description="Comma separated problem IDs"),
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        ids = [int(p) for p in problem_ids.split(",") if p.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="problem_ids must be comma separated integers")
+    if not ids:
+        raise HTTPException(status_code=400, detail="At least one problem ID is required")
+    if len(ids) > MAX_PROBLEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PROBLEMS} problems per estimate")
+    
+    await price_table.ensure_loaded(db)
+    entries, missing = price_table.estimate(device_type_id, ids)
+    
+    return EstimateResponse(
+        device_type_id=device_type_id,
+        items=[EstimateItem(**entry._asdict()) for entry in entries],
+        missing=missing,
+        base_total=sum((e.base_cost for e in entries), ZERO),
+        min_total=sum((e.min_cost for e in entries), ZERO),
+        max_total=sum((e.max_cost for e in entries), ZERO),
+    )
@@ -1,11 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, Header, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, case
 from typing import List, Optional
 from decimal import Decimal
+import asyncio
+import orjson
 from db import get_db
 from models.order import Order, OrderAssign
 from schemas.order import OrderCreate, OrderResponse, OrderUpdate, OrderAssignCreate, OrderAssignResponse
+from schemas.batch import BatchGetRequest, BatchGetResponse
+from core.config import settings
+from core.events import broker, publish_order_event, TIMEOUT
+from core.versioning import etag, parse_if_match, versioned_update
+from core.balances import balance_due_expr
+from core.sqlstats import query_budget
+from core.singleflight import coalesce
+from core.counts import set_total_count
+from core.batch import fetch_by_ids
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
@@ -26,6 +38,7 @@ async def create_order(data: OrderCreate, db: AsyncSession = Depends(get_db)):
         cost=data.cost,
         discount=data.discount,
         total_cost=total_cost,
+        balance_due=total_cost,
         note=data.note,
         status=data.status,
         estimated_completion_date=data.estimated_completion_date
@@ -33,16 +46,23 @@ async def create_order(data: OrderCreate, db: AsyncSession = Depends(get_db)):
     db.add(order)
     await db.commit()
     await db.refresh(order)
+    await publish_order_event("order.created", order)
     return order
 
 
 @router.get("", response_model=List[OrderResponse])
+@query_budget(1)
+# The default first page is what every client polls at once
+@coalesce(model=List[OrderResponse], when=lambda args: args["offset"] == 0 and not args["include_total"])
 async def list_orders(
+    response: Response,
     status: Optional[str] = Query(None),
     customer_id: Optional[int] = Query(None),
     device_id: Optional[int] = Query(None),
+    has_balance: Optional[bool] = Query(None),
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    include_total: bool = Query(False),
     db: AsyncSession = Depends(get_db)
 ):
     query = select(Order)
@@ -52,36 +72,144 @@ async def list_orders(
         query = query.where(Order.customer_id == customer_id)
     if device_id:
         query = query.where(Order.device_id == device_id)
+    if has_balance is not None:
+        query = query.where(Order.balance_due > 0 if has_balance else Order.balance_due == 0)
+    if include_total:
+        await set_total_count(response, db, query)
     query = query.limit(limit).offset(offset)
     result = await db.execute(query)
     return result.scalars().all()
 
 
+def _stream_keys(customer_id: Optional[int], order_id: Optional[int]) -> List[str]:
+    keys = []
+    if order_id:
+        keys.append(f"order:{order_id}")
+    if customer_id:
+        keys.append(f"customer:{customer_id}")
+    return keys
+
+
+@router.get("/stream")
+async def stream_orders(
+    customer_id: Optional[int] = Query(None),
+    order_id: Optional[int] = Query(None)
+):
+    """Server-sent events for order and payment changes"""
+    keys = _stream_keys(customer_id, order_id)
+    if not keys:
+        raise HTTPException(status_code=400, detail="customer_id or order_id is required")
+    subscription = await broker.subscribe(keys)
+
+    async def events():
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                event = await subscription.get(timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+                if event is TIMEOUT:
+                    yield b": keep-alive\n\n"
+                    continue
+                if event is None:
+                    yield b"event: dropped\ndata: {}\n\n"
+                    break
+                yield b"event: " + event["type"].encode() + b"\ndata: " + orjson.dumps(event) + b"\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def orders_websocket(
+    websocket: WebSocket,
+    customer_id: Optional[int] = None,
+    order_id: Optional[int] = None
+):
+    """WebSocket variant of ``/orders/stream``"""
+    keys = _stream_keys(customer_id, order_id)
+    if not keys:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    subscription = await broker.subscribe(keys)
+
+    async def forward():
+        while True:
+            event = await subscription.get(timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+            if event is TIMEOUT:
+                continue
+            if event is None:
+                # Too slow to keep up; the client should reconnect and re-sync
+                await websocket.close(code=1013)
+                return
+            await websocket.send_bytes(orjson.dumps(event))
+
+    async def watch_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.create_task(forward()), asyncio.create_task(watch_disconnect())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            # Either side ending (including a send on a closed socket) ends the stream
+            task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        broker.unsubscribe(subscription)
+
+
+@router.post("/batch-get", response_model=BatchGetResponse[OrderResponse])
+@query_budget(1)
+async def batch_get_orders(data: BatchGetRequest, db: AsyncSession = Depends(get_db)):
+    items, missing = await fetch_by_ids(db, Order, data.ids)
+    return {"items": items, "missing": missing}
+
+
 @router.get("/{order_id}", response_model=OrderResponse)
-async def get_order(order_id: int, db: AsyncSession = Depends(get_db)):
+@query_budget(1)
+async def get_order(order_id: int, response: Response, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Order).where(Order.id == order_id))
     order = result.scalar_one_or_none()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+    response.headers["ETag"] = etag(order.version)
     return order
 
 
 @router.patch("/{order_id}", response_model=OrderResponse)
-async def update_order(order_id: int, data: OrderUpdate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Order).where(Order.id == order_id))
-    order = result.scalar_one_or_none()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    update_data = data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(order, field, value)
+@query_budget(3)  # update, change log, reload
+async def update_order(
+    order_id: int,
+    data: OrderUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    expected_version = parse_if_match(if_match)
+    values = data.model_dump(exclude_unset=True)
     
-    if "cost" in update_data or "discount" in update_data:
-        order.total_cost = max(Decimal("0.00"), order.cost - order.discount)
+    if "cost" in values or "discount" in values:
+        # Computed in SQL so the unchanged side comes from the row being updated
+        cost = values.get("cost", Order.cost)
+        discount = values.get("discount", Order.discount)
+        values["total_cost"] = case((cost - discount < 0, Decimal("0.00")), else_=cost - discount)
+        values["balance_due"] = balance_due_expr(values["total_cost"], Order.paid_total)
     
+    await versioned_update(db, Order, order_id, values, expected_version, "Order not found")
     await db.commit()
-    await db.refresh(order)
+    
+    result = await db.execute(
+        select(Order).where(Order.id == order_id).execution_options(populate_existing=True)
+    )
+    order = result.scalar_one()
+    response.headers["ETag"] = etag(order.version)
+    await publish_order_event("order.updated", order)
     return order
 
 
@@ -93,6 +221,7 @@ async def delete_order(order_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Order not found")
     await db.delete(order)
     await db.commit()
+    await publish_order_event("order.deleted", order)
     return None
 
 
@@ -115,6 +244,7 @@ async def assign_order(data: OrderAssignCreate, db: AsyncSession = Depends(get_d
 
 
 @router.get("/assign/{order_id}", response_model=List[OrderAssignResponse])
+@query_budget(1)
 async def get_order_assignments(order_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(OrderAssign).where(OrderAssign.order_id == order_id))
     return result.scalars().all()
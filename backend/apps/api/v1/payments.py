@@ -1,20 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 from typing import List, Optional
 from datetime import datetime
 from db import get_db
 from models.payment import Payment
 from models.order import Order
 from schemas.payment import PaymentCreate, PaymentResponse, PaymentUpdate
+from schemas.batch import BatchGetRequest, BatchGetResponse
+from core.events import publish_order_event
+from core.versioning import etag, parse_if_match, versioned_update
+from core.balances import lock_order, refresh_order_balance
+from core.sqlstats import query_budget
+from core.counts import set_total_count
+from core.batch import fetch_by_ids
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
 
+async def _publish_payment_event(event_type: str, payment: Payment, db: AsyncSession):
+    order = await db.get(Order, payment.order_id, populate_existing=True)
+    if order:
+        await publish_order_event(event_type, order, entity="payments", payment_id=payment.id, payment_status=payment.status)
+
+
+def _payment_order_id(payment_id: int):
+    return select(Payment.order_id).where(Payment.id == payment_id).scalar_subquery()
+
+
 @router.post("", response_model=PaymentResponse, status_code=201)
 async def create_payment(data: PaymentCreate, db: AsyncSession = Depends(get_db)):
-    order = await db.execute(select(Order).where(Order.id == data.order_id))
-    order_obj = order.scalar_one_or_none()
+    order_obj = await lock_order(db, data.order_id)
     if not order_obj:
         raise HTTPException(status_code=404, detail="Order not found")
     
@@ -31,17 +47,23 @@ async def create_payment(data: PaymentCreate, db: AsyncSession = Depends(get_db)
         payment.paid_at = datetime.utcnow()
     
     db.add(payment)
+    await db.flush()
+    await refresh_order_balance(db, data.order_id)
     await db.commit()
     await db.refresh(payment)
+    await _publish_payment_event("payment.created", payment, db)
     return payment
 
 
 @router.get("", response_model=List[PaymentResponse])
+@query_budget(1)
 async def list_payments(
+    response: Response,
     status: Optional[str] = Query(None),
     order_id: Optional[int] = Query(None),
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    include_total: bool = Query(False),
     db: AsyncSession = Depends(get_db)
 ):
     query = select(Payment)
@@ -49,45 +71,73 @@ async def list_payments(
         query = query.where(Payment.status == status)
     if order_id:
         query = query.where(Payment.order_id == order_id)
+    if include_total:
+        await set_total_count(response, db, query)
     query = query.limit(limit).offset(offset)
     result = await db.execute(query)
     return result.scalars().all()
 
 
+@router.post("/batch-get", response_model=BatchGetResponse[PaymentResponse])
+@query_budget(1)
+async def batch_get_payments(data: BatchGetRequest, db: AsyncSession = Depends(get_db)):
+    items, missing = await fetch_by_ids(db, Payment, data.ids)
+    return {"items": items, "missing": missing}
+
+
 @router.get("/{payment_id}", response_model=PaymentResponse)
-async def get_payment(payment_id: int, db: AsyncSession = Depends(get_db)):
+@query_budget(1)
+async def get_payment(payment_id: int, response: Response, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Payment).where(Payment.id == payment_id))
     payment = result.scalar_one_or_none()
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
+    response.headers["ETag"] = etag(payment.version)
     return payment
 
 
 @router.patch("/{payment_id}", response_model=PaymentResponse)
-async def update_payment(payment_id: int, data: PaymentUpdate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Payment).where(Payment.id == payment_id))
-    payment = result.scalar_one_or_none()
-    if not payment:
-        raise HTTPException(status_code=404, detail="Payment not found")
+@query_budget(6)
+async def update_payment(
+    payment_id: int,
+    data: PaymentUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    expected_version = parse_if_match(if_match)
+    values = data.model_dump(exclude_unset=True)
     
-    update_data = data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(payment, field, value)
-    
-    if "status" in update_data and payment.status == "Paid" and not payment.paid_at:
-        payment.paid_at = datetime.utcnow()
+    if values.get("status") == "Paid" and not values.get("paid_at"):
+        # Keep an existing paid_at, stamp it otherwise
+        values["paid_at"] = func.coalesce(values.get("paid_at", Payment.paid_at), datetime.utcnow())
     
+    order = await lock_order(db, _payment_order_id(payment_id))
+    if not order:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    await versioned_update(db, Payment, payment_id, values, expected_version, "Payment not found")
+    await refresh_order_balance(db, order.id)
     await db.commit()
-    await db.refresh(payment)
+    
+    result = await db.execute(
+        select(Payment).where(Payment.id == payment_id).execution_options(populate_existing=True)
+    )
+    payment = result.scalar_one()
+    response.headers["ETag"] = etag(payment.version)
+    await _publish_payment_event("payment.updated", payment, db)
     return payment
 
 
 @router.delete("/{payment_id}", status_code=204)
 async def delete_payment(payment_id: int, db: AsyncSession = Depends(get_db)):
+    order = await lock_order(db, _payment_order_id(payment_id))
     result = await db.execute(select(Payment).where(Payment.id == payment_id))
     payment = result.scalar_one_or_none()
-    if not payment:
+    if not order or not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     await db.delete(payment)
+    await db.flush()
+    await refresh_order_balance(db, order.id)
     await db.commit()
+    await _publish_payment_event("payment.deleted", payment, db)
     return None
@@ -0,0 +1,182 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional
+from db import get_db
+from models.problem import Problem, CostSetting
+from models.device import DeviceType
+from schemas.problem import (
+    ProblemCreate, ProblemUpdate, ProblemResponse,
+    CostSettingCreate, CostSettingUpdate, CostSettingResponse
+)
+from core.pricing import price_table
+from core.counts import set_total_count
+
+router = APIRouter(prefix="/problems", tags=["problems"])
+
+
+def _check_cost_range(base_cost, min_cost, max_cost):
+    if min_cost is not None and min_cost > base_cost:
+        raise HTTPException(status_code=400, detail="min_cost cannot exceed base_cost")
+    if max_cost is not None and max_cost < base_cost:
+        raise HTTPException(status_code=400, detail="max_cost cannot be below base_cost")
+
+
+@router.post("", response_model=ProblemResponse, status_code=201)
+async def create_problem(data: ProblemCreate, db: AsyncSession = Depends(get_db)):
+    device_type = await db.execute(select(DeviceType).where(DeviceType.id == data.device_type_id))
+    if not device_type.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="Device type not found")
+    
+    existing = await db.execute(
+        select(Problem).where(Problem.device_type_id == data.device_type_id, Problem.name == data.name)
+    )
+    if existing.scalar_one_or_none():
+        raise HTTPException(status_code=400, detail="Problem already exists")
+    
+    problem = Problem(device_type_id=data.device_type_id, name=data.name, description=data.description)
+    db.add(problem)
+    await db.commit()
+    await db.refresh(problem)
+    return problem
+
+
+@router.get("", response_model=List[ProblemResponse])
+async def list_problems(
+    response: Response,
+    device_type_id: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    include_total: bool = Query(False),
+    db: AsyncSession = Depends(get_db)
+):
+    query = select(Problem)
+    if device_type_id:
+        query = query.where(Problem.device_type_id == device_type_id)
+    if include_total:
+        await set_total_count(response, db, query)
+    query = query.order_by(Problem.id).limit(limit).offset(offset)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+@router.post("/cost-settings", response_model=CostSettingResponse, status_code=201)
+async def create_cost_setting(data: CostSettingCreate, db: AsyncSession = Depends(get_db)):
+    problem = await db.execute(select(Problem).where(Problem.id == data.problem_id))
+    if not problem.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="Problem not found")
+    _check_cost_range(data.base_cost, data.min_cost, data.max_cost)
+    
+    cost_setting = CostSetting(**data.model_dump())
+    db.add(cost_setting)
+    await db.commit()
+    await db.refresh(cost_setting)
+    await price_table.refresh_problem(db, cost_setting.problem_id)
+    return cost_setting
+
+
+@router.get("/cost-settings", response_model=List[CostSettingResponse])
+async def list_cost_settings(
+    problem_id: Optional[int] = Query(None),
+    is_active: Optional[bool] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    query = select(CostSetting)
+    if problem_id:
+        query = query.where(CostSetting.problem_id == problem_id)
+    if is_active is not None:
+        query = query.where(CostSetting.is_active.is_(is_active))
+    result = await db.execute(query.order_by(CostSetting.id))
+    return result.scalars().all()
+
+
+@router.get("/cost-settings/{cost_setting_id}", response_model=CostSettingResponse)
+async def get_cost_setting(cost_setting_id: int, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(CostSetting).where(CostSetting.id == cost_setting_id))
+    cost_setting = result.scalar_one_or_none()
+    if not cost_setting:
+        raise HTTPException(status_code=404, detail="Cost setting not found")
+    return cost_setting
+
+
+@router.patch("/cost-settings/{cost_setting_id}", response_model=CostSettingResponse)
+async def update_cost_setting(cost_setting_id: int, data: CostSettingUpdate, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(CostSetting).where(CostSetting.id == cost_setting_id))
+    cost_setting = result.scalar_one_or_none()
+    if not cost_setting:
+        raise HTTPException(status_code=404, detail="Cost setting not found")
+    
+    update_data = data.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(cost_setting, field, value)
+    _check_cost_range(cost_setting.base_cost, cost_setting.min_cost, cost_setting.max_cost)
+    
+    await db.commit()
+    await db.refresh(cost_setting)
+    await price_table.refresh_problem(db, cost_setting.problem_id)
+    return cost_setting
+
+
+@router.delete("/cost-settings/{cost_setting_id}", status_code=204)
+async def delete_cost_setting(cost_setting_id: int, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(CostSetting).where(CostSetting.id == cost_setting_id))
+    cost_setting = result.scalar_one_or_none()
+    if not cost_setting:
+        raise HTTPException(status_code=404, detail="Cost setting not found")
+    await db.delete(cost_setting)
+    await db.commit()
+    await price_table.refresh_problem(db, cost_setting.problem_id)
+    return None
+
+
+@router.get("/{problem_id}", response_model=ProblemResponse)
+async def get_problem(problem_id: int, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Problem).where(Problem.id == problem_id))
+    problem = result.scalar_one_or_none()
+    if not problem:
+        raise HTTPException(status_code=404, detail="Problem not found")
+    return problem
+
+
+@router.patch("/{problem_id}", response_model=ProblemResponse)
+async def update_problem(problem_id: int, data: ProblemUpdate, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Problem).where(Problem.id == problem_id))
+    problem = result.scalar_one_or_none()
+    if not problem:
+        raise HTTPException(status_code=404, detail="Problem not found")
+    
+    update_data = data.model_dump(exclude_unset=True)
+    if "device_type_id" in update_data:
+        device_type = await db.execute(select(DeviceType).where(DeviceType.id == update_data["device_type_id"]))
+        if not device_type.scalar_one_or_none():
+            raise HTTPException(status_code=404, detail="Device type not found")
+    if "device_type_id" in update_data or "name" in update_data:
+        existing = await db.execute(
+            select(Problem).where(
+                Problem.device_type_id == update_data.get("device_type_id", problem.device_type_id),
+                Problem.name == update_data.get("name", problem.name),
+                Problem.id != problem_id
+            )
+        )
+        if existing.scalar_one_or_none():
+            raise HTTPException(status_code=400, detail="Problem already exists")
+    
+    for field, value in update_data.items():
+        setattr(problem, field, value)
+    
+    await db.commit()
+    await db.refresh(problem)
+    await price_table.refresh_problem(db, problem.id)
+    return problem
+
+
+@router.delete("/{problem_id}", status_code=204)
+async def delete_problem(problem_id: int, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Problem).where(Problem.id == problem_id))
+    problem = result.scalar_one_or_none()
+    if not problem:
+        raise HTTPException(status_code=404, detail="Problem not found")
+    await db.delete(problem)
+    await db.commit()
+    price_table.discard(problem_id)
+    return None
@@ -0,0 +1,116 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Dict, Optional
+from db import get_db
+from models.user import User
+from models.device import Device
+from schemas.search import SearchHit, SearchResponse
+from schemas.user import UserResponse
+from schemas.device import DeviceResponse
+from core.config import settings
+from core.search import search_index, rank, escape_like, phone_query, normalize_text
+from core.phone import normalize_phone
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+SEARCH_TYPES = {"users": "user", "devices": "device"}
+RESPONSE_SCHEMAS = {"user": UserResponse, "device": DeviceResponse}
+
+# FULLTEXT can match word forms the substring ranker does not recognise
+MATCH_FALLBACK_SCORE = 0.5
+
+
+def _fulltext_terms(query: str) -> str:
+    """Build a BOOLEAN MODE expression that prefix-matches every word"""
+    words = [w for w in "".join(c if c.isalnum() else " " for c in query).split() if w]
+    return " ".join(f"+{w}*" for w in words)
+
+
+async def _sql_search(db: AsyncSession, q: str, kinds: set, limit: int) -> Dict[tuple, object]:
+    """One index-driven query per field; OR-ing them would defeat the indexes"""
+    found = {}
+    text_q = normalize_text(q)
+    digit_q = phone_query(q)
+    is_mysql = db.bind.dialect.name == "mysql"
+
+    if "user" in kinds:
+        queries = []
+        if len(digit_q) >= 3:
+            phone_prefix = normalize_phone(q, strict=False)
+            queries.append(select(User).where(User.phone_key.like(escape_like(phone_prefix) + "%")).limit(limit))
+        if "@" in text_q or "." in text_q:
+            queries.append(select(User).where(User.email.like(escape_like(text_q) + "%")).limit(limit))
+        terms = _fulltext_terms(text_q)
+        if terms and not digit_q:
+            if is_mysql:
+                queries.append(select(User).where(User.full_name.match(terms)).limit(limit))
+            else:
+                queries.append(select(User).where(User.full_name.ilike(escape_like(text_q) + "%")).limit(limit))
+        for query in queries:
+            for user in (await db.execute(query)).scalars():
+                found[("user", user.id)] = user
+
+    if "device" in kinds:
+        query = select(Device).where(Device.serial_number.like(escape_like(q.strip()) + "%")).limit(limit)
+        for device in (await db.execute(query)).scalars():
+            found[("device", device.id)] = device
+
+    return found
+
+
+async def _ngram_search(db: AsyncSession, q: str, kinds: set, limit: int) -> Dict[tuple, object]:
+    await search_index.ensure_loaded(db)
+    hits = search_index.search(q, kinds, limit)
+
+    found = {}
+    user_ids = [key[1] for key, _, _ in hits if key[0] == "user"]
+    device_ids = [key[1] for key, _, _ in hits if key[0] == "device"]
+    if user_ids:
+        for user in (await db.execute(select(User).where(User.id.in_(user_ids)))).scalars():
+            found[("user", user.id)] = user
+    if device_ids:
+        for device in (await db.execute(select(Device).where(Device.id.in_(device_ids)))).scalars():
+            found[("device", device.id)] = device
+    return found
+
+
+@router.get("", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=2, max_length=100),
+    types: Optional[str] = Query(None, description="Comma separated: users,devices"),
+    limit: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_db)
+):
+    if types:
+        requested = {t.strip() for t in types.split(",") if t.strip()}
+        unknown = requested - SEARCH_TYPES.keys()
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(sorted(unknown))}")
+        kinds = {SEARCH_TYPES[t] for t in requested}
+    else:
+        kinds = set(SEARCH_TYPES.values())
+
+    if settings.SEARCH_BACKEND == "ngram":
+        found = await _ngram_search(db, q, kinds, limit)
+    else:
+        found = await _sql_search(db, q, kinds, limit)
+
+    results = []
+    for (kind, obj_id), obj in found.items():
+        score, field = rank(kind, obj, q)
+        if kind == "user" and field is None:
+            score, field = MATCH_FALLBACK_SCORE, "full_name"
+        if score <= 0:
+            continue
+        results.append(SearchHit(
+            type=kind,
+            id=obj_id,
+            score=round(score, 3),
+            matched_field=field,
+            **{kind: RESPONSE_SCHEMAS[kind].model_validate(obj)}
+        ))
+
+    results.sort(key=lambda h: (-h.score, h.type, h.id))
+    return SearchResponse(query=q, results=results[:limit])
+
@@ -1,41 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from db import get_db
 from models.user import User, Role, RoleEnroll
 from schemas.user import UserCreate, UserResponse, UserUpdate, RoleCreate, RoleResponse, RoleEnrollCreate, RoleEnrollResponse
+from schemas.batch import BatchGetRequest, BatchGetResponse
 from utils.security import hash_password
+from core.search import index_user, unindex
+from core.phone import normalize_phone
+from core.utils import duplicate_key_column
+from core.sqlstats import query_budget
+from core.cache import cache, cached
+from core.singleflight import coalesce
+from core.batch import fetch_by_ids
+from core.counts import set_total_count
 from datetime import datetime
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
+async def _commit_user(db: AsyncSession):
+    """Commit a user write, letting the unique indexes catch duplicates"""
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if duplicate_key_column(e, "users", ("phone", "phone_key", "email")) == "email":
+            raise HTTPException(status_code=400, detail="Email already registered")
+        raise HTTPException(status_code=400, detail="Phone already registered")
+
+
 @router.post("", response_model=UserResponse, status_code=201)
 async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
-    existing = await db.execute(select(User).where(User.phone == user_data.phone))
-    if existing.scalar_one_or_none():
-        raise HTTPException(status_code=400, detail="Phone already registered")
+    try:
+        phone_key = normalize_phone(user_data.phone)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     user = User(
         full_name=user_data.full_name,
         phone=user_data.phone,
+        phone_key=phone_key,
         email=user_data.email,
-        password_hash=hash_password(user_data.password),
+        password_hash=await run_in_threadpool(hash_password, user_data.password),
         profile_picture=user_data.profile_picture
     )
     db.add(user)
-    await db.commit()
+    await _commit_user(db)
     await db.refresh(user)
+    index_user(user)
     return user
 
 
 @router.get("", response_model=List[UserResponse])
+@query_budget(1)
 async def list_users(
+    response: Response,
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    include_total: bool = Query(False),
     db: AsyncSession = Depends(get_db)
 ):
+    if include_total:
+        await set_total_count(response, db, select(User))
     result = await db.execute(select(User).limit(limit).offset(offset))
     return result.scalars().all()
 
@@ -50,10 +80,13 @@ async def create_role(role_data: RoleCreate, db: AsyncSession = Depends(get_db))
     db.add(role)
     await db.commit()
     await db.refresh(role)
+    await cache.invalidate("roles")
     return role
 
 
 @router.get("/roles", response_model=List[RoleResponse])
+@coalesce()
+@cached(tags=["roles"], model=List[RoleResponse])
 async def list_roles(db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Role))
     return result.scalars().all()
@@ -77,7 +110,15 @@ async def enroll_role(enroll_data: RoleEnrollCreate, db: AsyncSession = Depends(
     return enroll
 
 
+@router.post("/batch-get", response_model=BatchGetResponse[UserResponse])
+@query_budget(1)
+async def batch_get_users(data: BatchGetRequest, db: AsyncSession = Depends(get_db)):
+    items, missing = await fetch_by_ids(db, User, data.ids)
+    return {"items": items, "missing": missing}
+
+
 @router.get("/{user_id}", response_model=UserResponse)
+@query_budget(1)
 async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
@@ -94,11 +135,17 @@ async def update_user(user_id: int, user_data: UserUpdate, db: AsyncSession = De
         raise HTTPException(status_code=404, detail="User not found")
     
     update_data = user_data.model_dump(exclude_unset=True)
+    if update_data.get("phone"):
+        try:
+            update_data["phone_key"] = normalize_phone(update_data["phone"])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     for field, value in update_data.items():
         setattr(user, field, value)
     
-    await db.commit()
+    await _commit_user(db)
     await db.refresh(user)
+    index_user(user)
     return user
 
 
@@ -110,4 +157,5 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     await db.delete(user)
     await db.commit()
+    unindex("user", user_id)
 
@@ -0,0 +1 @@
+# In-process API benchmarks
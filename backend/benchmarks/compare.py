@@ -0,0 +1,58 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare results/base.json results/new.json --threshold 10
+
+Prints per-scenario p50/p95/p99 and throughput changes and exits with status 1
+when any scenario's p95 got slower, or throughput dropped, by more than
+``--threshold`` percent.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(base: dict, new: dict, threshold: float) -> int:
+    regressions = 0
+    print(f"{'scenario':28} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18} {'req/s':>18}")
+    for name, old in base["results"].items():
+        current = new["results"].get(name)
+        if current is None:
+            print(f"{name:28} missing in new results")
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            cells.append(f"{current[key]:>9.2f} ({change(old[key], current[key]):+6.1f}%)")
+        slower = change(old["p95_ms"], current["p95_ms"]) > threshold
+        fewer = change(old["throughput_rps"], current["throughput_rps"]) < -threshold
+        flag = "  REGRESSION" if slower or fewer else ""
+        regressions += bool(flag)
+        print(f"{name:28} " + " ".join(cells) + flag)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent")
+    args = parser.parse_args()
+
+    base, new = json.loads(args.base.read_text()), json.loads(args.new.read_text())
+    print(f"base {base['meta'].get('commit')}  ->  new {new['meta'].get('commit')}\n")
+    for key in ("database", "dataset", "requests", "concurrency"):
+        if base["meta"].get(key) != new["meta"].get(key):
+            print(f"warning: runs differ in {key}: {base['meta'].get(key)} vs {new['meta'].get(key)}")
+    regressions = compare(base, new, args.threshold)
+    if regressions:
+        print(f"\n{regressions} scenario(s) regressed by more than {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Runs ``main.app`` in-process against a benchmark database.
+
+``configure()`` must be called before anything imports ``db`` or ``main``: it
+points ``DATABASE_URL`` at the benchmark database. On SQLite, BIGINT
+primary keys are compiled as INTEGER so they autoincrement. ``now()`` is left
+as SQLite's ``CURRENT_TIMESTAMP``, which like the schema's MySQL ``DATETIME``
+columns has whole-second precision.
+"""
+import os
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import BigInteger, event
+from sqlalchemy.ext.compiler import compiles
+
+BENCH_DIR = Path(__file__).parent
+DEFAULT_DATABASE_URL = f"sqlite+aiosqlite:///{BENCH_DIR / 'bench.db'}"
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    return "INTEGER"
+
+
+def configure(database_url: str) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("QUERY_BUDGET_MODE", "off")
+    os.environ.setdefault("PROFILING_ENABLED", "false")
+
+
+def is_sqlite(database_url: str) -> bool:
+    return database_url.startswith("sqlite")
+
+
+def sqlite_path(database_url: str) -> Path:
+    return Path(database_url.split(":///", 1)[1])
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+async def prepare_database(reset: bool = False) -> bool:
+    """Create the schema; returns True when the database has no orders yet"""
+    import db
+    import models  # noqa: F401 - registers every table on Base.metadata
+    from sqlalchemy import func, select
+    from models.order import Order
+
+    url = str(db.engine.url)
+    if is_sqlite(url):
+        event.listen(db.engine.sync_engine, "connect", _sqlite_pragmas)
+        if reset:
+            await db.engine.dispose()
+            for suffix in ("", "-wal", "-shm"):
+                Path(str(sqlite_path(url)) + suffix).unlink(missing_ok=True)
+
+    async with db.engine.begin() as conn:
+        if reset and not is_sqlite(url):
+            await conn.run_sync(db.Base.metadata.drop_all)
+        await conn.run_sync(db.Base.metadata.create_all)
+        count = (await conn.execute(select(func.count()).select_from(Order))).scalar_one()
+    return count == 0
+
+
+@asynccontextmanager
+async def client():
+    """An httpx client for ``main.app``, inside the app's lifespan
+
+    ``ASGITransport`` sends no lifespan events, so the startup warm-up and the
+    background tasks (idempotency sweeper, audit writer) run here instead.
+    """
+    import httpx
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as http:
+            yield http
@@ -0,0 +1,361 @@
+"""
+Concurrent load generator replaying repair-store journeys.
+
+    python -m benchmarks.loadgen --users 50 --duration 60
+    python -m benchmarks.loadgen --url http://localhost:8000 --users 20 --mix reception=1,technician=2,customer=4
+
+Each virtual user plays one role in a loop, pausing between steps for a
+think time drawn from ``--think``:
+
+* reception  - registers a walk-in customer, their device and an order,
+  assigns a technician and sometimes takes a deposit;
+* technician - picks a pending order from its own page of the backlog,
+  starts and completes the repair (conditional PATCH with If-Match) and
+  checks an estimate;
+* customer   - logs in, checks their orders and payments and pays completed
+  orders.
+
+Without ``--url`` the app runs in-process against the benchmark database
+(see ``benchmarks.harness``). Latency percentiles and error rates are printed
+per ``--window`` while running and per step at the end; ``--output`` saves
+everything as JSON.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from benchmarks import harness
+from benchmarks.run_api import percentile
+
+PASSWORD = "password123"
+
+# Lost races between virtual users (e.g. a stale If-Match); reported apart from errors
+CONFLICT_STATUSES = (409, 412)
+
+# Pending orders each technician looks through; technician n takes page n
+PENDING_PAGE = 20
+
+
+@dataclass
+class Sample:
+    at: float
+    name: str
+    latency: float
+    status: int  # 0 when the request itself failed
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    @property
+    def error(self) -> bool:
+        return not self.ok and self.status not in CONFLICT_STATUSES
+
+
+@dataclass
+class Shared:
+    """State shared by all virtual users of one run"""
+    models: List[dict] = field(default_factory=list)
+    problems: Dict[int, List[int]] = field(default_factory=dict)  # device_type_id -> problem ids
+    technicians: List[int] = field(default_factory=list)
+    customers: List[Tuple[str, int]] = field(default_factory=list)  # (phone, user id)
+    phone_counter: int = 0
+    run_id: int = 0
+
+    def next_phone(self) -> str:
+        self.phone_counter += 1
+        return f"97{self.run_id:03d}{self.phone_counter:05d}"
+
+
+class ThinkTime:
+    """``none``, ``fixed:MS``, ``uniform:MIN:MAX`` or ``exp:MEAN`` (milliseconds)"""
+
+    def __init__(self, spec: str):
+        kind, *values = spec.split(":")
+        self.kind = kind
+        self.values = [float(v) / 1000 for v in values]
+        if kind not in ("none", "fixed", "uniform", "exp"):
+            raise ValueError(f"Unknown think time: {spec}")
+
+    def draw(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.values[0]
+        if self.kind == "uniform":
+            return rng.uniform(self.values[0], self.values[1])
+        if self.kind == "exp":
+            return rng.expovariate(1 / self.values[0])
+        return 0.0
+
+
+class VirtualUser:
+    def __init__(self, role: str, worker: int, client, shared: Shared, samples: List[Sample], think: ThinkTime, rng: random.Random, start: float):
+        self.role = role
+        self.worker = worker  # index among the users with this role
+        self.client = client
+        self.shared = shared
+        self.samples = samples
+        self.think_time = think
+        self.rng = rng
+        self.start = start
+
+    async def think(self) -> None:
+        delay = self.think_time.draw(self.rng)
+        if delay:
+            await asyncio.sleep(delay)
+
+    async def call(self, step: str, method: str, url: str, expect: int = 200, **kwargs):
+        began = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except Exception:
+            response, status = None, 0
+        self.samples.append(Sample(began - self.start, f"{self.role}.{step}", time.perf_counter() - began, status))
+        return response if status == expect else None
+
+    async def run(self, deadline: float) -> None:
+        journey = getattr(self, self.role)
+        while time.perf_counter() < deadline:
+            await journey()
+            await self.think()
+
+    async def reception(self) -> None:
+        phone = self.shared.next_phone()
+        response = await self.call("register_customer", "POST", "/v1/auth/register", 201, json={
+            "full_name": f"Walk-in {phone}", "phone": phone, "password": PASSWORD,
+        })
+        if response is None:
+            return
+        customer_id = response.json()["id"]
+        self.shared.customers.append((phone, customer_id))
+        await self.think()
+
+        model = self.rng.choice(self.shared.models)
+        response = await self.call("register_device", "POST", "/v1/devices", 201, json={
+            "brand_id": model["brand_id"], "model_id": model["id"], "device_type_id": model["device_type_id"],
+            "serial_number": f"LG{phone}", "owner_id": customer_id,
+        })
+        if response is None:
+            return
+        device_id = response.json()["id"]
+        await self.think()
+
+        problems = self.shared.problems.get(model["device_type_id"]) or [None]
+        response = await self.call("create_order", "POST", "/v1/orders", 201, json={
+            "device_id": device_id, "customer_id": customer_id, "problem_id": self.rng.choice(problems),
+            "cost": str(self.rng.choice([40, 60, 80, 120, 150, 300])), "note": "Walk-in repair",
+        })
+        if response is None:
+            return
+        order = response.json()
+        if self.shared.technicians:
+            await self.call("assign_technician", "POST", "/v1/assigns", 201, json={
+                "order_id": order["id"], "user_id": self.rng.choice(self.shared.technicians),
+            })
+        if self.rng.random() < 0.3:
+            await self.think()
+            await self.call("take_deposit", "POST", "/v1/payments", 201, json={
+                "order_id": order["id"], "due_amount": order["total_cost"], "amount": "20.00",
+                "status": "Partial", "payment_method": "Cash",
+            })
+
+    async def technician(self) -> None:
+        # A page of its own, so technicians don't all race for the same few orders
+        response = await self.call("list_pending", "GET", "/v1/orders", params={
+            "status": "Pending", "limit": PENDING_PAGE, "offset": self.worker * PENDING_PAGE,
+        })
+        if response is None or not response.json():
+            return
+        order_id = self.rng.choice(response.json())["id"]
+        await self.think()
+
+        response = await self.call("get_order", "GET", f"/v1/orders/{order_id}")
+        if response is None:
+            return
+        for status in ("Repairing", "Completed"):
+            response = await self.call(
+                f"mark_{status.lower()}", "PATCH", f"/v1/orders/{order_id}",
+                json={"status": status}, headers={"If-Match": response.headers.get("etag", "*")},
+            )
+            if response is None:
+                return  # someone else took it (412)
+            await self.think()
+
+        order = response.json()
+        problems = self.shared.problems.get(1) or []
+        if problems:
+            await self.call("check_estimate", "GET", "/v1/estimates", params={
+                "device_type_id": 1, "problem_ids": ",".join(map(str, self.rng.sample(problems, min(2, len(problems))))),
+            })
+
+    async def customer(self) -> None:
+        if not self.shared.customers:
+            return
+        phone, customer_id = self.rng.choice(self.shared.customers)
+        if await self.call("login", "POST", "/v1/auth/login", json={"phone": phone, "password": PASSWORD}) is None:
+            return
+        await self.think()
+
+        response = await self.call("my_orders", "GET", "/v1/orders", params={"customer_id": customer_id})
+        if response is None or not response.json():
+            return
+        order = self.rng.choice(response.json())
+        await self.think()
+
+        await self.call("order_detail", "GET", f"/v1/orders/{order['id']}")
+        await self.call("my_payments", "GET", "/v1/payments", params={"order_id": order["id"]})
+        if order["status"] == "Completed" and float(order["balance_due"]) > 0:
+            await self.think()
+            await self.call("pay_balance", "POST", "/v1/payments", 201, json={
+                "order_id": order["id"], "due_amount": order["balance_due"], "amount": order["balance_due"],
+                "status": "Paid", "payment_method": self.rng.choice(["Card", "Wallet"]),
+            })
+
+
+async def load_reference_data(client, shared: Shared, technicians: int, customer_pool: List[Tuple[str, int]]) -> None:
+    shared.models = (await client.get("/v1/devices/models")).json()
+    if not shared.models:
+        raise SystemExit("No device models found; seed the database first")
+    for problem in (await client.get("/v1/problems", params={"limit": 200})).json():
+        shared.problems.setdefault(problem["device_type_id"], []).append(problem["id"])
+    for _ in range(technicians):
+        phone = shared.next_phone()
+        response = await client.post("/v1/auth/register", json={"full_name": f"Technician {phone}", "phone": phone, "password": PASSWORD})
+        if response.status_code == 201:
+            shared.technicians.append(response.json()["id"])
+    shared.customers.extend(customer_pool)
+
+
+def summarize(samples: List[Sample], elapsed: float) -> dict:
+    latencies = sorted(s.latency for s in samples)
+    errors = sum(s.error for s in samples)
+    conflicts = sum(s.status in CONFLICT_STATUSES for s in samples)
+    ms = lambda seconds: round(seconds * 1000, 2)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "conflicts": conflicts,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+    }
+
+
+async def report_windows(samples: List[Sample], window: float, windows: List[dict], stop: asyncio.Event) -> None:
+    seen = 0
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), window)
+        except asyncio.TimeoutError:
+            pass
+        batch, seen = samples[seen:], len(samples)
+        row = {"t": round(len(windows) * window + window, 1), **summarize(batch, window)}
+        windows.append(row)
+        print(
+            f"t={row['t']:>6.1f}s  {row['throughput_rps']:>8.1f} req/s  errors {row['error_rate'] * 100:5.1f}%  "
+            f"p50 {row['p50_ms']:>8.2f}  p95 {row['p95_ms']:>8.2f}  p99 {row['p99_ms']:>8.2f} ms",
+            file=sys.stderr,
+        )
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        role, _, weight = part.partition("=")
+        if role not in ("reception", "technician", "customer"):
+            raise SystemExit(f"Unknown role in --mix: {role}")
+        mix[role] = float(weight or 1)
+    return mix
+
+
+async def run(args) -> dict:
+    customer_pool: List[Tuple[str, int]] = []
+    if args.url:
+        import httpx
+        connect = httpx.AsyncClient(base_url=args.url.rstrip("/"), timeout=30.0)
+    else:
+        harness.configure(args.database_url)
+        from benchmarks.dataset import SIZES, build_dataset
+        if await harness.prepare_database():
+            import db
+            await build_dataset(db.engine, SIZES["small"], seed=args.seed)
+        # Dataset customers all use the same password
+        customer_pool = [(f"98{i:08d}", i) for i in range(1, 201)]
+        connect = harness.client()
+
+    rng = random.Random(args.seed)
+    shared = Shared(run_id=int(time.time()) % 1000)
+    mix = parse_mix(args.mix)
+    roles = rng.choices(list(mix), weights=list(mix.values()), k=args.users)
+    samples: List[Sample] = []
+    windows: List[dict] = []
+    think = ThinkTime(args.think)
+
+    async with connect as client:
+        await load_reference_data(client, shared, args.technicians, customer_pool)
+        start = time.perf_counter()
+        deadline = start + args.duration
+        stop = asyncio.Event()
+        reporter = asyncio.create_task(report_windows(samples, args.window, windows, stop))
+
+        async def launch(index: int, role: str, worker: int):
+            await asyncio.sleep(args.ramp_up * index / max(1, args.users))
+            user = VirtualUser(role, worker, client, shared, samples, think, random.Random(f"{args.seed}:{index}"), start)
+            await user.run(deadline)
+
+        workers = [roles[:i].count(role) for i, role in enumerate(roles)]
+        await asyncio.gather(*(launch(i, role, workers[i]) for i, role in enumerate(roles)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await reporter
+
+    by_step = {}
+    for name in sorted({s.name for s in samples}):
+        by_step[name] = summarize([s for s in samples if s.name == name], elapsed)
+    return {
+        "meta": {
+            "target": args.url or f"asgi:{args.database_url}",
+            "users": args.users, "roles": dict(Counter(roles)), "duration": args.duration,
+            "think": args.think, "seed": args.seed,
+        },
+        "overall": summarize(samples, elapsed),
+        "steps": by_step,
+        "windows": windows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--database-url", default=harness.DEFAULT_DATABASE_URL, help="In-process mode only")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--mix", default="reception=2,technician=3,customer=5", help="Role weights")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds")
+    parser.add_argument("--ramp-up", type=float, default=5, help="Seconds to start all users")
+    parser.add_argument("--think", default="exp:500", help="none, fixed:MS, uniform:MIN:MAX or exp:MEAN")
+    parser.add_argument("--technicians", type=int, default=5, help="Technician accounts to create for assignments")
+    parser.add_argument("--window", type=float, default=5, help="Reporting interval in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"\n{'step':34} {'requests':>8} {'errors':>7} {'conflicts':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in {**report["steps"], "overall": report["overall"]}.items():
+        print(f"{name:34} {row['requests']:>8} {row['error_rate'] * 100:>6.1f}% {row['conflicts']:>9} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Benchmark v1 endpoints in-process and save the results as JSON.
+
+    python -m benchmarks.run_api --size small --requests 200 --concurrency 4
+
+Requests go through ``httpx.ASGITransport`` straight into ``main.app`` (no
+network, no server process) against a seeded SQLite file by default, or any
+database given with ``--database-url``. Every scenario reports throughput and
+p50/p95/p99 latency; compare two result files with ``benchmarks.compare``.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks import harness
+
+RESULTS_DIR = harness.BENCH_DIR / "results"
+
+Request = Tuple[str, str, dict]  # (method, url, httpx kwargs)
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: Callable[[random.Random, Dict[str, int]], Request]
+    expect: int = 200
+
+
+def _get(url: str, **params) -> Request:
+    return "GET", url, {"params": params}
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("orders.list", lambda r, n: _get("/v1/orders", limit=20, offset=r.randrange(0, max(1, n["orders"] - 20)))),
+    Scenario("orders.list_by_status", lambda r, n: _get("/v1/orders", status=r.choice(["Pending", "Repairing", "Completed"]), limit=20)),
+    Scenario("orders.list_with_balance", lambda r, n: _get("/v1/orders", has_balance="true", limit=20)),
+    Scenario("orders.get", lambda r, n: _get(f"/v1/orders/{r.randint(1, n['orders'])}")),
+    Scenario("orders.create", lambda r, n: ("POST", "/v1/orders", {"json": {"device_id": r.randint(1, n["devices"]), "cost": "120.00"}}), 201),
+    Scenario("orders.update", lambda r, n: ("PATCH", f"/v1/orders/{r.randint(1, n['orders'])}", {"json": {"note": f"bench {r.random()}"}})),
+    Scenario("payments.list_by_order", lambda r, n: _get("/v1/payments", order_id=r.randint(1, n["orders"]))),
+    Scenario("payments.get", lambda r, n: _get(f"/v1/payments/{r.randint(1, n['payments'])}")),
+    Scenario("payments.create", lambda r, n: ("POST", "/v1/payments", {"json": {
+        "order_id": r.randint(1, n["orders"]), "due_amount": "100.00", "amount": "10.00", "status": "Partial"}}), 201),
+    Scenario("devices.list", lambda r, n: _get("/v1/devices", limit=20)),
+    Scenario("devices.get", lambda r, n: _get(f"/v1/devices/{r.randint(1, n['devices'])}")),
+    Scenario("users.list", lambda r, n: _get("/v1/users", limit=20)),
+    Scenario("users.get", lambda r, n: _get(f"/v1/users/{r.randint(1, n['users'])}")),
+    Scenario("search.phone", lambda r, n: _get("/v1/search", q=f"98{r.randint(0, n['users']):08d}"[:7])),
+    Scenario("search.name", lambda r, n: _get("/v1/search", q=f"Customer {r.randint(1, n['users'])}")),
+    Scenario("changes.first_page", lambda r, n: _get("/v1/changes", limit=100)),
+    Scenario("estimates.get", lambda r, n: _get("/v1/estimates", device_type_id=1, problem_ids="1,2,3")),
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Linear interpolation between closest ranks"""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def summarize(latencies: List[float], statuses: Counter, errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": ms(sum(values) / len(values)) if values else 0.0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else 0.0,
+    }
+
+
+async def run_scenario(client, scenario: Scenario, counts: Dict[str, int], requests: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(f"{seed}:{scenario.name}")
+    pending = iter([scenario.build(rng, counts) for _ in range(requests)])
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for method, url, kwargs in pending:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+            if response.status_code != scenario.expect:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, errors, time.perf_counter() - start)
+
+
+async def table_counts() -> Dict[str, int]:
+    import db
+    from sqlalchemy import func, select
+    from models.order import Order
+    from models.payment import Payment
+    from models.device import Device
+    from models.user import User
+
+    counts = {}
+    async with db.AsyncSessionLocal() as session:
+        for name, model in (("orders", Order), ("payments", Payment), ("devices", Device), ("users", User)):
+            counts[name] = (await session.execute(select(func.max(model.id)))).scalar() or 1
+    return counts
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=harness.BENCH_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    harness.configure(args.database_url)
+    from benchmarks.dataset import SIZES, DatasetSize, build_dataset
+
+    size = DatasetSize(orders=args.orders) if args.orders else SIZES[args.size]
+    empty = await harness.prepare_database(reset=args.fresh)
+    if empty:
+        import db
+        print(f"Seeding {size.orders} orders...", file=sys.stderr)
+        started = time.perf_counter()
+        await build_dataset(db.engine, size, seed=args.seed, workers=args.seed_workers)
+        print(f"Seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    counts = await table_counts()
+
+    selected = SCENARIOS
+    if args.only:
+        names = set(args.only.split(","))
+        selected = [s for s in SCENARIOS if s.name in names or s.name.split(".")[0] in names]
+
+    results = {}
+    async with harness.client() as client:
+        for scenario in selected:
+            if args.warmup:
+                await run_scenario(client, scenario, counts, args.warmup, 1, args.seed + 1)
+            results[scenario.name] = await run_scenario(client, scenario, counts, args.requests, args.concurrency, args.seed)
+            r = results[scenario.name]
+            print(
+                f"{scenario.name:28} {r['throughput_rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f}  "
+                f"p95 {r['p95_ms']:>8.2f}  p99 {r['p99_ms']:>8.2f} ms  errors {r['errors']}",
+                file=sys.stderr,
+            )
+
+    import db
+    await db.engine.dispose()
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": db.engine.dialect.name,
+            "dataset": {"orders": size.orders, "seed": args.seed, **counts},
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=harness.DEFAULT_DATABASE_URL)
+    parser.add_argument("--size", choices=["small", "medium", "large", "xlarge"], default="small")
+    parser.add_argument("--orders", type=int, help="Dataset size in orders (overrides --size)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fresh", action="store_true", help="Drop and re-seed the benchmark database")
+    parser.add_argument("--seed-workers", type=int, default=4, help="Writer connections used for seeding")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario")
+    parser.add_argument("--only", help="Comma separated scenario names or prefixes, e.g. orders,search.phone")
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{report['meta']['commit'] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Audit trail of who created, changed or deleted users, devices, orders and
+payments.
+
+Entries are collected from the ORM session rather than in each handler:
+
+* ``after_flush`` sees rows added, modified or deleted through the session,
+  with the old and new value of every changed column;
+* ``record_update`` covers the single-statement ``UPDATE``s in
+  ``core.versioning``, which bypass the session (new values only).
+
+They are held in ``session.info`` until the transaction commits (a rollback
+discards them), then put on a bounded in-memory queue. ``AuditWriter``
+inserts them into ``audit_log`` in batches from a background task, so
+auditing adds no database writes to the request itself. A batch that fails
+to write (e.g. while the database is unreachable) is kept and retried with
+backoff, while new entries wait in the queue. When the queue is full, further
+entries are dropped and counted rather than slowing down requests. The actor
+is the user id from the request's bearer token, set by ``AuditMiddleware``.
+Password hashes are never written, only the fact that they changed.
+"""
+import asyncio
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ClauseElement
+
+import db
+from core.config import settings
+from models.audit import AuditLog
+from models.device import Device
+from models.order import Order
+from models.payment import Payment
+from models.user import User
+from utils.security import bearer_user_id
+
+logger = logging.getLogger(__name__)
+
+AUDITED = {User: "users", Device: "devices", Order: "orders", Payment: "payments"}
+REDACTED = {"password_hash"}
+SESSION_KEY = "audit"
+UNSAFE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+@dataclass
+class AuditContext:
+    actor_id: Optional[int]
+    request: str
+
+
+current_context: ContextVar[Optional[AuditContext]] = ContextVar("audit_context", default=None)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, ClauseElement):
+        return "<computed>"
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _value(key: str, value: Any) -> Any:
+    return "<redacted>" if key in REDACTED else _jsonable(value)
+
+
+def _entry(entity: str, entity_id: Optional[int], action: str, changes: Dict[str, Any]) -> dict:
+    context = current_context.get()
+    return {
+        "actor_id": context.actor_id if context else None,
+        "entity": entity,
+        "entity_id": entity_id,
+        "action": action,
+        "changes": changes,
+        "request": context.request if context else None,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def _stage(session: Session, entry: dict) -> None:
+    session.info.setdefault(SESSION_KEY, []).append(entry)
+
+
+def _snapshot(obj) -> Dict[str, Any]:
+    """Loaded column values, without triggering a load"""
+    state = inspect(obj)
+    return {
+        attr.key: _value(attr.key, state.dict[attr.key])
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+
+
+def _diff(obj) -> Dict[str, Any]:
+    """{column: [old, new]} for every changed column"""
+    state = inspect(obj)
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if history.added or history.deleted:
+            old = history.deleted[0] if history.deleted else None
+            new = history.added[0] if history.added else None
+            changes[attr.key] = [_value(attr.key, old), _value(attr.key, new)]
+    return changes
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    for obj in session.new:
+        entity = AUDITED.get(type(obj))
+        if entity:
+            _stage(session, _entry(entity, obj.id, "create", _snapshot(obj)))
+    for obj in session.dirty:
+        entity = AUDITED.get(type(obj))
+        if entity:
+            changes = _diff(obj)
+            if changes:
+                _stage(session, _entry(entity, obj.id, "update", changes))
+    for obj in session.deleted:
+        entity = AUDITED.get(type(obj))
+        if entity:
+            _stage(session, _entry(entity, obj.id, "delete", _snapshot(obj)))
+
+
+def _after_commit(session: Session) -> None:
+    entries = session.info.pop(SESSION_KEY, None)
+    if entries:
+        writer.enqueue(entries)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(SESSION_KEY, None)
+
+
+def record_update(db_session, model, obj_id: int, values: Dict[str, Any]) -> None:
+    """Stage an audit entry for an ``UPDATE`` issued outside the ORM unit of work"""
+    entity = AUDITED.get(model)
+    if entity and settings.AUDIT_ENABLED:
+        session = getattr(db_session, "sync_session", db_session)
+        _stage(session, _entry(entity, obj_id, "update", {key: _value(key, value) for key, value in values.items()}))
+
+
+class AuditWriter:
+    def __init__(self, queue_size: int, batch_size: int, flush_seconds: float, retry_seconds: float, max_retry_seconds: float):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.batch: List[dict] = []
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
+    def enqueue(self, entries: List[dict]) -> None:
+        if self.queue is None:
+            return  # not started, e.g. in scripts
+        for entry in entries:
+            try:
+                self.queue.put_nowait(entry)
+                self.recorded += 1
+            except asyncio.QueueFull:
+                self.dropped += 1
+                if self.dropped % 1000 == 1:
+                    logger.warning("Audit queue full; %d entries dropped so far", self.dropped)
+
+    async def start(self) -> None:
+        if self.task is None:
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write whatever is still queued"""
+        if self.task is None:
+            return
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+        self._drain()
+        while self.batch:
+            if not await self._write():
+                # No time left to wait for the database
+                lost = len(self.batch) + self.queue.qsize()
+                self.failed += lost
+                logger.error("Discarding %d audit entries that could not be written before shutdown", lost)
+                self.batch = []
+                break
+            self._drain()
+        self.queue = None
+
+    def _drain(self) -> None:
+        while len(self.batch) < self.batch_size and not self.queue.empty():
+            self.batch.append(self.queue.get_nowait())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        failures = 0
+        while True:
+            if not self.batch:
+                self.batch.append(await self.queue.get())
+            deadline = loop.time() + self.flush_seconds
+            self._drain()
+            while len(self.batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self.batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+                self._drain()
+            if await self._write():
+                failures = 0
+            else:
+                failures += 1
+                await asyncio.sleep(min(self.retry_seconds * 2 ** (failures - 1), self.max_retry_seconds))
+
+    async def _write(self) -> bool:
+        """Insert the current batch; on failure it is kept for the next attempt"""
+        batch = self.batch
+        try:
+            async with db.engine.begin() as conn:
+                await conn.execute(insert(AuditLog.__table__), batch)
+        except Exception:
+            logger.exception("Failed to write %d audit entries; will retry", len(batch))
+            return False
+        self.written += len(batch)
+        # Kept until here so a batch interrupted by stop() is retried there
+        self.batch = []
+        return True
+
+    @property
+    def pending(self) -> int:
+        return (self.queue.qsize() if self.queue is not None else 0) + len(self.batch)
+
+
+writer = AuditWriter(
+    settings.AUDIT_QUEUE_SIZE,
+    settings.AUDIT_BATCH_SIZE,
+    settings.AUDIT_FLUSH_SECONDS,
+    settings.AUDIT_RETRY_SECONDS,
+    settings.AUDIT_RETRY_MAX_SECONDS,
+)
+
+
+def install() -> None:
+    """Capture audited changes from every ORM session"""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+
+
+class AuditMiddleware:
+    """Makes the caller of each write request available to the session events"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in UNSAFE_METHODS:
+            return await self.app(scope, receive, send)
+        context = AuditContext(bearer_user_id(scope["headers"]), f"{scope['method']} {scope['path']}"[:255])
+        token = current_context.set(context)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_context.reset(token)
@@ -0,0 +1,57 @@
+"""
+Denormalized ``orders.paid_total`` / ``orders.balance_due``.
+
+Both columns are recomputed from ``payments`` in the same transaction as every
+payment write, so list pages can show (and filter on) the amount due without
+fetching payments. Callers lock the order row first so concurrent payment
+writes for one order are applied one after another.
+"""
+from decimal import Decimal
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.changelog import record_change
+from models.order import Order
+from models.payment import Payment
+
+# Payment statuses whose amount counts as received
+PAID_STATUSES = ("Paid", "Partial")
+
+
+def paid_total_subquery():
+    """SUM of received payment amounts for the enclosing ``orders`` row"""
+    return (
+        select(func.coalesce(func.sum(Payment.amount), Decimal("0.00")))
+        .where(Payment.order_id == Order.id, Payment.status.in_(PAID_STATUSES))
+        .scalar_subquery()
+    )
+
+
+def balance_due_expr(total_cost, paid_total):
+    """``max(total_cost - paid_total, 0)`` written portably"""
+    remaining = func.coalesce(total_cost, Decimal("0.00")) - paid_total
+    return case((remaining > 0, remaining), else_=Decimal("0.00"))
+
+
+async def lock_order(db: AsyncSession, order_id):
+    """Row-lock an order for the rest of the transaction; ``order_id`` may be a subquery"""
+    result = await db.execute(select(Order).where(Order.id == order_id).with_for_update())
+    return result.scalar_one_or_none()
+
+
+async def refresh_order_balance(db: AsyncSession, order_id: int) -> None:
+    # Bumps the version too: the order's representation (and ETag) changes.
+    # The subquery is repeated rather than referencing paid_total: MySQL applies
+    # SET assignments left to right while other databases use the old values.
+    await db.execute(
+        update(Order)
+        .where(Order.id == order_id)
+        .values(
+            paid_total=paid_total_subquery(),
+            balance_due=balance_due_expr(Order.total_cost, paid_total_subquery()),
+            version=Order.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    record_change(db, Order, order_id)
@@ -0,0 +1,16 @@
+"""
+Fetch rows by a list of ids with one ``WHERE id IN (...)`` query, for the
+``POST /v1/{entity}/batch-get`` endpoints.
+"""
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def fetch_by_ids(db: AsyncSession, model, ids: Iterable[int]) -> Tuple[List, List[int]]:
+    """(rows in the order of ``ids``, ids with no row); repeated ids count once"""
+    unique = list(dict.fromkeys(ids))
+    result = await db.execute(select(model).where(model.id.in_(unique)))
+    by_id = {row.id: row for row in result.scalars().all()}
+    return [by_id[i] for i in unique if i in by_id], [i for i in unique if i not in by_id]
@@ -0,0 +1,145 @@
+"""
+Application cache with pluggable backends.
+
+``cache`` is the process-wide instance, chosen by ``CACHE_BACKEND``:
+
+* ``memory``: a bounded LRU in each worker. Invalidation only reaches the
+  worker that made the change; other workers would serve the old value until
+  its TTL runs out, so ``serve.py`` only allows it with a single worker.
+* ``redis``: shared by every worker through Redis (needs the ``redis``
+  package), so invalidation applies everywhere.
+* ``off`` (default): every lookup misses and nothing is stored.
+
+Values are anything orjson can serialize. Entries can carry tags, and
+``cache.invalidate("brands")`` drops every entry stored with that tag, which
+is how writes keep cached reads fresh. Backend errors are logged and treated
+as misses: the cache must never fail a request the database could serve.
+``cached`` (see ``core.cache.decorators``) caches handler and dependency
+results.
+"""
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+import orjson
+
+from core.config import settings
+from core.cache.memory import MemoryBackend
+from core.cache.redis_backend import RedisBackend
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class NullBackend:
+    name = "off"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        pass
+
+    async def delete(self, *keys: str) -> int:
+        return 0
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        return 0
+
+    async def clear(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def gauges(self) -> Dict[str, float]:
+        return {}
+
+
+class CacheStats:
+    __slots__ = ("hits", "misses", "sets", "invalidations", "errors")
+
+    def __init__(self):
+        self.hits = self.misses = self.sets = self.invalidations = self.errors = 0
+
+
+class Cache:
+    def __init__(self, backend, default_ttl: float):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        try:
+            raw = await self.backend.get(key)
+        except Exception:
+            self.stats.errors += 1
+            logger.exception("Cache get failed for %s", key)
+            raw = None
+        if raw is None:
+            self.stats.misses += 1
+            return default
+        self.stats.hits += 1
+        return orjson.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        try:
+            await self.backend.set(key, orjson.dumps(value), self.default_ttl if ttl is None else ttl, tags)
+            self.stats.sets += 1
+        except Exception:
+            self.stats.errors += 1
+            logger.exception("Cache set failed for %s", key)
+
+    async def delete(self, *keys: str) -> None:
+        try:
+            await self.backend.delete(*keys)
+        except Exception:
+            self.stats.errors += 1
+            logger.exception("Cache delete failed for %s", keys)
+
+    async def invalidate(self, *tags: str) -> int:
+        """Drop every entry stored with any of ``tags``; returns how many"""
+        try:
+            removed = await self.backend.invalidate_tags(tags)
+        except Exception:
+            self.stats.errors += 1
+            logger.exception("Cache invalidation failed for tags %s", tags)
+            return 0
+        self.stats.invalidations += removed
+        return removed
+
+    async def get_or_set(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        value = await self.get(key, MISSING)
+        if value is MISSING:
+            value = await factory()
+            await self.set(key, value, ttl, tags)
+        return value
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def build_backend():
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryBackend(settings.CACHE_MAX_ENTRIES, settings.CACHE_MAX_BYTES)
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBackend(settings.CACHE_REDIS_URL, settings.CACHE_KEY_PREFIX, settings.CACHE_TAG_TTL_SECONDS)
+    if settings.CACHE_BACKEND == "off":
+        return NullBackend()
+    raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
+
+
+cache = Cache(build_backend(), settings.CACHE_DEFAULT_TTL_SECONDS)
+
+from core.cache.decorators import cached  # noqa: E402  (needs ``cache``)
+
+__all__ = ["Cache", "CacheStats", "cache", "cached"]
@@ -0,0 +1,69 @@
+"""
+``cached`` for route handlers and FastAPI dependencies:
+
+    @router.get("/brands", response_model=List[BrandResponse])
+    @cached(tags=["brands"], model=List[BrandResponse])
+    async def list_brands(db: AsyncSession = Depends(get_db)):
+        ...
+
+    # in create_brand, after the commit
+    await cache.invalidate("brands")
+
+The key is the function's qualified name plus its scalar arguments (query
+and path parameters); injected objects such as the session or the current
+user are ignored unless listed in ``vary``. Tags may reference arguments,
+e.g. ``"order:{order_id}"``. Results are stored in their JSON form: pass
+``model`` to serialize ORM objects through a pydantic type first, and note
+that a hit returns that JSON form (dicts and lists), which FastAPI validates
+against ``response_model`` as usual. Responses are returned uncached.
+"""
+import functools
+import inspect
+from typing import Any, Iterable, Optional
+
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+from core.utils import call_key
+
+
+def cached(
+    ttl: Optional[float] = None,
+    tags: Iterable[str] = (),
+    vary: Optional[Iterable[str]] = None,
+    model: Any = None,
+    key: Optional[str] = None,
+):
+    tags = tuple(tags)
+    vary = None if vary is None else tuple(vary)
+    adapter = TypeAdapter(model) if model is not None else None
+
+    def decorator(func):
+        if not inspect.iscoroutinefunction(func):
+            raise TypeError(f"@cached needs an async function, got {func.__qualname__}")
+        signature = inspect.signature(func)
+        prefix = key or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            from core.cache import MISSING, cache
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            cache_key = call_key(prefix, arguments, vary)
+
+            value = await cache.get(cache_key, MISSING)
+            if value is not MISSING:
+                return value
+            result = await func(*args, **kwargs)
+            if isinstance(result, Response):
+                return result
+            if adapter is not None:
+                result = adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json", by_alias=True)
+            await cache.set(cache_key, result, ttl, [tag.format(**arguments) for tag in tags])
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,99 @@
+"""
+In-process LRU cache backend.
+
+Values are stored as serialized bytes, so the size limit counts what is
+actually held and callers can't mutate a cached object by accident. Entries
+are evicted least recently used first once either ``max_entries`` or
+``max_bytes`` is exceeded; expired entries are dropped when they are read or
+reach the LRU end. Everything runs on the event loop thread, so no locking.
+"""
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# (value, expires_at monotonic, tags)
+Entry = Tuple[bytes, float, Tuple[str, ...]]
+
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self.tags: Dict[str, Set[str]] = defaultdict(set)
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _size(key: str, value: bytes) -> int:
+        return len(key) + len(value)
+
+    def _remove(self, key: str) -> None:
+        value, _, tags = self.entries.pop(key)
+        self.bytes -= self._size(key, value)
+        for tag in tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        if key in self.entries:
+            self._remove(key)
+        size = self._size(key, value)
+        if size > self.max_bytes:
+            return
+        tags = tuple(tags)
+        self.entries[key] = (value, time.monotonic() + ttl, tags)
+        self.bytes += size
+        for tag in tags:
+            self.tags[tag].add(key)
+
+        now = time.monotonic()
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            oldest, (_, expires_at, _) = next(iter(self.entries.items()))
+            self._remove(oldest)
+            if expires_at <= now:
+                self.expirations += 1
+            else:
+                self.evictions += 1
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if key in self.entries:
+                self._remove(key)
+                removed += 1
+        return removed
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        keys = set()
+        for tag in tags:
+            keys |= self.tags.get(tag, set())
+        return await self.delete(*keys)
+
+    async def clear(self) -> None:
+        self.entries.clear()
+        self.tags.clear()
+        self.bytes = 0
+
+    async def close(self) -> None:
+        pass
+
+    def gauges(self) -> Dict[str, float]:
+        return {"entries": len(self.entries), "bytes": self.bytes}
@@ -0,0 +1,89 @@
+"""
+Redis cache backend, shared by every worker (needs the ``redis`` package).
+
+Each tag is a Redis set of the keys stored with it; invalidating a tag
+deletes those keys and the set. Tag sets expire after ``tag_ttl`` seconds
+(refreshed on every write), and entries are capped to that TTL so a tag set
+always outlives the keys it lists. Any Redis-protocol server works; the tests
+use ``tests/fake_redis.py``.
+"""
+from typing import Dict, Iterable, Optional
+
+DELETE_BATCH_SIZE = 500
+
+
+class RedisBackend:
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str, tag_ttl: int):
+        self.url = url
+        self.prefix = prefix
+        self.tag_ttl = tag_ttl
+        self._redis = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+            self._redis = redis.from_url(self.url)
+        return self._redis
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.redis.get(self._key(key))
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        tags = tuple(tags)
+        if tags:
+            ttl = min(ttl, self.tag_ttl)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.set(self._key(key), value, px=max(1, int(ttl * 1000)))
+        for tag in tags:
+            pipe.sadd(self._tag(tag), self._key(key))
+            pipe.expire(self._tag(tag), self.tag_ttl)
+        await pipe.execute()
+
+    async def delete(self, *keys: str) -> int:
+        if not keys:
+            return 0
+        return await self.redis.delete(*(self._key(key) for key in keys))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        tag_keys = [self._tag(tag) for tag in tags]
+        if not tag_keys:
+            return 0
+        pipe = self.redis.pipeline(transaction=False)
+        for tag_key in tag_keys:
+            pipe.smembers(tag_key)
+        keys = {key for members in await pipe.execute() for key in members}
+        removed = 0
+        if keys:
+            removed = await self.redis.delete(*keys)
+        await self.redis.delete(*tag_keys)
+        return removed
+
+    async def clear(self) -> None:
+        batch = []
+        async for key in self.redis.scan_iter(match=f"{self.prefix}*", count=DELETE_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= DELETE_BATCH_SIZE:
+                await self.redis.delete(*batch)
+                batch = []
+        if batch:
+            await self.redis.delete(*batch)
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def gauges(self) -> Dict[str, float]:
+        return {}
@@ -0,0 +1,125 @@
+"""
+Commit-ordered log of order, payment and device changes for ``GET /v1/changes``.
+
+``updated_at`` cannot be a sync cursor: it has one-second precision, so rows
+changed in the same second as the cursor but with a lower id fall behind
+it, and it is taken when the statement runs rather than when the transaction
+commits, so a reader can move past a change before it becomes visible.
+Deleted rows leave nothing to page on at all.
+
+Instead every transaction that creates, updates or deletes one of these rows
+appends one entry per row to ``change_log`` right before it commits, and
+readers page on the autoincrement id. Deletes are entries too (tombstones).
+Entries come from the ORM session:
+
+* ``after_flush`` sees rows added, modified or deleted through the session;
+* ``before_flush`` looks up rows the database itself changes when a parent
+  is deleted (``ON DELETE CASCADE`` / ``SET NULL``, see ``CASCADES``);
+* ``record_change`` covers the single-statement ``UPDATE``s in
+  ``core.versioning`` and ``core.balances``, which bypass the session.
+
+They are held in ``session.info`` and written with one ``INSERT`` in
+``before_commit`` (a rollback discards them). Ids are allocated at that
+insert, moments before the commit, so a transaction can still commit after
+one with a higher id; readers therefore only skip a gap in the ids once the
+entry after it is ``CHANGES_SETTLE_SECONDS`` old.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.orm import Session
+
+from models.change_log import ChangeLog
+from models.device import Device
+from models.order import Order
+from models.payment import Payment
+from models.problem import Problem
+from models.user import User
+
+TRACKED = {Order: "orders", Payment: "payments", Device: "devices"}
+UPSERT = "upsert"
+DELETE = "delete"
+SESSION_KEY = "change_log"
+
+# Rows the database changes through foreign keys when a parent row is deleted
+CASCADES = {
+    Order: ((Payment, Payment.order_id, DELETE),),
+    User: ((Order, Order.customer_id, UPSERT), (Device, Device.owner_id, UPSERT)),
+    Problem: ((Order, Order.problem_id, UPSERT),),
+}
+
+# Upsert entries for rows written without the ORM (seed data, bulk loads)
+# that are not in the log yet, oldest change first
+BACKFILL = text("""
+    INSERT INTO change_log (entity, entity_id, action, created_at)
+    SELECT entity, entity_id, 'upsert', changed_at FROM (
+        SELECT 'orders' AS entity, id AS entity_id, COALESCE(updated_at, created_at, CURRENT_TIMESTAMP) AS changed_at FROM orders
+        UNION ALL SELECT 'payments', id, COALESCE(updated_at, created_at, CURRENT_TIMESTAMP) FROM payments
+        UNION ALL SELECT 'devices', id, COALESCE(updated_at, created_at, CURRENT_TIMESTAMP) FROM devices
+    ) AS current_rows
+    WHERE NOT EXISTS (
+        SELECT 1 FROM change_log
+        WHERE change_log.entity = current_rows.entity AND change_log.entity_id = current_rows.entity_id
+    )
+    ORDER BY changed_at, entity_id
+""")
+
+
+def _stage(session: Session, entity: str, entity_id: int, action: str) -> None:
+    # Keyed by row: the feed only needs each row's last change per transaction
+    session.info.setdefault(SESSION_KEY, {})[(entity, entity_id)] = action
+
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    for obj in session.deleted:
+        for model, column, action in CASCADES.get(type(obj), ()):
+            ids = session.connection().execute(select(model.id).where(column == obj.id)).scalars()
+            for entity_id in ids:
+                _stage(session, TRACKED[model], entity_id, action)
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    for obj in session.new:
+        entity = TRACKED.get(type(obj))
+        if entity:
+            _stage(session, entity, obj.id, UPSERT)
+    for obj in session.dirty:
+        entity = TRACKED.get(type(obj))
+        if entity and session.is_modified(obj, include_collections=False):
+            _stage(session, entity, obj.id, UPSERT)
+    for obj in session.deleted:
+        entity = TRACKED.get(type(obj))
+        if entity:
+            _stage(session, entity, obj.id, DELETE)
+
+
+def _before_commit(session: Session) -> None:
+    # Flush first so entries for pending ORM changes are staged too
+    session.flush()
+    staged = session.info.pop(SESSION_KEY, None)
+    if staged:
+        now = datetime.now(timezone.utc)
+        session.connection().execute(insert(ChangeLog.__table__), [
+            {"entity": entity, "entity_id": entity_id, "action": action, "created_at": now}
+            for (entity, entity_id), action in staged.items()
+        ])
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(SESSION_KEY, None)
+
+
+def record_change(db_session, model, obj_id: int) -> None:
+    """Stage a change-log entry for a row updated outside the ORM unit of work"""
+    entity = TRACKED.get(model)
+    if entity:
+        _stage(getattr(db_session, "sync_session", db_session), entity, obj_id, UPSERT)
+
+
+def install() -> None:
+    """Log tracked changes from every ORM session"""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "before_flush", _before_flush)
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
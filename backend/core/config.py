@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 from pathlib import Path
 
 
@@ -27,12 +27,77 @@ class Settings(BaseSettings):
     DB_NAME: str = "repair"
     DB_USER: str = "root"
     DB_PASSWORD: str = ""
+    DATABASE_URL: str = ""  # overrides the DB_* settings, e.g. for benchmarks
+    DB_POOL_SIZE: int = 10  # per worker process
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # below MySQL's wait_timeout
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_WARMUP: int = 4  # connections opened at startup
     JWT_SECRET_KEY: str = "your-super-secret-jwt-key-change-this-in-production-12345678"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_HOURS: int = 24
     ACCESS_TOKEN_EXPIRE_HOURS: int = 24
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
+    SEARCH_BACKEND: str = "mysql"  # "mysql" (FULLTEXT + prefix indexes) or "ngram" (in-process; single-worker only)
+    SEARCH_NGRAM_SIZE: int = 3
+    PHONE_DEFAULT_COUNTRY_CODE: str = "977"
+    PHONE_NATIONAL_LENGTH: int = 10
+    EVENTS_BACKEND: str = "local"  # "local" (single process) or "redis" (shared between workers)
+    EVENTS_REDIS_URL: str = "redis://localhost:6379/0"
+    EVENTS_REDIS_CHANNEL: str = "repair:events"
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_HEARTBEAT_SECONDS: int = 15
+    CHANGES_MAX_WAIT_SECONDS: int = 30
+    CHANGES_POLL_SECONDS: int = 5
+    CHANGES_SETTLE_SECONDS: int = 10  # change-log id gaps younger than this may still commit
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    IDEMPOTENCY_LEASE_SECONDS: int = 120  # an unfinished claim older than this is taken over by a retry
+    IDEMPOTENCY_CACHE_SIZE: int = 1024
+    IDEMPOTENCY_SWEEP_INTERVAL_SECONDS: int = 600
+    CACHE_BACKEND: str = "off"  # "off", "memory" (per process; single-worker only) or "redis" (shared between workers)
+    CACHE_DEFAULT_TTL_SECONDS: int = 300
+    CACHE_MAX_ENTRIES: int = 10000  # memory backend
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # memory backend, serialized keys + values
+    CACHE_REDIS_URL: str = "redis://localhost:6379/1"
+    CACHE_KEY_PREFIX: str = "repair:cache:"
+    CACHE_TAG_TTL_SECONDS: int = 86400  # redis tag sets; longer-lived entries are capped to this
+    BATCH_GET_MAX_IDS: int = 100  # ids per POST /v1/{entity}/batch-get
+    COUNT_EXACT_THRESHOLD: int = 10000  # include_total: exact COUNT(*) up to this many rows
+    COUNT_CACHE_TTL_SECONDS: int = 60  # approximate totals above the threshold
+    COUNT_CACHE_MAX_ENTRIES: int = 1000  # per-process cache of those totals when CACHE_BACKEND is off
+    AUDIT_ENABLED: bool = True
+    AUDIT_QUEUE_SIZE: int = 10000  # entries waiting to be written; further ones are dropped
+    AUDIT_BATCH_SIZE: int = 200
+    AUDIT_FLUSH_SECONDS: float = 1.0
+    AUDIT_RETRY_SECONDS: float = 1.0  # first wait after a failed write, doubled per failure
+    AUDIT_RETRY_MAX_SECONDS: float = 60.0
+    PRICE_TABLE_TTL_SECONDS: int = 300  # full reload interval; writes in this process apply immediately
+    METRICS_ENABLED: bool = True
+    SQL_STATS_ENABLED: bool = True
+    SLOW_QUERY_MS: int = 200
+    QUERY_BUDGET_MODE: str = "off"  # "off", "warn" or "raise" (development / CI)
+    QUERY_BUDGET_DEFAULT: Optional[int] = None  # budget for routes without @query_budget
+    QUERY_REPEAT_THRESHOLD: int = 5  # same SELECT this many times in one request looks like N+1
+    PROFILING_ENABLED: bool = True  # admin-only X-Profile: 1 / ?__profile
+    PROFILE_INTERVAL_MS: float = 2.0
+    PROFILE_MAX_PER_MINUTE: int = 6
+    PROFILE_DIR: str = ""  # default: <temp dir>/repair-profiles
+    PROFILE_KEEP: int = 200
+    DEBUG_ENDPOINTS: bool = False  # /debug/* views; keep off on public deployments
+    API_ROUTERS: List[str] = []  # v1 routers this process serves; empty: all
+    FAST_START: bool = False  # skip startup warm-up (bcrypt calibration, pool, caches)
+    BCRYPT_ROUNDS: int = 0  # 0: calibrate at startup to BCRYPT_TARGET_MS
+    BCRYPT_TARGET_MS: int = 250
+    BCRYPT_MIN_ROUNDS: int = 10
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0  # 0: one per CPU core
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    SERVER_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
     
     @property
     def JWT_SECRET(self) -> str:
@@ -40,6 +105,8 @@ class Settings(BaseSettings):
 
     @property
     def database_url(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"mysql+aiomysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}?charset=utf8mb4"
     
     @property
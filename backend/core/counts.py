@@ -0,0 +1,95 @@
+"""
+Total row counts for paginated list endpoints (``?include_total=true``).
+
+Counting every matching row on every page is what makes deep paging slow,
+so the count is bounded: up to ``COUNT_EXACT_THRESHOLD`` rows it is exact
+(the database stops scanning at threshold + 1). Above that the total is
+approximate and cached per filter combination for
+``COUNT_CACHE_TTL_SECONDS``, so the other pages reuse it without counting
+again. The application cache holds it when a ``CACHE_BACKEND`` is enabled,
+otherwise a small LRU in each process (a total that is approximate anyway
+may differ a little between workers):
+
+* without filters, from the table statistics (``information_schema.TABLES``
+  on MySQL, which InnoDB estimates without scanning)
+* with filters (or on other databases), from one full ``COUNT(*)``
+
+The result goes in ``X-Total-Count``. Approximate totals also carry
+``X-Total-Count-Approximate: true``.
+"""
+import hashlib
+from typing import Optional, Tuple
+
+from fastapi import Response
+from sqlalchemy import func, literal_column, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from core import sqlstats
+from core.cache import Cache, cache
+from core.cache.memory import MemoryBackend
+from core.config import settings
+
+TOTAL_HEADER = "X-Total-Count"
+APPROXIMATE_HEADER = "X-Total-Count-Approximate"
+
+local_totals = Cache(MemoryBackend(settings.COUNT_CACHE_MAX_ENTRIES, 1024 * 1024), settings.COUNT_CACHE_TTL_SECONDS)
+
+
+def _totals_cache() -> Cache:
+    return local_totals if cache.backend.name == "off" else cache
+
+
+def _rows(query: Select) -> Select:
+    """``query`` as ``SELECT 1 FROM ... WHERE ...``, without ordering or paging"""
+    return query.with_only_columns(literal_column("1"), maintain_column_froms=True).order_by(None).limit(None).offset(None)
+
+
+def _cache_key(query: Select) -> str:
+    compiled = query.compile()
+    params = sorted((name, str(value)) for name, value in compiled.params.items())
+    digest = hashlib.sha1(f"{compiled}|{params}".encode()).hexdigest()
+    return f"count:{digest}"
+
+
+async def _table_estimate(db: AsyncSession, query: Select) -> Optional[int]:
+    if query.whereclause is not None or db.bind.dialect.name != "mysql":
+        return None
+    froms = query.get_final_froms()
+    if len(froms) != 1 or not hasattr(froms[0], "name"):
+        return None
+    return await db.scalar(
+        text("SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :name"),
+        {"name": froms[0].name},
+    )
+
+
+async def total_count(db: AsyncSession, query: Select) -> Tuple[int, bool]:
+    """(total rows matching ``query``'s filters, whether the total is exact)"""
+    # Only totals above the threshold are cached, so a hit is approximate
+    totals = _totals_cache()
+    key = _cache_key(_rows(query))
+    total = await totals.get(key)
+    if total is not None:
+        return total, False
+
+    threshold = settings.COUNT_EXACT_THRESHOLD
+    sqlstats.allow_queries(2)
+    bounded = await db.scalar(select(func.count()).select_from(_rows(query).limit(threshold + 1).subquery()))
+    if bounded <= threshold:
+        return bounded, True
+
+    total = await _table_estimate(db, query)
+    if total is None:
+        total = await db.scalar(select(func.count()).select_from(_rows(query).subquery()))
+    # Statistics can lag behind; never report fewer rows than were just seen
+    total = max(int(total), bounded)
+    await totals.set(key, total, settings.COUNT_CACHE_TTL_SECONDS)
+    return total, False
+
+
+async def set_total_count(response: Response, db: AsyncSession, query: Select) -> None:
+    total, exact = await total_count(db, query)
+    response.headers[TOTAL_HEADER] = str(total)
+    if not exact:
+        response.headers[APPROXIMATE_HEADER] = "true"
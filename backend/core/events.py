@@ -0,0 +1,202 @@
+"""
+In-process pub/sub for pushing order and payment changes to clients.
+
+Subscribers register for keys such as ``order:42`` or ``customer:7`` and get a
+bounded queue. A subscriber whose queue is full is dropped rather than
+slowing down publishers; the client is expected to reconnect and re-sync.
+
+The transport between publishers and subscribers is pluggable so several
+workers can share events: ``local`` delivers inside the process, ``redis``
+fans out through a Redis pub/sub channel (needs the ``redis`` package).
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import orjson
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = object()
+
+Deliver = Callable[[dict], None]
+
+
+class Subscription:
+    """A client's bounded event queue; ``None`` in the queue means dropped"""
+
+    def __init__(self, keys: List[str], maxsize: int):
+        self.keys = keys
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    def offer(self, event: dict) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def drop(self) -> None:
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self, timeout: Optional[float] = None):
+        """Next event, ``None`` once dropped, or ``TIMEOUT``"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return TIMEOUT
+
+
+class LocalBackend:
+    """Delivers published messages straight back to this process"""
+
+    async def start(self, deliver: Deliver) -> None:
+        self.deliver = deliver
+
+    async def publish(self, message: dict) -> None:
+        self.deliver(message)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisBackend:
+    """Shares events between workers through a Redis pub/sub channel"""
+
+    def __init__(self, url: str, channel: str):
+        self.url = url
+        self.channel = channel
+        self.redis = None
+        self.listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("EVENTS_BACKEND=redis requires the 'redis' package") from e
+        self.redis = redis.from_url(self.url)
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        self.listener = asyncio.create_task(self._listen(pubsub, deliver))
+
+    async def _listen(self, pubsub, deliver: Deliver) -> None:
+        async for message in pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            try:
+                deliver(orjson.loads(message["data"]))
+            except Exception:
+                logger.exception("Dropping malformed event from %s", self.channel)
+
+    async def publish(self, message: dict) -> None:
+        await self.redis.publish(self.channel, orjson.dumps(message))
+
+    async def close(self) -> None:
+        if self.listener:
+            self.listener.cancel()
+        if self.redis:
+            await self.redis.aclose()
+
+
+class EventBroker:
+    def __init__(self, backend, queue_size: int):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._started = False
+        self._start_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        if self._started:
+            return
+        async with self._start_lock:
+            if not self._started:
+                await self.backend.start(self._deliver)
+                self._started = True
+
+    async def close(self) -> None:
+        if self._started:
+            await self.backend.close()
+            self._started = False
+
+    async def subscribe(self, keys: Iterable[str]) -> Subscription:
+        await self.start()
+        subscription = Subscription(list(keys), self.queue_size)
+        for key in subscription.keys:
+            self.subscribers[key].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for key in subscription.keys:
+            bucket = self.subscribers.get(key)
+            if bucket is not None:
+                bucket.discard(subscription)
+                if not bucket:
+                    del self.subscribers[key]
+
+    async def publish(self, keys: Iterable[str], event: dict) -> None:
+        """Publish ``event`` to every subscriber of any of ``keys``.
+
+        Never raises: events are best-effort notifications sent after the
+        database commit, so a broken transport must not fail the request.
+        """
+        try:
+            await self.start()
+            await self.backend.publish({"keys": list(keys), "event": event})
+        except Exception:
+            logger.exception("Failed to publish %s event", event.get("type"))
+
+    def _deliver(self, message: dict) -> None:
+        targets = set()
+        for key in message["keys"]:
+            targets |= self.subscribers.get(key, set())
+        for subscription in targets:
+            if not subscription.offer(message["event"]):
+                logger.warning("Dropping slow event subscriber for %s", subscription.keys)
+                self.unsubscribe(subscription)
+                subscription.drop()
+
+
+def _create_backend():
+    if settings.EVENTS_BACKEND == "redis":
+        return RedisBackend(settings.EVENTS_REDIS_URL, settings.EVENTS_REDIS_CHANNEL)
+    return LocalBackend()
+
+
+broker = EventBroker(_create_backend(), settings.EVENTS_QUEUE_SIZE)
+
+
+def order_keys(order_id: int, customer_id: Optional[int]) -> List[str]:
+    keys = [f"order:{order_id}"]
+    if customer_id:
+        keys.append(f"customer:{customer_id}")
+    return keys
+
+
+def change_key(entity: str) -> str:
+    """Key that change-feed long-polls wait on for ``entity`` writes"""
+    return f"changes:{entity}"
+
+
+async def publish_change(entity: str, event: dict) -> None:
+    await broker.publish([change_key(entity)], event)
+
+
+async def publish_order_event(event_type: str, order, entity: str = "orders", **extra) -> None:
+    """Notify subscribers of ``order``, of its customer and of the change feed"""
+    event = {
+        "type": event_type,
+        "order_id": order.id,
+        "customer_id": order.customer_id,
+        "status": order.status,
+        "updated_at": order.updated_at.isoformat() if order.updated_at else None,
+        **extra,
+    }
+    await broker.publish(order_keys(order.id, order.customer_id) + [change_key(entity)], event)
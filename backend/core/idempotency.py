@@ -0,0 +1,326 @@
+"""
+Idempotency keys for v1 POST endpoints.
+
+A client that sends ``Idempotency-Key: <unique value>`` with a POST gets the
+stored response back if it retries the same request, without the handler
+running again. Keys live in the ``idempotency_keys`` table (shared between
+workers) with a small per-process LRU in front; a background sweeper deletes
+expired keys.
+
+Keys are scoped to the caller (the user of the bearer token, or the client
+address for anonymous requests), so two clients picking the same key don't
+collide. A key reused with a different method, path or body is rejected with
+422, and a retry that arrives while the original request is still running
+gets 409. Replays carry the original status, body and headers (``ETag``,
+``Location``, ...), except hop-by-hop ones, ``Set-Cookie`` and ``Date``. The claim is a lease: if the request holding it has not finished
+after ``IDEMPOTENCY_LEASE_SECONDS`` (its worker crashed or was restarted),
+the next retry takes the key over and runs the request. Responses with a 5xx
+status are not stored so the request can be retried.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+
+from core.config import settings
+from db import AsyncSessionLocal
+from models.idempotency import IdempotencyKey
+from utils.security import bearer_user_id
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+EXCLUDED_PREFIXES = ("/v1/auth/",)  # never persist issued tokens
+MAX_KEY_LENGTH = 255
+SWEEP_BATCH_SIZE = 1000
+
+# Response headers that describe the connection or this one response, not the result
+UNSTORED_HEADERS = {
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization", b"te", b"trailer",
+    b"transfer-encoding", b"upgrade", b"set-cookie", b"date", b"content-length", b"idempotent-replayed",
+}
+
+Headers = List[Tuple[bytes, bytes]]
+# (fingerprint, status_code, headers, body, expires_at monotonic)
+CachedResponse = Tuple[str, int, Headers, bytes, float]
+
+
+class ResponseLRU:
+    """Bounded per-process cache of completed responses"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[4] < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+response_cache = ResponseLRU(settings.IDEMPOTENCY_CACHE_SIZE)
+
+
+def _ttl() -> timedelta:
+    return timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+
+
+def _lease() -> timedelta:
+    return timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+
+
+def _claim_time() -> datetime:
+    # Whole seconds, as DATETIME stores them, so the claim can be matched exactly
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def scoped_key(scope, key: str) -> str:
+    """Stored form of ``key``: a digest of the caller and the key"""
+    user_id = bearer_user_id(scope["headers"])
+    if user_id is not None:
+        caller = f"user:{user_id}"
+    else:
+        client = scope.get("client")
+        caller = f"client:{client[0] if client else ''}"
+    return hashlib.sha256(f"{caller}\0{key}".encode()).hexdigest()
+
+
+def request_fingerprint(method: str, path: str, query: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query, body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _stored_headers(headers: Iterable[Tuple[bytes, bytes]]) -> Headers:
+    return [(name.lower(), value) for name, value in headers if name.lower() not in UNSTORED_HEADERS]
+
+
+def _dump_headers(headers: Headers) -> list:
+    return [[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers]
+
+
+def _load_headers(record: IdempotencyKey) -> Headers:
+    if record.response_headers is None:
+        # Stored before headers were kept
+        return [(b"content-type", (record.content_type or "application/json").encode("latin-1"))]
+    return [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record.response_headers]
+
+
+def _content_type(headers: Headers) -> Optional[str]:
+    return next((value.decode("latin-1") for name, value in headers if name == b"content-type"), None)
+
+
+async def _send_json(send, status: int, content: dict) -> None:
+    await _send_raw(send, status, [(b"content-type", b"application/json")], orjson.dumps(content))
+
+
+async def _send_raw(send, status: int, headers: Headers, body: bytes, replayed: bool = False) -> None:
+    headers = headers + [(b"content-length", str(len(body)).encode())]
+    if replayed:
+        headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _in_progress(send) -> None:
+    await _send_json(send, 409, {"detail": "A request with this Idempotency-Key is in progress"})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith("/v1/")
+            or scope["path"].startswith(EXCLUDED_PREFIXES)
+        ):
+            return await self.app(scope, receive, send)
+
+        raw_key = dict(scope["headers"]).get(HEADER)
+        if raw_key is None:
+            return await self.app(scope, receive, send)
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await _send_json(send, 400, {"detail": "Invalid Idempotency-Key header"})
+        key = scoped_key(scope, key)
+
+        body = await _read_body(receive)
+        fingerprint = request_fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body)
+
+        cached = response_cache.get(key)
+        if cached:
+            if cached[0] != fingerprint:
+                return await _send_json(send, 422, {"detail": "Idempotency-Key was used with a different request"})
+            return await _send_raw(send, cached[1], cached[2], cached[3], replayed=True)
+
+        claimed_at = _claim_time()
+        conflict = await self._reserve(key, fingerprint, claimed_at)
+        if conflict is not None:
+            return await conflict(send)
+
+        status_code, headers, chunks = 500, [], []
+
+        async def replay_receive():
+            nonlocal body
+            if body is None:
+                return await receive()
+            message = {"type": "http.request", "body": body, "more_body": False}
+            body = None
+            return message
+
+        async def capture_send(message):
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = _stored_headers(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            await self._complete(key, fingerprint, claimed_at, status_code, headers, b"".join(chunks))
+
+    async def _reserve(self, key: str, fingerprint: str, claimed_at: datetime):
+        """Claim ``key`` for this request, or return a responder for the existing claim"""
+        async with AsyncSessionLocal() as db:
+            for _ in range(2):
+                record = (await db.execute(select(IdempotencyKey).where(IdempotencyKey.key == key))).scalar_one_or_none()
+                if record is not None and record.expires_at.replace(tzinfo=timezone.utc) <= claimed_at:
+                    await db.delete(record)
+                    await db.commit()
+                    record = None
+                if record is not None:
+                    if record.status_code is None and record.fingerprint == fingerprint and self._lease_expired(record, claimed_at):
+                        return await self._take_over(db, record, claimed_at)
+                    return self._existing(key, record, fingerprint)
+
+                db.add(IdempotencyKey(key=key, fingerprint=fingerprint, claimed_at=claimed_at, expires_at=claimed_at + _ttl()))
+                try:
+                    await db.commit()
+                    return None
+                except IntegrityError:
+                    # A concurrent retry claimed it first; read its claim
+                    await db.rollback()
+        return _in_progress
+
+    @staticmethod
+    def _lease_expired(record: IdempotencyKey, now: datetime) -> bool:
+        return record.claimed_at.replace(tzinfo=timezone.utc) <= now - _lease()
+
+    async def _take_over(self, db, record: IdempotencyKey, claimed_at: datetime):
+        """Claim a key whose previous holder never finished; None on success"""
+        # Conditional on the old claim, so only one of several retries wins
+        result = await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == record.id, IdempotencyKey.status_code.is_(None), IdempotencyKey.claimed_at == record.claimed_at)
+            .values(claimed_at=claimed_at, expires_at=claimed_at + _ttl())
+        )
+        await db.commit()
+        if result.rowcount != 1:
+            return _in_progress
+        logger.warning("Idempotency-Key claim from %s expired; taken over by a retry", record.claimed_at)
+        return None
+
+    def _existing(self, key: str, record: IdempotencyKey, fingerprint: str):
+        if record.fingerprint != fingerprint:
+            return lambda send: _send_json(send, 422, {"detail": "Idempotency-Key was used with a different request"})
+        if record.status_code is None:
+            return _in_progress
+        body = record.response_body or b""
+        headers = _load_headers(record)
+        response_cache.put(key, (fingerprint, record.status_code, headers, body, self._cache_deadline(record)))
+        return lambda send: _send_raw(send, record.status_code, headers, body, replayed=True)
+
+    @staticmethod
+    def _cache_deadline(record: IdempotencyKey) -> float:
+        remaining = (record.expires_at.replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)).total_seconds()
+        return time.monotonic() + max(0.0, remaining)
+
+    async def _complete(self, key: str, fingerprint: str, claimed_at: datetime, status_code: int, headers: Headers, body: bytes) -> None:
+        try:
+            # Only while this request still holds the claim (see _take_over)
+            ours = (IdempotencyKey.key == key, IdempotencyKey.claimed_at == claimed_at)
+            async with AsyncSessionLocal() as db:
+                if status_code >= 500:
+                    result = await db.execute(delete(IdempotencyKey).where(*ours))
+                else:
+                    result = await db.execute(
+                        update(IdempotencyKey)
+                        .where(*ours)
+                        .values(status_code=status_code, content_type=_content_type(headers), response_headers=_dump_headers(headers),
+                                response_body=body)
+                    )
+                await db.commit()
+            if result.rowcount != 1:
+                logger.warning("Idempotency-Key lease lost before the request finished; response not stored")
+            elif status_code < 500:
+                deadline = time.monotonic() + _ttl().total_seconds()
+                response_cache.put(key, (fingerprint, status_code, headers, body, deadline))
+        except Exception:
+            logger.exception("Failed to store response for Idempotency-Key %s", key)
+
+
+async def sweep_expired() -> int:
+    """Delete expired keys in small batches; returns the number removed"""
+    removed = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            ids = (await db.execute(
+                select(IdempotencyKey.id)
+                .where(IdempotencyKey.expires_at < datetime.now(timezone.utc))
+                .limit(SWEEP_BATCH_SIZE)
+            )).scalars().all()
+            if not ids:
+                break
+            await db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+            await db.commit()
+            removed += len(ids)
+    return removed
+
+
+async def run_sweeper() -> None:
+    while True:
+        try:
+            removed = await sweep_expired()
+            if removed:
+                logger.info("Removed %d expired idempotency keys", removed)
+        except Exception:
+            logger.exception("Idempotency key sweep failed")
+        await asyncio.sleep(settings.IDEMPOTENCY_SWEEP_INTERVAL_SECONDS)
@@ -0,0 +1,201 @@
+"""
+Request metrics in the Prometheus text exposition format.
+
+``MetricsMiddleware`` records, per templated route (``/v1/orders/{order_id}``
+rather than the raw path), request counts by status code and a latency
+histogram. Counters are plain per-worker dicts updated from the event loop
+thread, so no locking is needed; with several workers each process exposes
+its own series. ``render_metrics()`` adds database connection pool gauges and
+the application cache, request coalescing and audit writer counters.
+"""
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import db
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<unmatched>"
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # charset is appended by the response
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self.durations: Dict[Tuple[str, str], Histogram] = {}
+        self.in_progress = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        self.requests[(method, route, str(status))] += 1
+        histogram = self.durations.get((method, route))
+        if histogram is None:
+            histogram = self.durations[(method, route)] = Histogram()
+        histogram.observe(seconds)
+
+
+registry = MetricsRegistry()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry.in_progress += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            registry.in_progress -= 1
+            registry.observe(scope["method"], route_template(scope), status_code, time.perf_counter() - start)
+
+
+def _pool_gauges() -> List[Tuple[str, str, float]]:
+    pool = db.engine.sync_engine.pool
+    gauges = []
+    for name, attr, help_text in (
+        ("db_pool_size", "size", "Configured connection pool size"),
+        ("db_pool_checked_out", "checkedout", "Connections currently in use"),
+        ("db_pool_checked_in", "checkedin", "Idle connections in the pool"),
+        ("db_pool_overflow", "overflow", "Connections opened beyond the pool size"),
+    ):
+        method = getattr(pool, attr, None)
+        if callable(method):
+            # QueuePool counts overflow from -pool_size; report only real overflow
+            value = max(0, method()) if attr == "overflow" else method()
+            gauges.append((name, help_text, value))
+    return gauges
+
+
+def _cache_lines() -> List[str]:
+    from core.cache import cache
+
+    stats, backend = cache.stats, cache.backend
+    lines = [
+        "# HELP cache_requests_total Cache lookups by result",
+        "# TYPE cache_requests_total counter",
+        f"cache_requests_total{_labels(backend=backend.name, result='hit')} {stats.hits}",
+        f"cache_requests_total{_labels(backend=backend.name, result='miss')} {stats.misses}",
+    ]
+    counters = (
+        ("cache_sets_total", "Values stored", stats.sets),
+        ("cache_invalidations_total", "Entries dropped by tag invalidation", stats.invalidations),
+        ("cache_errors_total", "Backend errors (treated as misses)", stats.errors),
+        ("cache_evictions_total", "Entries evicted to stay within the size limits", getattr(backend, "evictions", 0)),
+        ("cache_expirations_total", "Entries dropped after their TTL", getattr(backend, "expirations", 0)),
+    )
+    for name, help_text, value in counters:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name}{_labels(backend=backend.name)} {value}"]
+    for gauge, value in backend.gauges().items():
+        lines += [f"# HELP cache_{gauge} Cache {gauge} currently held", f"# TYPE cache_{gauge} gauge", f"cache_{gauge}{_labels(backend=backend.name)} {value}"]
+    return lines
+
+
+def _singleflight_lines() -> List[str]:
+    from core.singleflight import group
+
+    return [
+        "# HELP singleflight_calls_total Coalesced route calls by role (leader ran the handler, follower shared its result)",
+        "# TYPE singleflight_calls_total counter",
+        f"singleflight_calls_total{_labels(role='leader')} {group.leaders}",
+        f"singleflight_calls_total{_labels(role='follower')} {group.followers}",
+        "# HELP singleflight_in_flight Coalesced calls currently running",
+        "# TYPE singleflight_in_flight gauge",
+        f"singleflight_in_flight {group.in_flight}",
+    ]
+
+
+def _audit_lines() -> List[str]:
+    from core.audit import writer
+
+    lines = [
+        "# HELP audit_entries_total Audit entries by outcome",
+        "# TYPE audit_entries_total counter",
+    ]
+    for outcome, value in (("queued", writer.recorded), ("dropped", writer.dropped), ("written", writer.written), ("failed", writer.failed)):
+        lines.append(f"audit_entries_total{_labels(outcome=outcome)} {value}")
+    return lines + [
+        "# HELP audit_entries_pending Audit entries waiting to be written",
+        "# TYPE audit_entries_pending gauge",
+        f"audit_entries_pending {writer.pending}",
+    ]
+
+
+def render_metrics() -> str:
+    lines = [
+        "# HELP http_requests_total Requests by method, route template and status code",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route, status), count in sorted(registry.requests.items()):
+        lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    lines += [
+        "# HELP http_request_duration_seconds Request latency by method and route template",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route), histogram in sorted(registry.durations.items()):
+        for bound, count in histogram.cumulative():
+            lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} {count}")
+        labels = _labels(method=method, route=route)
+        lines.append(f"http_request_duration_seconds_sum{labels} {histogram.sum}")
+        lines.append(f"http_request_duration_seconds_count{labels} {histogram.count}")
+
+    lines += [
+        "# HELP http_requests_in_progress Requests currently being handled",
+        "# TYPE http_requests_in_progress gauge",
+        f"http_requests_in_progress {registry.in_progress}",
+    ]
+    for name, help_text, value in _pool_gauges():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+    lines += _cache_lines()
+    lines += _singleflight_lines()
+    lines += _audit_lines()
+    return "\n".join(lines) + "\n"
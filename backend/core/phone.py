@@ -0,0 +1,41 @@
+"""
+Phone number normalization.
+
+Phones are stored as typed in ``users.phone``; every lookup goes through the
+E.164-style key in ``users.phone_key`` so "+977 984-1234567", "009779841234567"
+and "9841234567" all resolve to the same user.
+"""
+import re
+from typing import Optional
+
+from core.config import settings
+
+_non_digits_re = re.compile(r"\D+")
+
+E164_MAX_DIGITS = 15
+MIN_DIGITS = 6
+
+
+def normalize_phone(phone: Optional[str], strict: bool = True) -> str:
+    """Return the ``+<country code><number>`` key for ``phone``.
+
+    Numbers without an international prefix are assumed to be national numbers
+    of ``PHONE_DEFAULT_COUNTRY_CODE``; a leading trunk ``0`` is dropped. With
+    ``strict=False`` partial input (e.g. a search prefix) is accepted.
+    """
+    raw = (phone or "").strip()
+    digits = _non_digits_re.sub("", raw)
+    country_code = settings.PHONE_DEFAULT_COUNTRY_CODE
+
+    if raw.startswith("+"):
+        key = digits
+    elif digits.startswith("00"):
+        key = digits[2:]
+    elif digits.startswith(country_code) and len(digits) > settings.PHONE_NATIONAL_LENGTH:
+        key = digits
+    else:
+        key = country_code + digits.lstrip("0")
+
+    if strict and not (MIN_DIGITS <= len(key) <= E164_MAX_DIGITS):
+        raise ValueError("Invalid phone number")
+    return "+" + key
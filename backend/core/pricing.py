@@ -0,0 +1,116 @@
+"""
+Precomputed repair price table for estimates.
+
+Active cost settings are loaded once into ``device_type_id -> problem_id ->
+PriceEntry`` so an estimate for several problems is a handful of dict lookups.
+Problem and cost setting writes refresh the affected problem in place; a full
+reload every ``PRICE_TABLE_TTL_SECONDS`` picks up writes made by other workers.
+When a problem has several active cost settings the newest one wins.
+"""
+import asyncio
+import time
+from decimal import Decimal
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from models.problem import Problem, CostSetting
+
+ZERO = Decimal("0.00")
+
+
+class PriceEntry(NamedTuple):
+    problem_id: int
+    name: str
+    base_cost: Decimal
+    min_cost: Decimal
+    max_cost: Decimal
+
+
+def _price_query():
+    return (
+        select(
+            Problem.id, Problem.device_type_id, Problem.name,
+            CostSetting.base_cost, CostSetting.min_cost, CostSetting.max_cost,
+        )
+        .join(CostSetting, CostSetting.problem_id == Problem.id)
+        .where(CostSetting.is_active.is_(True))
+        .order_by(CostSetting.id)
+    )
+
+
+def _entry(row) -> PriceEntry:
+    base = row.base_cost or ZERO
+    return PriceEntry(
+        problem_id=row.id,
+        name=row.name,
+        base_cost=base,
+        min_cost=base if row.min_cost is None else row.min_cost,
+        max_cost=base if row.max_cost is None else row.max_cost,
+    )
+
+
+class PriceTable:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.by_type: Dict[int, Dict[int, PriceEntry]] = {}
+        self.problem_types: Dict[int, int] = {}
+        self.loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl_seconds
+
+    def _put(self, device_type_id: int, entry: PriceEntry) -> None:
+        self.discard(entry.problem_id)
+        self.by_type.setdefault(device_type_id, {})[entry.problem_id] = entry
+        self.problem_types[entry.problem_id] = device_type_id
+
+    def discard(self, problem_id: int) -> None:
+        device_type_id = self.problem_types.pop(problem_id, None)
+        if device_type_id is None:
+            return
+        prices = self.by_type.get(device_type_id)
+        if prices is not None:
+            prices.pop(problem_id, None)
+            if not prices:
+                del self.by_type[device_type_id]
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if not self._stale():
+            return
+        async with self._lock:
+            if not self._stale():
+                return
+            rows = (await db.execute(_price_query())).all()
+            self.by_type, self.problem_types = {}, {}
+            for row in rows:
+                self._put(row.device_type_id, _entry(row))
+            self.loaded_at = time.monotonic()
+
+    async def refresh_problem(self, db: AsyncSession, problem_id: int) -> None:
+        """Re-read one problem's price after a write to it or its cost settings"""
+        if self.loaded_at is None:
+            return
+        rows = (await db.execute(_price_query().where(Problem.id == problem_id))).all()
+        if rows:
+            self._put(rows[-1].device_type_id, _entry(rows[-1]))
+        else:
+            self.discard(problem_id)
+
+    def estimate(self, device_type_id: int, problem_ids: Iterable[int]) -> Tuple[List[PriceEntry], List[int]]:
+        """Priced entries and the ids with no active price for this device type"""
+        prices = self.by_type.get(device_type_id, {})
+        items, missing = [], []
+        for problem_id in dict.fromkeys(problem_ids):
+            entry = prices.get(problem_id)
+            if entry is None:
+                missing.append(problem_id)
+            else:
+                items.append(entry)
+        return items, missing
+
+
+price_table = PriceTable(settings.PRICE_TABLE_TTL_SECONDS)
@@ -0,0 +1,250 @@
+"""
+On-demand sampling profiler for single requests.
+
+An admin sends ``X-Profile: 1`` (or adds ``?__profile``) to any request. While
+it runs, a background thread samples the event loop thread's stack every
+``PROFILE_INTERVAL_MS`` and keeps only the samples taken while this request's
+coroutine is executing, so concurrent requests do not pollute the profile.
+Time spent awaiting the database does not show up in stack samples; it is
+taken from ``core.sqlstats`` and added as ``[db] <statement>`` frames.
+
+The result is written to ``PROFILE_DIR`` in folded-stack format (one
+``frame;frame;frame weight`` line per stack, weights in microseconds), which
+flamegraph.pl, speedscope and inferno read directly, and its id is returned in
+``X-Profile-Id``. Each sample is weighted by the time since the previous one
+because the sampler only runs when it gets the GIL.
+Profiling is rate limited per worker (``PROFILE_MAX_PER_MINUTE``, one at a
+time), so it can stay enabled in production. Non-admin requests asking for a
+profile are served normally.
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs
+
+import orjson
+from sqlalchemy import select
+
+from core import sqlstats
+from core.config import settings
+from db import AsyncSessionLocal
+from models.user import User
+from utils.dependencies import ADMIN_ROLE, user_has_role
+from utils.security import bearer_user_id
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_PARAM = "__profile"
+
+
+def profile_dir() -> Path:
+    return Path(settings.PROFILE_DIR or os.path.join(tempfile.gettempdir(), "repair-profiles"))
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Samples ``thread_id`` and weights stacks found below ``marker`` by elapsed time"""
+
+    def __init__(self, thread_id: int, marker, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.marker = marker
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.sampled_time = 0.0
+        self.done = threading.Event()
+
+    def run(self) -> None:
+        last = time.perf_counter()
+        while not self.done.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None and frame is not self.marker:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if frame is None or not labels:
+                continue  # request not running right now
+            self.samples += 1
+            self.sampled_time += elapsed
+            self.stacks[";".join(reversed(labels))] += int(elapsed * 1_000_000)
+
+    def stop(self) -> None:
+        self.done.set()
+        self.join()
+
+
+class RateLimiter:
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.started = deque()
+        self.active = False
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        while self.started and now - self.started[0] > 60:
+            self.started.popleft()
+        if self.active or len(self.started) >= self.per_minute:
+            return False
+        self.started.append(now)
+        self.active = True
+        return True
+
+    def release(self) -> None:
+        self.active = False
+
+    def cancel(self) -> None:
+        """Give back a slot taken by ``acquire`` for a request that isn't profiled"""
+        if self.started:
+            self.started.pop()
+        self.active = False
+
+
+rate_limiter = RateLimiter(settings.PROFILE_MAX_PER_MINUTE)
+
+
+def profile_requested(scope) -> bool:
+    if dict(scope["headers"]).get(PROFILE_HEADER, b"").strip() in (b"1", b"true"):
+        return True
+    query = scope.get("query_string", b"").decode("latin-1")
+    return PROFILE_PARAM in parse_qs(query, keep_blank_values=True)
+
+
+async def is_admin(user_id: int) -> bool:
+    async with AsyncSessionLocal() as db:
+        active = await db.scalar(select(User.is_active).where(User.id == user_id))
+        return bool(active) and await user_has_role(db, user_id, ADMIN_ROLE)
+
+
+def _write_profile(profile_id: str, meta: dict, folded: str) -> None:
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f"{profile_id}.folded").write_text(folded)
+    (directory / f"{profile_id}.json").write_bytes(orjson.dumps(meta))
+
+    metas = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for old in metas[:max(0, len(metas) - settings.PROFILE_KEEP)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".folded").unlink(missing_ok=True)
+
+
+def list_profiles(limit: int = 50) -> list:
+    directory = profile_dir()
+    if not directory.exists():
+        return []
+    metas = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return [orjson.loads(p.read_bytes()) for p in metas[:limit]]
+
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    try:
+        uuid.UUID(profile_id)
+    except ValueError:
+        return None
+    path = profile_dir() / f"{profile_id}.folded"
+    return path if path.exists() else None
+
+
+class ProfilingMiddleware:
+    """Must run inside ``QueryStatsMiddleware`` to attribute database time"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profile_requested(scope):
+            return await self.app(scope, receive, send)
+        user_id = bearer_user_id(scope["headers"])
+        if user_id is None:
+            return await self.app(scope, receive, send)
+        # Before the admin lookup, so a flood of profile requests costs no queries
+        if not rate_limiter.acquire():
+            return await self.app(scope, receive, self._with_header(send, b"x-profile-skipped", b"rate limited"))
+        try:
+            admin = await is_admin(user_id)
+        except BaseException:
+            rate_limiter.cancel()
+            raise
+        if not admin:
+            rate_limiter.cancel()
+            return await self.app(scope, receive, send)
+
+        profile_id = str(uuid.uuid4())
+        status_code = 500
+        request_stats = sqlstats.current_request.get()
+        db_time, db_queries = (request_stats.db_time, request_stats.count) if request_stats else (0.0, 0)
+        shape_time = dict(request_stats.shape_time) if request_stats else {}
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await self._with_header(send, b"x-profile-id", profile_id.encode())(message)
+
+        interval = settings.PROFILE_INTERVAL_MS / 1000
+        sampler = StackSampler(threading.get_ident(), sys._getframe(), interval)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            wall = time.perf_counter() - start
+            rate_limiter.release()
+            try:
+                await self._store(profile_id, scope, status_code, wall, sampler, request_stats, db_time, db_queries, shape_time)
+            except Exception:
+                logger.exception("Failed to store profile %s", profile_id)
+
+    @staticmethod
+    def _with_header(send, name: bytes, value: bytes):
+        async def wrapped(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [(name, value)]}
+            await send(message)
+        return wrapped
+
+    async def _store(self, profile_id, scope, status_code, wall, sampler, request_stats, db_before, queries_before, shape_before):
+        route = getattr(scope.get("route"), "path", None) or scope["path"]
+        root = f"{scope['method']} {route}"
+        lines = [f"{root};{stack} {count}" for stack, count in sampler.stacks.items()]
+
+        db_time, db_queries = 0.0, 0
+        if request_stats is not None:
+            db_time = request_stats.db_time - db_before
+            db_queries = request_stats.count - queries_before
+            for shape, seconds in request_stats.shape_time.items():
+                weight = int((seconds - shape_before.get(shape, 0.0)) * 1_000_000)
+                if weight > 0:
+                    lines.append(f"{root};[db] {shape.replace(';', ',')} {weight}")
+
+        meta = {
+            "id": profile_id,
+            "method": scope["method"],
+            "route": route,
+            "path": scope["path"],
+            "status_code": status_code,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "wall_ms": round(wall * 1000, 3),
+            "cpu_sampled_ms": round(sampler.sampled_time * 1000, 3),
+            "db_ms": round(db_time * 1000, 3),
+            "db_queries": db_queries,
+            "samples": sampler.samples,
+            "interval_ms": settings.PROFILE_INTERVAL_MS,
+        }
+        await asyncio.to_thread(_write_profile, profile_id, meta, "\n".join(lines) + "\n")
@@ -0,0 +1,239 @@
+"""
+Customer and device search.
+
+Two backends are supported, selected by ``settings.SEARCH_BACKEND``:
+
+* ``mysql``  - index-driven SQL lookups (FULLTEXT on ``users.full_name`` and
+  left-anchored ``LIKE`` on the indexed ``phone_key``, ``email`` and
+  ``serial_number`` columns).
+* ``ngram``  - an in-process n-gram index kept in memory, which also supports
+  infix matches ("4567" finds "9841234567"). Meant for small deployments:
+  each worker builds its own index and a write only updates the index of the
+  worker that handled it, so ``serve.py`` only allows it with a single worker.
+"""
+import asyncio
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.phone import normalize_phone
+
+# Relative weight of a match per field; exact > prefix > infix is applied on top.
+FIELD_WEIGHTS = {
+    "phone": 1.0,
+    "serial_number": 1.0,
+    "email": 0.9,
+    "full_name": 0.8,
+}
+
+MATCH_SCORES = {"exact": 3.0, "prefix": 2.0, "infix": 1.0}
+
+_digits_re = re.compile(r"\D+")
+_space_re = re.compile(r"\s+")
+
+Hit = Tuple[str, int]  # (kind, id)
+
+
+def normalize_text(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return _space_re.sub(" ", value.strip().lower())
+
+
+def normalize_digits(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return _digits_re.sub("", value)
+
+
+def phone_query(query: str) -> str:
+    """Digits of ``query`` when it looks like a phone number, else empty"""
+    if any(c.isalpha() for c in query):
+        return ""
+    return normalize_digits(query)
+
+
+def phone_key_digits(value: Optional[str]) -> str:
+    """Digits of the phone key, so national and international forms compare equal"""
+    if not value:
+        return ""
+    return normalize_phone(value, strict=False)[1:]
+
+
+def phone_queries(query: str) -> Tuple[str, ...]:
+    """What a query is matched against phones with: its key form (for prefix and
+    exact matches), and its plain digits (so "4567" still finds the number's end)"""
+    digits = phone_query(query)
+    if not digits:
+        return ()
+    key = phone_key_digits(query)
+    return (key, digits) if key != digits else (key,)
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def score_match(field: str, value: str, query: str) -> float:
+    """Score how well ``query`` matches ``value`` (both already normalized)"""
+    if not value or not query:
+        return 0.0
+    if value == query:
+        kind = "exact"
+    elif value.startswith(query) or (" " + query) in value:
+        kind = "prefix"
+    elif query in value:
+        kind = "infix"
+    else:
+        return 0.0
+    return MATCH_SCORES[kind] * FIELD_WEIGHTS.get(field, 0.5)
+
+
+def field_values(kind: str, obj) -> Dict[str, str]:
+    """Normalized searchable fields of a User or Device"""
+    if kind == "user":
+        return {
+            "full_name": normalize_text(obj.full_name),
+            "phone": phone_key_digits(obj.phone),
+            "email": normalize_text(obj.email),
+        }
+    return {"serial_number": normalize_text(obj.serial_number)}
+
+
+def score_fields(fields: Dict[str, str], text_q: str, phone_qs: Tuple[str, ...]) -> Tuple[float, Optional[str]]:
+    """Best (score, field) over normalized ``fields``"""
+    best, best_field = 0.0, None
+    for field, value in fields.items():
+        queries = phone_qs if field == "phone" else (text_q,)
+        score = max((score_match(field, value, q) for q in queries), default=0.0)
+        if score > best:
+            best, best_field = score, field
+    return best, best_field
+
+
+def rank(kind: str, obj, query: str) -> Tuple[float, Optional[str]]:
+    """Best (score, field) for ``obj`` against the raw query"""
+    return score_fields(field_values(kind, obj), normalize_text(query), phone_queries(query))
+
+
+class NgramIndex:
+    """In-memory n-gram inverted index over users and devices.
+
+    Every field value is split into overlapping n-grams; a query matches a
+    document when all of its n-grams are present, which is then verified with
+    a substring check. Queries shorter than ``n`` fall back to token-prefix
+    postings so "ra" still finds "Ram".
+    """
+
+    def __init__(self, n: int = 3):
+        self.n = n
+        self.postings: Dict[str, Set[Hit]] = defaultdict(set)
+        self.docs: Dict[Hit, Dict[str, str]] = {}
+        self.loaded = False
+        self._lock = asyncio.Lock()
+
+    def _grams(self, value: str) -> Set[str]:
+        grams = set()
+        for token in value.split(" "):
+            for i in range(1, min(self.n, len(token) + 1)):
+                grams.add("^" + token[:i])
+        for i in range(len(value) - self.n + 1):
+            grams.add(value[i:i + self.n])
+        return grams
+
+    def add(self, kind: str, obj) -> None:
+        key = (kind, obj.id)
+        self.remove(kind, obj.id)
+        fields = {f: v for f, v in field_values(kind, obj).items() if v}
+        self.docs[key] = fields
+        for value in fields.values():
+            for gram in self._grams(value):
+                self.postings[gram].add(key)
+
+    def remove(self, kind: str, obj_id: int) -> None:
+        key = (kind, obj_id)
+        fields = self.docs.pop(key, None)
+        if not fields:
+            return
+        for value in fields.values():
+            for gram in self._grams(value):
+                bucket = self.postings.get(gram)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self.postings[gram]
+
+    def _candidates(self, query: str) -> Set[Hit]:
+        if not query:
+            return set()
+        if len(query) < self.n:
+            return set(self.postings.get("^" + query, ()))
+        grams = [query[i:i + self.n] for i in range(len(query) - self.n + 1)]
+        buckets = sorted((self.postings.get(g, set()) for g in grams), key=len)
+        result = set(buckets[0])
+        for bucket in buckets[1:]:
+            result &= bucket
+            if not result:
+                break
+        return result
+
+    def search(self, query: str, kinds: Iterable[str], limit: int) -> List[Tuple[Hit, float, str]]:
+        text_q = normalize_text(query)
+        phone_qs = phone_queries(query)
+        candidates = self._candidates(text_q)
+        for phone_q in phone_qs:
+            if phone_q != text_q:
+                candidates |= self._candidates(phone_q)
+
+        kinds = set(kinds)
+        scored = []
+        for key in candidates:
+            if key[0] not in kinds:
+                continue
+            best, best_field = score_fields(self.docs[key], text_q, phone_qs)
+            if best > 0:
+                scored.append((key, best, best_field))
+        scored.sort(key=lambda item: (-item[1], item[0][0], item[0][1]))
+        return scored[:limit]
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if self.loaded:
+            return
+        from models.user import User
+        from models.device import Device
+
+        async with self._lock:
+            if self.loaded:
+                return
+            users = await db.execute(select(User.id, User.full_name, User.phone, User.email))
+            for row in users:
+                self.add("user", row)
+            devices = await db.execute(select(Device.id, Device.serial_number))
+            for row in devices:
+                self.add("device", row)
+            self.loaded = True
+
+
+search_index = NgramIndex(n=settings.SEARCH_NGRAM_SIZE)
+
+
+def index_user(user) -> None:
+    """Keep the n-gram index in sync after a user write"""
+    if search_index.loaded:
+        search_index.add("user", user)
+
+
+def index_device(device) -> None:
+    """Keep the n-gram index in sync after a device write"""
+    if search_index.loaded:
+        search_index.add("device", device)
+
+
+def unindex(kind: str, obj_id: int) -> None:
+    if search_index.loaded:
+        search_index.remove(kind, obj_id)
@@ -0,0 +1,108 @@
+"""
+Request coalescing ("single flight") for hot read endpoints.
+
+When identical requests arrive while one is already being handled, only the
+first runs the handler; the others wait for it and get the same serialized
+body. Requests are identical when they hit the same route with the same
+query and path parameters (see ``core.utils.call_key``), so anything else the
+result depends on, such as the caller, must be a parameter or listed in
+``vary``. Routes opt in with ``coalesce``:
+
+    @router.get("", response_model=List[OrderResponse])
+    @coalesce(model=List[OrderResponse], when=lambda args: args["offset"] == 0)
+    async def list_orders(...):
+
+The handler runs in its own task, so a waiter that disconnects, even the
+one that started it, doesn't cancel the call for the others. For the same
+reason the task opens its own database session in place of the injected
+one, which FastAPI closes when the starting request ends. This only
+merges requests that overlap in time; nothing is kept afterwards (that is
+``core.cache``'s job). Coalescing is per worker process.
+"""
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
+
+import db
+from core.utils import call_key
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of ``fn()``, shared with every concurrent call for ``key``"""
+        task = self.calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = self.calls[key] = asyncio.create_task(fn())
+            task.add_done_callback(functools.partial(self._finished, key))
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, in case every waiter went away
+
+    @property
+    def in_flight(self) -> int:
+        return len(self.calls)
+
+
+group = SingleFlight()
+
+
+def coalesce(
+    model: Any = None,
+    when: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    vary=None,
+    media_type: str = "application/json",
+):
+    """Share one handler call and its JSON body between concurrent identical requests.
+
+    ``model`` serializes the result (e.g. ORM rows) the way ``response_model``
+    would; without it the result must already be JSON-serializable. ``when``
+    limits coalescing to some parameter values. Handlers that return a
+    ``Response`` themselves are not supported.
+    """
+    adapter = TypeAdapter(model) if model is not None else None
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        prefix = f"{func.__module__}.{func.__qualname__}"
+
+        async def render(bound: inspect.BoundArguments) -> bytes:
+            sessions = [name for name, value in bound.arguments.items() if isinstance(value, AsyncSession)]
+            async with db.AsyncSessionLocal() as session:
+                for name in sessions:
+                    bound.arguments[name] = session
+                result = await func(*bound.args, **bound.kwargs)
+                # Serialized before the session closes, in case of lazy loads
+                if adapter is not None:
+                    result = adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json", by_alias=True)
+                return orjson.dumps(result)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if when is not None and not when(bound.arguments):
+                return await func(*args, **kwargs)
+            body = await group.do(call_key(prefix, bound.arguments, vary), lambda: render(bound))
+            return Response(content=body, media_type=media_type)
+
+        return wrapper
+
+    return decorator
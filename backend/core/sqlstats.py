@@ -0,0 +1,282 @@
+"""
+SQL statement timing through SQLAlchemy engine events.
+
+``install(engine)`` hooks ``before_cursor_execute``/``after_cursor_execute``
+and records, for every statement:
+
+* aggregated count / total / max time per normalized fingerprint (literals
+  and bind placeholders replaced by ``?``, ``IN (...)`` lists collapsed), for
+  the ``/debug/queries`` view;
+* the query count and database time of the request that issued it, tracked
+  by ``QueryStatsMiddleware`` in a context variable. Only statements issued
+  by the route (its dependencies and handler) count; those from middleware
+  before the route is resolved or after the response has started, such as
+  the idempotency claim, are left out;
+* a warning on the ``sqlstats.slow`` logger for statements slower than
+  ``SLOW_QUERY_MS``, with the route that issued them. Bind parameters are not
+  logged.
+
+With ``QUERY_BUDGET_MODE`` set to ``warn`` or ``raise`` (meant for development
+and CI) each request is also checked against the budget its route declares
+with ``@query_budget(n)`` (or ``QUERY_BUDGET_DEFAULT``) and for the same
+SELECT shape repeated ``QUERY_REPEAT_THRESHOLD`` times, the usual sign of an
+N+1 loop. Responses then carry an ``X-Query-Count`` header.
+"""
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from core.config import settings
+
+slow_logger = logging.getLogger("sqlstats.slow")
+budget_logger = logging.getLogger("sqlstats.budget")
+
+MAX_FINGERPRINTS = 1000
+OTHER_FINGERPRINT = "<other>"
+
+_string_re = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_number_re = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_placeholder_re = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_in_list_re = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_values_list_re = re.compile(r"\bVALUES\s*(\([?,\s]*\))(?:\s*,\s*\([?,\s]*\))+", re.IGNORECASE)
+_space_re = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    """A request went over its query budget or repeated a statement (raise mode)"""
+
+
+def query_budget(max_queries: int):
+    """Declare the most statements one request to this route may issue"""
+    def decorator(func):
+        func.__query_budget__ = max_queries
+        return func
+    return decorator
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Statement shape with literal values removed"""
+    normalized = _string_re.sub("?", statement)
+    normalized = _placeholder_re.sub("?", normalized)
+    normalized = _number_re.sub("?", normalized)
+    normalized = _in_list_re.sub("IN (...)", normalized)
+    normalized = _values_list_re.sub(r"VALUES \1, ...", normalized)
+    return _space_re.sub(" ", normalized).strip()
+
+
+@dataclass
+class StatementStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+@dataclass
+class RequestStats:
+    """Statements issued while handling one request"""
+    scope: dict
+    count: int = 0
+    db_time: float = 0.0
+    fingerprints: Dict[str, int] = field(default_factory=dict)
+    shape_time: Dict[str, float] = field(default_factory=dict)
+    extra_budget: int = 0
+    route_only: bool = False
+    responded: bool = False
+    over_budget: bool = False
+
+    @property
+    def counting(self) -> bool:
+        """Whether statements issued now belong to this request's route"""
+        return not self.route_only or (self.scope.get("route") is not None and not self.responded)
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope.get("path", "")
+
+    @property
+    def budget(self) -> Optional[int]:
+        endpoint = getattr(self.scope.get("route"), "endpoint", None)
+        budget = getattr(endpoint, "__query_budget__", settings.QUERY_BUDGET_DEFAULT)
+        return None if budget is None else budget + self.extra_budget
+
+
+@dataclass
+class RouteStats:
+    requests: int = 0
+    queries: int = 0
+    db_time: float = 0.0
+    max_queries: int = 0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("sqlstats_request", default=None)
+
+statement_stats: Dict[str, StatementStats] = {}
+route_stats: Dict[str, RouteStats] = {}
+
+
+def _statement_bucket(shape: str) -> StatementStats:
+    stats = statement_stats.get(shape)
+    if stats is None:
+        if len(statement_stats) >= MAX_FINGERPRINTS:
+            shape = OTHER_FINGERPRINT
+        stats = statement_stats.setdefault(shape, StatementStats())
+    return stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._sqlstats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_sqlstats_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    shape = fingerprint(statement)
+    _statement_bucket(shape).add(elapsed)
+
+    request = current_request.get()
+    if request is not None and request.counting:
+        request.count += 1
+        request.db_time += elapsed
+        request.fingerprints[shape] = request.fingerprints.get(shape, 0) + 1
+        request.shape_time[shape] = request.shape_time.get(shape, 0.0) + elapsed
+        if settings.QUERY_BUDGET_MODE != "off":
+            _check_budget(request, shape)
+
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        slow_logger.warning(
+            "Slow query (%.1f ms) on %s: %s",
+            elapsed * 1000,
+            request.route if request is not None else "<no request>",
+            shape,
+        )
+
+
+def _check_budget(request: RequestStats, shape: str) -> None:
+    """Report each problem once per request, when it first happens"""
+    problems = []
+    budget = request.budget
+    if budget is not None and request.count > budget and not request.over_budget:
+        request.over_budget = True
+        problems.append(f"{request.route} issued more than {budget} queries")
+    if shape.startswith("SELECT") and request.fingerprints[shape] == settings.QUERY_REPEAT_THRESHOLD:
+        problems.append(f"{request.route} ran the same query {settings.QUERY_REPEAT_THRESHOLD} times (possible N+1): {shape}")
+    for message in problems:
+        if settings.QUERY_BUDGET_MODE == "raise":
+            raise QueryBudgetExceeded(message)
+        budget_logger.warning(message)
+
+
+def allow_queries(count: int) -> None:
+    """Raise this request's budget for optional work, e.g. a requested total count"""
+    request = current_request.get()
+    if request is not None:
+        request.extra_budget += count
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, label: str = "block"):
+    """Fail if the code in the block issues more than ``max_queries`` statements"""
+    request = RequestStats({"path": label})
+    token = current_request.set(request)
+    try:
+        yield request
+    finally:
+        current_request.reset(token)
+    if request.count > max_queries:
+        shapes = "\n".join(f"  {n} x {shape}" for shape, n in request.fingerprints.items())
+        raise AssertionError(f"{label} issued {request.count} queries, expected at most {max_queries}:\n{shapes}")
+
+
+def install(engine) -> None:
+    """Attach the timing hooks to an (async) engine"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def record_request(request: RequestStats) -> None:
+    stats = route_stats.setdefault(request.route, RouteStats())
+    stats.requests += 1
+    stats.queries += request.count
+    stats.db_time += request.db_time
+    stats.max_queries = max(stats.max_queries, request.count)
+
+
+def top_statements(limit: int = 20, order_by: str = "total") -> List[dict]:
+    ranked = sorted(statement_stats.items(), key=lambda item: getattr(item[1], order_by), reverse=True)
+    return [
+        {
+            "statement": shape,
+            "count": stats.count,
+            "total_ms": round(stats.total * 1000, 3),
+            "avg_ms": round(stats.total * 1000 / stats.count, 3),
+            "max_ms": round(stats.max * 1000, 3),
+        }
+        for shape, stats in ranked[:limit]
+    ]
+
+
+def route_summary() -> List[dict]:
+    ranked = sorted(route_stats.items(), key=lambda item: item[1].db_time, reverse=True)
+    return [
+        {
+            "route": route,
+            "requests": stats.requests,
+            "avg_queries": round(stats.queries / stats.requests, 2),
+            "max_queries": stats.max_queries,
+            "avg_db_ms": round(stats.db_time * 1000 / stats.requests, 3),
+        }
+        for route, stats in ranked
+    ]
+
+
+def reset() -> None:
+    statement_stats.clear()
+    route_stats.clear()
+
+
+class QueryStatsMiddleware:
+    """Tracks the statements issued by each HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request = RequestStats(scope, route_only=True)
+        token = current_request.set(request)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                request.responded = True
+                if settings.QUERY_BUDGET_MODE != "off":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-query-count", str(request.count).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            record_request(request)
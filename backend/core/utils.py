@@ -1,8 +1,15 @@
 """
 Core utilities
 """
-from typing import Any, Dict
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Iterable, Optional
 import orjson
+from sqlalchemy.exc import IntegrityError
+
+SCALAR_TYPES = (str, int, float, bool, type(None), Enum, Decimal, date, datetime)
 
 
 def json_response(data: Any) -> bytes:
@@ -16,3 +23,37 @@ def validate_input(data: Dict, required_fields: list) -> tuple[bool, str]:
     if missing_fields:
         return False, f"Missing required fields: {', '.join(missing_fields)}"
     return True, ""
+
+
+# MySQL: "Duplicate entry '...' for key 'users.ix_users_email'" (5.7 omits the
+# table); SQLite: "UNIQUE constraint failed: users.email"
+_duplicate_key_re = re.compile(r"for key '(?:\w+\.)?(\w+)'|UNIQUE constraint failed: \w+\.(\w+)")
+
+
+def duplicate_key_column(exc: IntegrityError, table: str, columns: Iterable[str]) -> Optional[str]:
+    """Return which of ``table``'s unique ``columns`` an insert or update collided on.
+
+    The key is matched by name (``<column>`` or the ``ix_<table>_<column>``
+    index), never by the duplicate value, which may contain anything.
+    """
+    match = _duplicate_key_re.search(str(exc.orig))
+    if not match:
+        return None
+    key = match.group(1) or match.group(2)
+    for column in columns:
+        if key in (column, f"ix_{table}_{column}"):
+            return column
+    return None
+
+
+def call_key(prefix: str, arguments: Dict[str, Any], vary: Optional[Iterable[str]] = None) -> str:
+    """``prefix`` plus the arguments a call's result depends on, order-independent.
+
+    By default that is every scalar argument (query and path parameters),
+    skipping injected objects such as the database session.
+    """
+    if vary is None:
+        varying = {name: value for name, value in arguments.items() if isinstance(value, SCALAR_TYPES)}
+    else:
+        varying = {name: arguments[name] for name in vary}
+    return f"{prefix}:{orjson.dumps(varying, option=orjson.OPT_SORT_KEYS, default=str).decode()}"
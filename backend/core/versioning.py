@@ -0,0 +1,56 @@
+"""
+Optimistic concurrency control for rows with a ``version`` column.
+
+Clients read the version from the ``ETag`` header (or the ``version`` field)
+and send it back in ``If-Match``. The write is a single conditional
+``UPDATE ... WHERE id = :id AND version = :version`` that also bumps the
+version, so concurrent edits cannot silently overwrite each other and no row
+locks are held between read and write.
+"""
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.audit import record_update
+from core.changelog import record_change
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_if_match(value: Optional[str]) -> Optional[int]:
+    """Expected version from an If-Match header; ``None`` means unconditional"""
+    if value is None or value.strip() == "*":
+        return None
+    tag = value.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid If-Match header")
+
+
+async def versioned_update(db: AsyncSession, model, obj_id: int, values: dict, expected_version: Optional[int], not_found: str) -> None:
+    """Apply ``values`` to one row and bump its version, or raise 404/412"""
+    statement = (
+        update(model)
+        .where(model.id == obj_id)
+        .values(**values, version=model.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if expected_version is not None:
+        statement = statement.where(model.version == expected_version)
+
+    result = await db.execute(statement)
+    if result.rowcount == 0:
+        await db.rollback()
+        exists = await db.scalar(select(model.id).where(model.id == obj_id))
+        if not exists:
+            raise HTTPException(status_code=404, detail=not_found)
+        raise HTTPException(status_code=412, detail="Version mismatch, reload and retry")
+    record_update(db, model, obj_id, values)
+    record_change(db, model, obj_id)
@@ -1,30 +1,116 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import ORJSONResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.exception_handlers import (
     http_exception_handler,
     request_validation_exception_handler,
 )
 from sqlalchemy.exc import SQLAlchemyError
+import db
 from core.config import settings
-from apps.api.v1 import api_router
+from core import sqlstats
+from core.idempotency import IdempotencyMiddleware, run_sweeper
+from core.events import broker
+from core.cache import cache
+from core import audit, changelog
+from core.pricing import price_table
+from core.search import search_index
+from apps.api.v1 import include_routers
+from utils.security import configure_rounds
+
+logger = logging.getLogger(__name__)
+
+
+async def load_caches():
+    """Fill in-process caches before traffic arrives instead of on the first request"""
+    async with db.AsyncSessionLocal() as session:
+        await price_table.ensure_loaded(session)
+        if settings.SEARCH_BACKEND == "ngram":
+            await search_index.ensure_loaded(session)
+
+
+async def warm_up():
+    await run_in_threadpool(configure_rounds)
+    # A database that is down at startup must not keep the server from starting
+    try:
+        await db.warm_pool(settings.DB_POOL_WARMUP)
+        await load_caches()
+    except Exception:
+        logger.exception("Startup warm-up failed; continuing with cold pool and caches")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # FAST_START trades slower first requests for a worker that is up sooner
+    if not settings.FAST_START:
+        await warm_up()
+    sweeper = asyncio.create_task(run_sweeper())
+    if settings.AUDIT_ENABLED:
+        await audit.writer.start()
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        # Before the engine is disposed: writes out entries still queued
+        await audit.writer.stop()
+        await broker.close()
+        await cache.close()
+        await db.engine.dispose()
+
 
 app = FastAPI(
     title="Laptop Repair Store Management API",
     version="1.0.0",
-    default_response_class=ORJSONResponse
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+changelog.install()
+
+if settings.AUDIT_ENABLED:
+    audit.install()
+    app.add_middleware(audit.AuditMiddleware)
+
+app.add_middleware(IdempotencyMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Total-Count-Approximate"],
 )
 
-app.include_router(api_router)
+# Optional features are imported only when enabled
+if settings.PROFILING_ENABLED:
+    from core.profiling import ProfilingMiddleware
+    # Inside QueryStatsMiddleware so profiles can include database time
+    app.add_middleware(ProfilingMiddleware)
+
+if settings.SQL_STATS_ENABLED:
+    sqlstats.install(db.engine)
+    app.add_middleware(sqlstats.QueryStatsMiddleware)
+
+if settings.METRICS_ENABLED:
+    from core.metrics import MetricsMiddleware, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+    # Outermost, so latency covers every other middleware
+    app.add_middleware(MetricsMiddleware)
+
+include_routers(app, settings.API_ROUTERS)
+
+if settings.DEBUG_ENDPOINTS:
+    from apps.api.debug import router as debug_router
+    app.include_router(debug_router)
+
+if settings.PROFILING_ENABLED:
+    from apps.api.debug import profiles_router
+    app.include_router(profiles_router)
 
 
 @app.exception_handler(SQLAlchemyError)
@@ -35,6 +121,14 @@ async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     )
 
 
+@app.exception_handler(sqlstats.QueryBudgetExceeded)
+async def query_budget_exception_handler(request: Request, exc: sqlstats.QueryBudgetExceeded):
+    return ORJSONResponse(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        content={"detail": f"Query budget exceeded: {exc}"}
+    )
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     return await request_validation_exception_handler(request, exc)
@@ -49,3 +143,8 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
@@ -1,8 +1,28 @@
+"""
+Bring the database to the current schema and seed data; safe to run from
+every container at startup.
+
+* Fast path: when the schema is at the alembic head and the stored seed hash
+  matches ``migration/seed.py``, it exits after two small queries.
+* Otherwise it takes a MySQL advisory lock (``GET_LOCK``) so only one
+  instance migrates and seeds while the others wait, re-checks (the holder
+  may have done the work already), upgrades to head on the lock connection
+  and runs the seed only if ``seed.py``'s code changed since it was last
+  applied. A database seeded before the hash was recorded (``roles`` is not
+  empty) only gets the hash. The seed is insert-only, so a re-run adds
+  missing rows without overwriting edited ones.
+"""
+import ast
 import asyncio
+import hashlib
 import sys
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Optional
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
 
 from alembic.config import Config
 from alembic import command
@@ -10,125 +30,143 @@ from alembic.runtime.migration import MigrationContext
 from alembic.script import ScriptDirectory
 from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
 from core.config import settings
-from migration.seed import seed_database
-from db import engine
+
+LOCK_NAME = "repair:migrate"
+LOCK_TIMEOUT_SECONDS = 600
+SEED_FILE = Path(__file__).with_name("seed.py")
+SEED_HASH_KEY = "seed_hash"
+
+
+def alembic_config() -> Config:
+    config = Config(str(BASE_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BASE_DIR / "alembic"))
+    config.set_main_option("sqlalchemy.url", settings.database_url_sync.replace("%", "%%"))
+    return config
+
+
+def seed_hash() -> str:
+    """Hash of the seed script's code, ignoring comments and formatting"""
+    tree = ast.parse(SEED_FILE.read_text(encoding="utf-8"))
+    return hashlib.sha256(ast.dump(tree).encode()).hexdigest()
+
+
+def current_revision(conn) -> Optional[str]:
+    return MigrationContext.configure(conn).get_current_revision()
+
+
+def stored_seed_hash(conn) -> Optional[str]:
+    if not inspect(conn).has_table("app_meta"):
+        return None
+    return conn.execute(text("SELECT value FROM app_meta WHERE `key` = :key"), {"key": SEED_HASH_KEY}).scalar()
 
 
-def check_migrations_needed():
-    """Check if migrations are already applied"""
-    sync_engine = None
+def has_seed_data(conn) -> bool:
+    return conn.execute(text("SELECT 1 FROM roles LIMIT 1")).first() is not None
+
+
+def store_seed_hash(conn, digest: str) -> None:
+    params = {"key": SEED_HASH_KEY, "value": digest}
+    if not conn.execute(text("UPDATE app_meta SET value = :value WHERE `key` = :key"), params).rowcount:
+        conn.execute(text("INSERT INTO app_meta (`key`, value) VALUES (:key, :value)"), params)
+    conn.commit()
+
+
+@contextmanager
+def advisory_lock(conn, name: str, timeout: int):
+    """Hold a MySQL named lock for the lifetime of ``conn``'s session"""
+    print(f"[INFO] Waiting for lock {name}...")
+    acquired = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"), {"name": name, "timeout": timeout}).scalar()
+    conn.commit()
+    if acquired != 1:
+        raise RuntimeError(f"Could not get lock {name} within {timeout}s")
     try:
-        alembic_cfg = Config("alembic.ini")
-        alembic_cfg.set_main_option("sqlalchemy.url", settings.database_url_sync)
-        
-        sync_engine = create_engine(settings.database_url_sync)
-        
-        inspector = inspect(sync_engine)
-        tables = inspector.get_table_names()
-        
-        if "alembic_version" not in tables:
-            print("[INFO] Database not initialized, migrations needed")
-            return True
-        
-        script = ScriptDirectory.from_config(alembic_cfg)
-        head_revision = script.get_current_head()
-        
-        with sync_engine.connect() as conn:
-            context = MigrationContext.configure(conn)
-            current_revision = context.get_current_revision()
-        
-        if current_revision != head_revision:
-            print(f"[INFO] Migrations needed: current={current_revision}, head={head_revision}")
-            return True
-        else:
-            print(f"[OK] Migrations already applied (revision: {current_revision})")
-            return False
-            
-    except OperationalError as e:
-        print(f"[ERROR] Database connection failed: {e}")
-        print("[INFO] Please check database credentials in .env file")
-        raise
-    except Exception as e:
-        print(f"[WARNING] Could not check migration status: {e}")
-        print("[INFO] Will attempt to run migrations...")
-        return True
+        yield
     finally:
-        if sync_engine:
-            sync_engine.dispose()
+        conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": name})
+        conn.commit()
 
 
-def run_migrations():
-    """Run database migrations if needed"""
-    if not check_migrations_needed():
+def run_migrations(conn, config: Config, head: str) -> None:
+    """Upgrade to head on ``conn`` (the connection holding the lock) if needed"""
+    current = current_revision(conn)
+    conn.commit()
+    if current == head:
+        print(f"[OK] Migrations already applied (revision: {current})")
         return
-    
-    print("\n[INFO] Running database migrations...")
-    try:
-        alembic_cfg = Config("alembic.ini")
-        alembic_cfg.set_main_option("sqlalchemy.url", settings.database_url_sync)
-        command.upgrade(alembic_cfg, "head")
-        print("[SUCCESS] Migrations applied successfully!")
-    except Exception as e:
-        print(f"[ERROR] Migration failed: {e}")
-        raise
+    print(f"\n[INFO] Running database migrations: current={current}, head={head}")
+    config.attributes["connection"] = conn
+    command.upgrade(config, "head")
+    conn.commit()
+    print("[SUCCESS] Migrations applied successfully!")
 
 
-async def check_seed_needed():
-    """Check if database already has seed data"""
-    try:
-        async with engine.begin() as conn:
-            result = await conn.execute(text("SELECT COUNT(*) as count FROM roles"))
-            row = result.fetchone()
-            if row and row[0] > 0:
-                print("[OK] Database already seeded")
-                return False
-            return True
-    except OperationalError as e:
-        print(f"[ERROR] Database connection failed: {e}")
-        raise
-    except Exception as e:
-        print(f"[WARNING] Could not check seed status: {e}")
-        return True
+async def run_seed(conn, digest: str) -> None:
+    """Seed if seed.py changed since the last successful seed"""
+    stored = stored_seed_hash(conn)
+    if stored == digest:
+        conn.commit()
+        print("[OK] Seed data up to date")
+        return
+    if stored is None and has_seed_data(conn):
+        # Seeded before hashes were recorded; leave the existing data alone
+        store_seed_hash(conn, digest)
+        print("[OK] Existing seed data found; recorded seed hash")
+        return
+    conn.commit()
 
+    from migration.seed import seed_database
+    from db import engine
 
-async def run_seed():
-    """Seed database if needed"""
-    if not await check_seed_needed():
-        return
-    
     print("\n[INFO] Seeding database...")
     try:
         await seed_database()
-        print("[SUCCESS] Database seeding completed!")
-    except Exception as e:
-        print(f"[ERROR] Error seeding database: {e}")
-        raise
     finally:
         await engine.dispose()
+    store_seed_hash(conn, digest)
+    print("[SUCCESS] Database seeding completed!")
 
 
 async def main():
     """Main function to run migrations and seeding"""
-    print("=" * 50)
-    print("Database Migration and Seeding Script")
-    print("=" * 50)
-    
+    started = time.perf_counter()
+    config = alembic_config()
+    head = ScriptDirectory.from_config(config).get_current_head()
+    digest = seed_hash()
+    sync_engine = create_engine(settings.database_url_sync, poolclass=NullPool)
+
     try:
-        run_migrations()
-        await run_seed()
+        with sync_engine.connect() as conn:
+            if current_revision(conn) == head and stored_seed_hash(conn) == digest:
+                print(f"[OK] Database at {head} and seeded; nothing to do ({time.perf_counter() - started:.2f}s)")
+                return 0
+            conn.commit()
+
+            print("=" * 50)
+            print("Database Migration and Seeding Script")
+            print("=" * 50)
+            with advisory_lock(conn, LOCK_NAME, LOCK_TIMEOUT_SECONDS):
+                run_migrations(conn, config, head)
+                await run_seed(conn, digest)
+
         print("\n" + "=" * 50)
-        print("[SUCCESS] All operations completed successfully!")
+        print(f"[SUCCESS] All operations completed successfully in {time.perf_counter() - started:.1f}s!")
         print("=" * 50)
         return 0
+    except OperationalError as e:
+        print(f"[ERROR] Database connection failed: {e}")
+        print("[INFO] Please check database credentials in .env file")
+        return 1
     except Exception as e:
         print("\n" + "=" * 50)
         print(f"[ERROR] Operation failed: {e}")
         print("=" * 50)
         return 1
+    finally:
+        sync_engine.dispose()
 
 
 if __name__ == "__main__":
     exit_code = asyncio.run(main())
     sys.exit(exit_code)
-
@@ -10,9 +10,13 @@ from sqlalchemy import text
 from db import engine
 from core.config import settings
 from utils.security import hash_password
+from core.phone import normalize_phone
+from core.changelog import BACKFILL
 
 
 async def seed_database():
+    # Insert-only: rows that already exist are left alone (operators edit
+    # prices, descriptions and passwords), so re-running never overwrites them
     async with engine.begin() as conn:
         # 1. Seed Roles
         roles_data = [
@@ -31,7 +35,7 @@ async def seed_database():
                 text("""
                     INSERT INTO roles (name, description) 
                     VALUES (:name, :description)
-                    ON DUPLICATE KEY UPDATE description = VALUES(description)
+                    ON DUPLICATE KEY UPDATE id = id
                 """),
                 {"name": name, "description": description}
             )
@@ -59,7 +63,7 @@ async def seed_database():
                 text("""
                     INSERT INTO device_types (name, description) 
                     VALUES (:name, :description)
-                    ON DUPLICATE KEY UPDATE description = VALUES(description)
+                    ON DUPLICATE KEY UPDATE id = id
                 """),
                 {"name": name, "description": description}
             )
@@ -85,7 +89,7 @@ async def seed_database():
                 text("""
                     INSERT INTO brands (name) 
                     VALUES (:name)
-                    ON DUPLICATE KEY UPDATE name = VALUES(name)
+                    ON DUPLICATE KEY UPDATE id = id
                 """),
                 {"name": name}
             )
@@ -115,7 +119,7 @@ async def seed_database():
                     text("""
                         INSERT INTO models (brand_id, name, device_type_id) 
                         VALUES (:brand_id, :name, :device_type_id)
-                        ON DUPLICATE KEY UPDATE name = VALUES(name)
+                        ON DUPLICATE KEY UPDATE id = id
                     """),
                     {
                         "brand_id": brand_ids[brand_name],
@@ -159,7 +163,7 @@ async def seed_database():
                     text("""
                         INSERT INTO problems (device_type_id, name, description) 
                         VALUES (:device_type_id, :name, :description)
-                        ON DUPLICATE KEY UPDATE description = VALUES(description)
+                        ON DUPLICATE KEY UPDATE id = id
                     """),
                     {
                         "device_type_id": device_type_ids[device_type_name],
@@ -201,10 +205,7 @@ async def seed_database():
                     text("""
                         INSERT INTO cost_settings (problem_id, base_cost, min_cost, max_cost, is_active) 
                         VALUES (:problem_id, :base_cost, :min_cost, :max_cost, :is_active)
-                        ON DUPLICATE KEY UPDATE 
-                            base_cost = VALUES(base_cost),
-                            min_cost = VALUES(min_cost),
-                            max_cost = VALUES(max_cost)
+                        ON DUPLICATE KEY UPDATE id = id
                     """),
                     {
                         "problem_id": problem_ids[problem_name],
@@ -231,17 +232,15 @@ async def seed_database():
             password_hash = hash_password(password)
             await conn.execute(
                 text("""
-                    INSERT INTO users (full_name, email, phone, password_hash, is_active, is_staff) 
-                    VALUES (:full_name, :email, :phone, :password_hash, :is_active, :is_staff)
-                    ON DUPLICATE KEY UPDATE 
-                        full_name = VALUES(full_name),
-                        email = VALUES(email),
-                        password_hash = VALUES(password_hash)
+                    INSERT INTO users (full_name, email, phone, phone_key, password_hash, is_active, is_staff) 
+                    VALUES (:full_name, :email, :phone, :phone_key, :password_hash, :is_active, :is_staff)
+                    ON DUPLICATE KEY UPDATE id = id
                 """),
                 {
                     "full_name": full_name,
                     "email": email,
                     "phone": phone,
+                    "phone_key": normalize_phone(phone),
                     "password_hash": password_hash,
                     "is_active": is_active,
                     "is_staff": is_staff
@@ -249,8 +248,8 @@ async def seed_database():
             )
             # Get user ID
             user_result = await conn.execute(
-                text("SELECT id FROM users WHERE phone = :phone"),
-                {"phone": phone}
+                text("SELECT id FROM users WHERE phone_key = :phone_key"),
+                {"phone_key": normalize_phone(phone)}
             )
             user_row = user_result.fetchone()
             if user_row:
@@ -264,7 +263,7 @@ async def seed_database():
                             text("""
                                 INSERT INTO role_enroll (user_id, role_id) 
                                 VALUES (:user_id, :role_id)
-                                ON DUPLICATE KEY UPDATE user_id = VALUES(user_id)
+                                ON DUPLICATE KEY UPDATE id = id
                             """),
                             {
                                 "user_id": user_id,
@@ -296,7 +295,7 @@ async def seed_database():
                                 text("""
                                     INSERT INTO devices (brand_id, model_id, device_type_id, serial_number, owner_id, notes) 
                                     VALUES (:brand_id, :model_id, :device_type_id, :serial_number, :owner_id, :notes)
-                                    ON DUPLICATE KEY UPDATE owner_id = VALUES(owner_id), notes = VALUES(notes)
+                                    ON DUPLICATE KEY UPDATE id = id
                                 """),
                                 {
                                     "brand_id": brand_ids[brand_name],
@@ -326,7 +325,7 @@ async def seed_database():
                                 text("""
                                     INSERT INTO devices (brand_id, model_id, device_type_id, serial_number, owner_id, notes) 
                                     VALUES (:brand_id, :model_id, :device_type_id, :serial_number, :owner_id, :notes)
-                                    ON DUPLICATE KEY UPDATE owner_id = VALUES(owner_id), notes = VALUES(notes)
+                                    ON DUPLICATE KEY UPDATE id = id
                                 """),
                                 {
                                     "brand_id": brand_ids[brand_name],
@@ -339,6 +338,9 @@ async def seed_database():
                             )
                             device_count += 1
         
+        # The devices were inserted without the ORM; add them to the change feed
+        await conn.execute(BACKFILL)
+        
         print("\n[SUCCESS] All seed data inserted successfully!")
         print(f"  - {len(roles_data)} roles")
         print(f"  - {len(device_types_data)} device types")
@@ -3,6 +3,10 @@ from .device import DeviceType, Brand, Model, Device
 from .order import Order, OrderAssign, OrderStatusHistory
 from .payment import Payment
 from .problem import Problem, CostSetting
+from .idempotency import IdempotencyKey
+from .app_meta import AppMeta
+from .audit import AuditLog
+from .change_log import ChangeLog
 
 __all__ = [
     "User",
@@ -19,5 +23,9 @@ __all__ = [
     "Payment",
     "Problem",
     "CostSetting",
+    "IdempotencyKey",
+    "AppMeta",
+    "AuditLog",
+    "ChangeLog",
 ]
 
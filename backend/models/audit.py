@@ -0,0 +1,23 @@
+from sqlalchemy import Column, BigInteger, String, JSON, DateTime, Index
+from sqlalchemy.sql import func
+from db import Base
+
+
+class AuditLog(Base):
+    """Append-only record of who created, changed or deleted what"""
+    __tablename__ = "audit_log"
+
+    id = Column(BigInteger, primary_key=True)
+    # No foreign keys: entries must outlive the users and rows they describe
+    actor_id = Column(BigInteger)
+    entity = Column(String(30), nullable=False)
+    entity_id = Column(BigInteger)
+    action = Column(String(10), nullable=False)
+    changes = Column(JSON)
+    request = Column(String(255))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_audit_log_entity", "entity", "entity_id", "id"),
+        Index("ix_audit_log_actor", "actor_id", "id"),
+    )
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, BigInteger, String, DateTime, Index
+from sqlalchemy.sql import func
+from db import Base
+
+
+class ChangeLog(Base):
+    """Commit-ordered record of changed order, payment and device rows (the change feed)"""
+    __tablename__ = "change_log"
+
+    id = Column(BigInteger, primary_key=True)
+    entity = Column(String(30), nullable=False)
+    # No foreign key: delete entries outlive their rows
+    entity_id = Column(BigInteger, nullable=False)
+    action = Column(String(10), nullable=False)  # "upsert" or "delete"
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    __table_args__ = (Index("ix_change_log_entity", "entity", "entity_id"),)
@@ -54,7 +54,7 @@ class Device(Base):
     owner_id = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"), index=True)
     notes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     brand = relationship("Brand", back_populates="devices")
     model = relationship("Model", back_populates="devices")
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, BigInteger, Integer, String, LargeBinary, DateTime, JSON
+from sqlalchemy.sql import func
+from db import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(BigInteger, primary_key=True)
+    key = Column(String(255), unique=True, nullable=False, index=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    content_type = Column(String(100))
+    response_headers = Column(JSON)  # [[name, value], ...] replayed with the body
+    response_body = Column(LargeBinary(length=16777215))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    claimed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())  # lease start
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Numeric, Text, ForeignKey, DateTime, CheckConstraint, UniqueConstraint
+from sqlalchemy import Column, BigInteger, Integer, String, Numeric, Text, ForeignKey, DateTime, CheckConstraint, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from db import Base
@@ -14,12 +14,15 @@ class Order(Base):
     cost = Column(Numeric(10, 2), default=0.00)
     discount = Column(Numeric(10, 2), default=0.00)
     total_cost = Column(Numeric(10, 2), default=0.00)
+    paid_total = Column(Numeric(10, 2), nullable=False, default=0.00, server_default="0.00")
+    balance_due = Column(Numeric(10, 2), nullable=False, default=0.00, server_default="0.00", index=True)
     note = Column(Text)
     status = Column(String(20), nullable=False, default="Pending", index=True)
     estimated_completion_date = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     assigns = relationship("OrderAssign", back_populates="order", cascade="all, delete-orphan")
     status_history = relationship("OrderStatusHistory", back_populates="order", cascade="all, delete-orphan")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Numeric, ForeignKey, DateTime, CheckConstraint
+from sqlalchemy import Column, BigInteger, Integer, String, Numeric, ForeignKey, DateTime, CheckConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from db import Base
@@ -15,8 +15,9 @@ class Payment(Base):
     payment_method = Column(String(50))
     transaction_id = Column(String(255))
     paid_at = Column(DateTime(timezone=True))
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     __table_args__ = (
         CheckConstraint("status IN ('Paid', 'Due', 'Unpaid', 'Partial')", name="chk_payment_status"),
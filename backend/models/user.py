@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Boolean, Text, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, BigInteger, String, Boolean, Text, ForeignKey, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from db import Base
@@ -10,6 +10,7 @@ class User(Base):
     id = Column(BigInteger, primary_key=True)
     full_name = Column(String(255), nullable=False)
     phone = Column(String(20), unique=True, nullable=False, index=True)
+    phone_key = Column(String(20), unique=True, index=True)
     email = Column(String(255), unique=True, index=True)
     password_hash = Column(String(255), nullable=False)
     profile_picture = Column(String(500))
@@ -20,6 +21,8 @@ class User(Base):
 
     roles = relationship("RoleEnroll", back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (Index("ix_users_full_name_ft", "full_name", mysql_prefix="FULLTEXT"),)
+
 
 class Role(Base):
     __tablename__ = "roles"
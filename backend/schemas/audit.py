@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+
+class AuditLogResponse(BaseModel):
+    id: int
+    actor_id: Optional[int]
+    entity: str
+    entity_id: Optional[int]
+    action: str
+    changes: Optional[Dict[str, Any]]
+    request: Optional[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import Generic, List, TypeVar
+from core.config import settings
+
+T = TypeVar("T")
+
+
+class BatchGetRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+    @field_validator("ids")
+    @classmethod
+    def validate_ids(cls, v: List[int]) -> List[int]:
+        if len(v) > settings.BATCH_GET_MAX_IDS:
+            raise ValueError(f"At most {settings.BATCH_GET_MAX_IDS} ids per request")
+        return v
+
+
+class BatchGetResponse(BaseModel, Generic[T]):
+    items: List[T]  # in request order, duplicates removed
+    missing: List[int]
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import List
+from .order import OrderResponse
+from .payment import PaymentResponse
+from .device import DeviceResponse
+
+
+class DeletedIds(BaseModel):
+    orders: List[int] = []
+    payments: List[int] = []
+    devices: List[int] = []
+
+
+class ChangesResponse(BaseModel):
+    cursor: str
+    has_more: bool
+    orders: List[OrderResponse] = []
+    payments: List[PaymentResponse] = []
+    devices: List[DeviceResponse] = []
+    deleted: DeletedIds = DeletedIds()
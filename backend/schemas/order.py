@@ -35,10 +35,13 @@ class OrderResponse(BaseModel):
     cost: Decimal
     discount: Decimal
     total_cost: Decimal
+    paid_total: Decimal
+    balance_due: Decimal
     note: Optional[str]
     status: str
     estimated_completion_date: Optional[datetime]
     completed_at: Optional[datetime]
+    version: int
     created_at: datetime
     updated_at: datetime
 
@@ -31,6 +31,7 @@ class PaymentResponse(BaseModel):
     payment_method: Optional[str]
     transaction_id: Optional[str]
     paid_at: Optional[datetime]
+    version: int
     created_at: datetime
     updated_at: datetime
 
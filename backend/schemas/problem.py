@@ -0,0 +1,73 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from decimal import Decimal
+
+
+class ProblemCreate(BaseModel):
+    device_type_id: int
+    name: str
+    description: Optional[str] = None
+
+
+class ProblemUpdate(BaseModel):
+    device_type_id: Optional[int] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+
+class ProblemResponse(BaseModel):
+    id: int
+    device_type_id: int
+    name: str
+    description: Optional[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CostSettingCreate(BaseModel):
+    problem_id: int
+    base_cost: Decimal = Decimal("0.00")
+    min_cost: Optional[Decimal] = None
+    max_cost: Optional[Decimal] = None
+    is_active: bool = True
+
+
+class CostSettingUpdate(BaseModel):
+    base_cost: Optional[Decimal] = None
+    min_cost: Optional[Decimal] = None
+    max_cost: Optional[Decimal] = None
+    is_active: Optional[bool] = None
+
+
+class CostSettingResponse(BaseModel):
+    id: int
+    problem_id: int
+    base_cost: Decimal
+    min_cost: Optional[Decimal]
+    max_cost: Optional[Decimal]
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class EstimateItem(BaseModel):
+    problem_id: int
+    name: str
+    base_cost: Decimal
+    min_cost: Decimal
+    max_cost: Decimal
+
+
+class EstimateResponse(BaseModel):
+    device_type_id: int
+    items: List[EstimateItem]
+    missing: List[int]
+    base_total: Decimal
+    min_total: Decimal
+    max_total: Decimal
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from .user import UserResponse
+from .device import DeviceResponse
+
+
+class SearchHit(BaseModel):
+    type: str
+    id: int
+    score: float
+    matched_field: Optional[str] = None
+    user: Optional[UserResponse] = None
+    device: Optional[DeviceResponse] = None
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
@@ -0,0 +1,106 @@
+"""Measure cold import time and memory of the API process
+
+    python scripts/import_time.py
+    python scripts/import_time.py --runs 10 --top 30
+    python scripts/import_time.py --env FAST_START=true --env API_ROUTERS='["orders","payments"]'
+
+Imports ``main`` (or ``--module``) in fresh interpreters with ``-X importtime``
+and reports the median total import time, the max RSS after import, the
+slowest modules by cumulative time and the time per top-level package, so the
+effect of trimming imports can be compared between commits or settings.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+PROBE = (
+    "import resource, sys; import {module}; "
+    "print('RSS_KB', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)"
+)
+
+
+def measure(module: str, env: Dict[str, str]) -> Tuple[List[Tuple[str, int, int]], int]:
+    """One cold import: ([(module, self us, cumulative us)], max RSS in KiB)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module)],
+        cwd=BACKEND_DIR, env={**os.environ, **env}, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(result.stderr[-2000:])
+    rows, rss = [], 0
+    for line in result.stderr.splitlines():
+        if line.startswith("RSS_KB"):
+            rss = int(line.split()[1])
+        elif line.startswith("import time:") and "self [us]" not in line:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows, rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE for the child process (repeatable)")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    env = dict(item.split("=", 1) for item in args.env)
+    totals, rss_values = [], []
+    cumulative: Dict[str, List[int]] = defaultdict(list)
+    packages: Dict[str, List[int]] = defaultdict(list)
+
+    measure(args.module, env)  # warm the filesystem and bytecode caches
+    for _ in range(args.runs):
+        rows, rss = measure(args.module, env)
+        totals.append(sum(self_us for _, self_us, _ in rows))
+        rss_values.append(rss)
+        per_package = defaultdict(int)
+        for name, self_us, cumulative_us in rows:
+            cumulative[name].append(cumulative_us)
+            per_package[name.split(".")[0]] += self_us
+        for name, us in per_package.items():
+            packages[name].append(us)
+
+    ms = lambda us: round(us / 1000, 1)
+    summary = {
+        "module": args.module,
+        "env": env,
+        "runs": args.runs,
+        "import_ms": ms(statistics.median(totals)),
+        "max_rss_mb": round(statistics.median(rss_values) / 1024, 1),
+        "modules": len(cumulative),
+        "slowest": [
+            {"module": name, "cumulative_ms": ms(statistics.median(values))}
+            for name, values in sorted(cumulative.items(), key=lambda item: -statistics.median(item[1]))[:args.top]
+        ],
+        "packages": [
+            {"package": name, "self_ms": ms(statistics.median(values))}
+            for name, values in sorted(packages.items(), key=lambda item: -statistics.median(item[1]))[:args.top]
+        ],
+    }
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"import {args.module}: {summary['import_ms']} ms (median of {args.runs}), "
+          f"{summary['modules']} modules, max RSS {summary['max_rss_mb']} MB")
+    print(f"\n{'cumulative ms':>13}  module")
+    for row in summary["slowest"]:
+        print(f"{row['cumulative_ms']:>13}  {row['module']}")
+    print(f"\n{'self ms':>13}  package")
+    for row in summary["packages"]:
+        print(f"{row['self_ms']:>13}  {row['package']}")
+
+
+if __name__ == "__main__":
+    main()
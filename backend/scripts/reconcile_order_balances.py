@@ -0,0 +1,82 @@
+"""Verify orders.paid_total / orders.balance_due against the payments table"""
+import argparse
+import asyncio
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select, func
+from db import engine, AsyncSessionLocal
+from models.order import Order
+from models.payment import Payment
+from core import changelog
+from core.balances import PAID_STATUSES, lock_order, refresh_order_balance
+
+
+async def reconcile(batch_size: int, fix: bool):
+    """Walk orders in id order, one batch per query, and report mismatches"""
+    checked = mismatched = 0
+    last_id = 0
+
+    async with AsyncSessionLocal() as db:
+        while True:
+            orders = (await db.execute(
+                select(Order.id, Order.total_cost, Order.paid_total, Order.balance_due)
+                .where(Order.id > last_id)
+                .order_by(Order.id)
+                .limit(batch_size)
+            )).all()
+            if not orders:
+                break
+            last_id = orders[-1].id
+
+            ids = [o.id for o in orders]
+            paid = dict((await db.execute(
+                select(Payment.order_id, func.sum(Payment.amount))
+                .where(Payment.order_id.in_(ids), Payment.status.in_(PAID_STATUSES))
+                .group_by(Payment.order_id)
+            )).all())
+
+            bad = []
+            for order in orders:
+                expected_paid = paid.get(order.id) or Decimal("0.00")
+                expected_balance = max(Decimal("0.00"), (order.total_cost or Decimal("0.00")) - expected_paid)
+                if order.paid_total != expected_paid or order.balance_due != expected_balance:
+                    bad.append(order.id)
+                    print(
+                        f"Order {order.id}: paid_total {order.paid_total} (expected {expected_paid}), "
+                        f"balance_due {order.balance_due} (expected {expected_balance})"
+                    )
+            await db.rollback()
+
+            if fix:
+                for order_id in bad:
+                    await lock_order(db, order_id)
+                    await refresh_order_balance(db, order_id)
+                    await db.commit()
+
+            checked += len(orders)
+            mismatched += len(bad)
+
+    action = "fixed" if fix else "found"
+    print(f"\nChecked {checked} orders, {action} {mismatched} mismatches.")
+    return mismatched
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--fix", action="store_true", help="Recompute mismatched orders")
+    args = parser.parse_args()
+
+    changelog.install()  # fixed balances reach the change feed like API writes
+    mismatched = await reconcile(args.batch_size, args.fix)
+    await engine.dispose()
+    if mismatched and not args.fix:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,167 @@
+"""Reset password hashes in bulk (all users, corrupted hashes only, or one user)
+
+    python scripts/rehash_passwords.py --corrupted
+    python scripts/rehash_passwords.py --all --password password123 --workers 8
+    python scripts/rehash_passwords.py --phone 9876543210 --password secret
+
+bcrypt runs in a process pool, one slice of a batch per worker; each batch is
+written with one executemany UPDATE in its own transaction, and the last
+committed id is saved to the checkpoint file so an interrupted run continues
+where it stopped. The checkpoint is removed once the run completes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import bcrypt
+from sqlalchemy import select, func, or_, text
+from db import engine, AsyncSessionLocal
+from models.user import User
+from core.phone import normalize_phone
+from utils.security import configure_rounds
+
+DEFAULT_PASSWORD = "password123"
+DEFAULT_CHECKPOINT = Path("rehash_passwords.checkpoint")
+
+
+def hash_many(password: str, count: int, rounds: int) -> List[str]:
+    """Runs in a pool worker: ``count`` independently salted hashes of ``password``"""
+    encoded = password.encode("utf-8")
+    return [bcrypt.hashpw(encoded, bcrypt.gensalt(rounds)).decode("utf-8") for _ in range(count)]
+
+
+def corrupted_filter():
+    # verify_password rejects anything longer than a bcrypt hash
+    return or_(func.length(User.password_hash) > 72, ~User.password_hash.like("$2%"))
+
+
+def load_checkpoint(path: Path, mode: str) -> Tuple[int, int]:
+    """(last committed id, users updated so far)"""
+    if not path.exists():
+        return 0, 0
+    state = json.loads(path.read_text())
+    if state.get("mode") != mode:
+        raise SystemExit(f"{path} belongs to a --{state.get('mode')} run; finish it or pass --restart")
+    print(f"Resuming after user id {state['last_id']} ({state['updated']} already updated)")
+    return state["last_id"], state["updated"]
+
+
+def save_checkpoint(path: Path, mode: str, last_id: int, updated: int) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"mode": mode, "last_id": last_id, "updated": updated}))
+    os.replace(tmp, path)
+
+
+async def rehash_bulk(mode: str, password: str, batch_size: int, workers: int, rounds: int, checkpoint: Path) -> int:
+    """Walk users in id order; hash each batch across the pool, then write it"""
+    loop = asyncio.get_running_loop()
+    last_id, updated = load_checkpoint(checkpoint, mode)
+    resumed = updated
+
+    async with AsyncSessionLocal() as db:
+        query = select(User.id)
+        count_query = select(func.count()).select_from(User)
+        if mode == "corrupted":
+            query = query.where(corrupted_filter())
+            count_query = count_query.where(corrupted_filter())
+        total = (await db.execute(count_query.where(User.id > last_id))).scalar_one()
+        await db.rollback()
+    if not total:
+        print("No users to update.")
+        checkpoint.unlink(missing_ok=True)
+        return 0
+    print(f"Updating {total} password hashes with {workers} workers at bcrypt cost {rounds}...")
+    total += resumed
+
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            async with engine.begin() as conn:
+                ids = (await conn.execute(
+                    query.where(User.id > last_id).order_by(User.id).limit(batch_size)
+                )).scalars().all()
+            if not ids:
+                break
+
+            slices = [len(ids[i::workers]) for i in range(workers)]
+            results = await asyncio.gather(*(
+                loop.run_in_executor(pool, hash_many, password, n, rounds) for n in slices if n
+            ))
+            hashes = [h for result in results for h in result]
+
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text("UPDATE users SET password_hash = :hash WHERE id = :id"),
+                    [{"hash": h, "id": user_id} for h, user_id in zip(hashes, ids)]
+                )
+            last_id = ids[-1]
+            updated += len(ids)
+            save_checkpoint(checkpoint, mode, last_id, updated)
+
+            elapsed = time.perf_counter() - started
+            rate = (updated - resumed) / elapsed
+            print(f"{updated}/{total} updated, {rate:.0f}/s, about {(total - updated) / rate:.0f}s left (last id {last_id})")
+    finally:
+        # Don't wait for queued hashing when interrupted; the checkpoint has the progress
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    checkpoint.unlink(missing_ok=True)
+    print(f"\nUpdated {updated} password hashes in {time.perf_counter() - started:.1f}s. Password set to: {password}")
+    return updated
+
+
+async def rehash_user(phone: str, password: str, rounds: int) -> bool:
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            text("UPDATE users SET password_hash = :hash WHERE phone_key = :phone_key"),
+            {"hash": hash_many(password, 1, rounds)[0], "phone_key": normalize_phone(phone)}
+        )
+    if not result.rowcount:
+        print(f"User with phone {phone} not found")
+        return False
+    print(f"Password updated for user {phone}")
+    return True
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--all", action="store_true", help="Every user")
+    target.add_argument("--corrupted", action="store_true", help="Users whose hash is not a valid bcrypt hash")
+    target.add_argument("--phone", help="A single user")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="New password (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Hashing processes")
+    parser.add_argument("--batch-size", type=int, default=500, help="Users per transaction")
+    parser.add_argument("--rounds", type=int, help="bcrypt cost (default: BCRYPT_ROUNDS or calibrated like the app)")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    rounds = args.rounds or configure_rounds()
+    if args.phone:
+        ok = await rehash_user(args.phone, args.password, rounds)
+        await engine.dispose()
+        sys.exit(0 if ok else 1)
+
+    if args.restart:
+        args.checkpoint.unlink(missing_ok=True)
+    mode = "all" if args.all else "corrupted"
+    await rehash_bulk(mode, args.password, args.batch_size, max(1, args.workers), rounds, args.checkpoint)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume from the checkpoint")
+        sys.exit(130)
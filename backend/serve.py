@@ -0,0 +1,67 @@
+"""
+Production entry point (``run.py`` is the auto-reloading development server).
+
+    python serve.py
+    python serve.py --workers 8 --port 8080
+
+Runs ``main:app`` under uvicorn with one worker process per CPU core by
+default, using uvloop and httptools when they are installed (both come with
+``uvicorn[standard]``). On SIGTERM/SIGINT each worker stops accepting
+connections, lets in-flight requests finish for up to
+``SERVER_GRACEFUL_TIMEOUT_SECONDS``, then runs the app's lifespan shutdown
+(which disposes the database pool). Every option defaults to its ``SERVER_*``
+setting.
+"""
+import argparse
+import importlib.util
+import os
+
+import uvicorn
+
+from core.config import settings
+
+
+def available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def default_workers() -> int:
+    return settings.SERVER_WORKERS or os.cpu_count() or 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--backlog", type=int, default=settings.SERVER_BACKLOG)
+    parser.add_argument("--keep-alive", type=int, default=settings.SERVER_KEEPALIVE_SECONDS, help="Idle keep-alive timeout in seconds")
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS, help="Seconds to drain requests on shutdown")
+    parser.add_argument("--access-log", action="store_true", help="Log every request (off by default; /metrics has the counts)")
+    args = parser.parse_args()
+    if args.workers > 1 and settings.CACHE_BACKEND == "memory":
+        # Each worker would keep its own copy, and invalidations only reach one
+        parser.error("CACHE_BACKEND=memory is per process; use CACHE_BACKEND=redis (or off) with more than one worker, or --workers 1")
+    if args.workers > 1 and settings.SEARCH_BACKEND == "ngram":
+        # Same for the search index: a write only updates the worker that handled it
+        parser.error("SEARCH_BACKEND=ngram is per process; use SEARCH_BACKEND=mysql with more than one worker, or --workers 1")
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if available("uvloop") else "asyncio",
+        http="httptools" if available("httptools") else "h11",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+        access_log=args.access_log,
+        lifespan="on",
+    )
+
+
+if __name__ == "__main__":
+    main()
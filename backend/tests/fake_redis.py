@@ -0,0 +1,179 @@
+"""
+A small in-process Redis-protocol (RESP2/RESP3) server for testing the redis
+cache backend without a Redis install (see ``tests/test_cache.py``):
+
+    from tests.fake_redis import FakeRedisServer
+
+    server = FakeRedisServer()
+    await server.start()
+    backend = RedisBackend(server.url, "test:", 3600)
+    ...
+    await server.stop()
+
+It implements only the commands the cache backend uses (strings with
+expiry, sets, DEL, SCAN, plus HELLO for RESP3 clients) and keeps everything
+in one dict.
+"""
+import asyncio
+import fnmatch
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+Value = Union[bytes, set]
+
+
+class CommandError(Exception):
+    pass
+
+
+def _encode(reply, resp3: bool = False) -> bytes:
+    if reply is None:
+        return b"_\r\n" if resp3 else b"$-1\r\n"
+    if isinstance(reply, CommandError):
+        return b"-ERR " + str(reply).encode() + b"\r\n"
+    if isinstance(reply, bool):
+        return b":1\r\n" if reply else b":0\r\n"
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, str):
+        return b"+" + reply.encode() + b"\r\n"
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    if isinstance(reply, dict):
+        if not resp3:
+            return _encode([item for pair in reply.items() for item in pair])
+        return b"%%%d\r\n" % len(reply) + b"".join(_encode(k, resp3) + _encode(v, resp3) for k, v in reply.items())
+    return b"*%d\r\n" % len(reply) + b"".join(_encode(item, resp3) for item in reply)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()  # inline command, e.g. from telnet
+    args = []
+    for _ in range(int(line[1:])):
+        length = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+class FakeRedisServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.data: Dict[bytes, Tuple[Value, Optional[float]]] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self) -> "FakeRedisServer":
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        resp3 = False
+        try:
+            while True:
+                args = await _read_command(reader)
+                if not args:
+                    break
+                command = args[0].decode().upper()
+                try:
+                    if command == "HELLO":
+                        # redis-py negotiates RESP3 by default
+                        resp3 = len(args) > 1 and args[1] == b"3"
+                        reply = {"server": "fake-redis", "version": "7.0.0", "proto": 3 if resp3 else 2, "mode": "standalone"}
+                    else:
+                        reply = self.execute(command, args[1:])
+                except CommandError as e:
+                    reply = e
+                writer.write(_encode(reply, resp3))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _lookup(self, key: bytes) -> Optional[Value]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return item[0]
+
+    def _expire(self, key: bytes, seconds: float) -> bool:
+        value = self._lookup(key)
+        if value is None:
+            return False
+        self.data[key] = (value, time.monotonic() + seconds)
+        return True
+
+    def execute(self, command: str, args: List[bytes]):
+        if command == "PING":
+            return "PONG"
+        if command in ("CLIENT", "SELECT"):
+            return "OK"
+        if command == "GET":
+            value = self._lookup(args[0])
+            if isinstance(value, set):
+                raise CommandError("WRONGTYPE Operation against a key holding the wrong kind of value")
+            return value
+        if command == "SET":
+            expires_at = None
+            options = [arg.upper() for arg in args[2:]]
+            for option, amount in zip(options, args[3:]):
+                if option == b"EX":
+                    expires_at = time.monotonic() + int(amount)
+                elif option == b"PX":
+                    expires_at = time.monotonic() + int(amount) / 1000
+            self.data[args[0]] = (args[1], expires_at)
+            return "OK"
+        if command == "DEL":
+            return sum(1 for key in args if self._lookup(key) is not None and self.data.pop(key))
+        if command == "EXISTS":
+            return sum(1 for key in args if self._lookup(key) is not None)
+        if command == "EXPIRE":
+            return self._expire(args[0], int(args[1]))
+        if command == "PEXPIRE":
+            return self._expire(args[0], int(args[1]) / 1000)
+        if command == "PTTL":
+            if self._lookup(args[0]) is None:
+                return -2
+            expires_at = self.data[args[0]][1]
+            return -1 if expires_at is None else int((expires_at - time.monotonic()) * 1000)
+        if command == "SADD":
+            members = self._lookup(args[0])
+            if members is None:
+                members = set()
+                self.data[args[0]] = (members, None)
+            added = len(set(args[1:]) - members)
+            members.update(args[1:])
+            return added
+        if command == "SMEMBERS":
+            return sorted(self._lookup(args[0]) or ())
+        if command == "SCAN":
+            pattern = b"*"
+            for option, value in zip(args[1::2], args[2::2]):
+                if option.upper() == b"MATCH":
+                    pattern = value
+            keys = [key for key in list(self.data) if self._lookup(key) is not None and fnmatch.fnmatchcase(key, pattern)]
+            return [b"0", keys]  # everything in one pass
+        if command == "DBSIZE":
+            return sum(1 for key in list(self.data) if self._lookup(key) is not None)
+        if command == "FLUSHDB":
+            self.data.clear()
+            return "OK"
+        raise CommandError(f"unknown command '{command}'")
@@ -0,0 +1,59 @@
+"""
+Runs ``main.app`` in-process against a throwaway SQLite database, for tests
+that need no running server or MySQL (see ``benchmarks/harness.py``).
+
+Importing this module configures the app, so test modules import it before
+anything else from the backend. Query budgets are enforced (``raise``) unless
+``QUERY_BUDGET_MODE`` is set, and the startup warm-up is skipped unless
+``FAST_START`` is.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks import harness
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL") or f"sqlite+aiosqlite:///{Path(tempfile.gettempdir()) / 'repair-tests.db'}"
+
+os.environ.setdefault("QUERY_BUDGET_MODE", "raise")
+os.environ.setdefault("FAST_START", "true")
+harness.configure(DATABASE_URL)
+
+
+def run(scenario):
+    """``scenario(client)`` on a fresh schema, inside the app's lifespan; returns its result"""
+    async def main():
+        import db
+
+        await harness.prepare_database(reset=True)
+        try:
+            async with harness.client() as client:
+                return await scenario(client)
+        finally:
+            await db.engine.dispose()
+
+    return asyncio.run(main())
+
+
+async def create_device(client) -> int:
+    """One device (with its type, brand and model) for orders to reference"""
+    await client.post("/v1/devices/types", json={"name": "Laptop"})
+    await client.post("/v1/devices/brands", json={"name": "Dell"})
+    await client.post("/v1/devices/models", json={"name": "XPS 13", "brand_id": 1, "device_type_id": 1})
+    response = await client.post("/v1/devices", json={"brand_id": 1, "model_id": 1, "device_type_id": 1})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def create_orders(client, count: int, device_id: int = 1, **fields) -> list:
+    """``count`` orders for ``device_id``; returns them as created"""
+    orders = []
+    for _ in range(count):
+        response = await client.post("/v1/orders", json={"device_id": device_id, "cost": "100", **fields})
+        assert response.status_code == 201, response.text
+        orders.append(response.json())
+    return orders
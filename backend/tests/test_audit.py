@@ -0,0 +1,191 @@
+"""
+Audit trail (``core.audit``): entries for API writes, redaction, rollbacks
+and retries while the database is unavailable, run in-process:
+
+    cd backend
+    pytest tests/test_audit.py    # or: python tests/test_audit.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.inprocess import create_device, create_orders, run
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from sqlalchemy import select
+
+USER = {"full_name": "Ram Bahadur", "phone": "9841234567", "password": "secret123"}
+
+
+@asynccontextmanager
+async def audit_writer(flush_seconds: float = 0.01):
+    """The lifespan's background writer; leaving the block stops it, writing out what is queued"""
+    from core.audit import writer
+
+    previous = writer.flush_seconds, writer.retry_seconds
+    writer.flush_seconds, writer.retry_seconds = flush_seconds, 0.01
+    try:
+        yield writer
+    finally:
+        await writer.stop()
+        writer.flush_seconds, writer.retry_seconds = previous
+
+
+async def _entries(**where) -> list:
+    import db
+    from models.audit import AuditLog
+
+    query = select(AuditLog).filter_by(**where).order_by(AuditLog.id)
+    async with db.AsyncSessionLocal() as session:
+        return (await session.execute(query)).scalars().all()
+
+
+def _headers(user_id: int) -> dict:
+    from utils.security import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+def test_api_writes_are_recorded():
+    async def scenario(client):
+        async with audit_writer():
+            response = await client.post("/v1/users", json=USER)
+            assert response.status_code == 201, response.text
+            user_id = response.json()["id"]
+            await create_device(client)
+            order = (await create_orders(client, 1))[0]
+
+            response = await client.patch(f"/v1/orders/{order['id']}", json={"cost": "150"}, headers=_headers(user_id))
+            assert response.status_code == 200, response.text
+            response = await client.delete(f"/v1/orders/{order['id']}", headers=_headers(user_id))
+            assert response.status_code == 204, response.text
+
+        created, updated, deleted = await _entries(entity="orders")
+        assert (created.action, created.entity_id, created.actor_id) == ("create", order["id"], None)
+        assert created.changes["cost"] == "100"
+        assert (updated.action, updated.actor_id, updated.request) == ("update", user_id, f"PATCH /v1/orders/{order['id']}")
+        assert updated.changes["cost"] == "150"
+        assert (deleted.action, deleted.actor_id, deleted.request) == ("delete", user_id, f"DELETE /v1/orders/{order['id']}")
+        assert deleted.changes["id"] == order["id"]
+
+        # Reads are not audited
+        assert (await client.get(f"/v1/users/{user_id}")).status_code == 200
+        assert [entry.action for entry in await _entries(entity="users")] == ["create"]
+
+    run(scenario)
+
+
+def test_password_hashes_are_redacted():
+    async def scenario(client):
+        import db
+        from models.user import User
+
+        async with audit_writer():
+            user_id = (await client.post("/v1/users", json=USER)).json()["id"]
+            async with db.AsyncSessionLocal() as session:
+                user = await session.get(User, user_id)
+                user.password_hash = "new hash"
+                user.full_name = "Ram B."
+                await session.commit()
+
+        created, updated = await _entries(entity="users", entity_id=user_id)
+        assert created.changes["password_hash"] == "<redacted>"
+        assert created.changes["full_name"] == "Ram Bahadur"
+        # Only the fact that it changed
+        assert updated.changes["password_hash"] == ["<redacted>", "<redacted>"]
+        assert updated.changes["full_name"] == ["Ram Bahadur", "Ram B."]
+
+    run(scenario)
+
+
+def test_rollback_discards_staged_entries():
+    async def scenario(client):
+        import db
+        from core.audit import SESSION_KEY
+        from models.user import User
+
+        async with audit_writer() as writer:
+            recorded = writer.recorded
+            async with db.AsyncSessionLocal() as session:
+                session.add(User(full_name="Never Saved", phone="9800000000", phone_key="+9779800000000", password_hash="x"))
+                await session.flush()
+                assert len(session.info[SESSION_KEY]) == 1
+                await session.rollback()
+                assert SESSION_KEY not in session.info
+            # A rejected write through the API (duplicate phone) leaves nothing either
+            assert (await client.post("/v1/users", json=USER)).status_code == 201
+            assert (await client.post("/v1/users", json=USER)).status_code == 400
+            assert writer.recorded == recorded + 1
+
+        assert len(await _entries(entity="users")) == 1
+
+    run(scenario)
+
+
+class FailingEngine:
+    """Stands in for ``db.engine``: the first ``failures`` transactions fail as during an outage"""
+
+    def __init__(self, engine, failures: int):
+        self.engine = engine
+        self.failures = failures
+
+    def begin(self):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+        return self.engine.begin()
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+
+def test_failed_batches_are_retried():
+    async def scenario(client):
+        import db
+
+        engine = db.engine
+        try:
+            async with audit_writer() as writer:
+                db.engine = FailingEngine(engine, failures=3)
+                await create_device(client)
+                for _ in range(100):
+                    if db.engine.failures == 0 and writer.pending == 0:
+                        break
+                    await asyncio.sleep(0.02)
+                assert db.engine.failures == 0 and writer.pending == 0
+                assert writer.failed == 0
+        finally:
+            db.engine = engine
+
+        assert [entry.entity for entry in await _entries()] == ["devices"]
+
+    run(scenario)
+
+
+def test_entries_left_at_shutdown_are_counted_as_failed():
+    async def scenario(client):
+        import db
+
+        engine = db.engine
+        try:
+            async with audit_writer(flush_seconds=60) as writer:
+                failed = writer.failed
+                await create_device(client)
+                db.engine = FailingEngine(engine, failures=1)
+        finally:
+            db.engine = engine
+
+        assert writer.failed == failed + 1 and writer.pending == 0
+        assert await _entries() == []
+
+    run(scenario)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
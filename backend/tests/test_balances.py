@@ -0,0 +1,91 @@
+"""
+Order ``paid_total`` / ``balance_due`` kept in step with payments, and the
+reconcile script, run in-process:
+
+    cd backend
+    pytest tests/test_balances.py    # or: python tests/test_balances.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.inprocess import create_device, create_orders, run
+
+from decimal import Decimal
+from sqlalchemy import update
+
+
+async def _order(client, order_id: int = 1):
+    """(paid_total, balance_due, version), checking the ETag matches the version"""
+    response = await client.get(f"/v1/orders/{order_id}")
+    order = response.json()
+    assert response.headers["etag"] == f'"{order["version"]}"'
+    return Decimal(str(order["paid_total"])), Decimal(str(order["balance_due"])), order["version"]
+
+
+async def _pay(client, amount: str, status: str, order_id: int = 1) -> int:
+    response = await client.post("/v1/payments", json={"order_id": order_id, "due_amount": "100", "amount": amount, "status": status})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_payment_writes_keep_the_balance():
+    async def scenario(client):
+        await create_device(client)
+        await create_orders(client, 1)
+        assert await _order(client) == (0, 100, 1)
+
+        first = await _pay(client, "40", "Partial")
+        assert await _order(client) == (40, 60, 2)
+
+        # Payments still due are not money received
+        second = await _pay(client, "30", "Due")
+        assert await _order(client) == (40, 60, 3)
+
+        assert (await client.patch(f"/v1/payments/{second}", json={"status": "Paid"})).status_code == 200
+        assert await _order(client) == (70, 30, 4)
+
+        assert (await client.patch(f"/v1/payments/{first}", json={"amount": "80"})).status_code == 200
+        assert await _order(client) == (110, 0, 5)  # overpaid: nothing due
+
+        assert (await client.delete(f"/v1/payments/{first}")).status_code == 204
+        assert await _order(client) == (30, 70, 6)
+
+        # A cost change recomputes the balance against what was paid
+        assert (await client.patch("/v1/orders/1", json={"discount": "20"})).status_code == 200
+        assert await _order(client) == (30, 50, 7)
+
+    run(scenario)
+
+
+def test_reconcile_finds_and_fixes_drift():
+    async def scenario(client):
+        import db
+        from models.order import Order
+        from scripts.reconcile_order_balances import reconcile
+
+        await create_device(client)
+        await create_orders(client, 3)
+        await _pay(client, "25", "Paid", order_id=2)
+        assert await reconcile(batch_size=2, fix=False) == 0
+
+        # Drift written behind the API's back
+        async with db.engine.begin() as conn:
+            await conn.execute(update(Order).where(Order.id.in_([2, 3])).values(paid_total=Decimal("5.00"), balance_due=Decimal("1.00")))
+        assert await reconcile(batch_size=2, fix=False) == 2
+
+        assert await reconcile(batch_size=2, fix=True) == 2
+        assert await reconcile(batch_size=2, fix=False) == 0
+        assert await _order(client, 2) == (25, 75, 3)
+        assert await _order(client, 3) == (0, 100, 2)
+        assert await _order(client, 1) == (0, 100, 1)
+
+    run(scenario)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
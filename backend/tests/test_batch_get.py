@@ -0,0 +1,73 @@
+"""
+POST /v1/{entity}/batch-get, run in-process:
+
+    cd backend
+    pytest tests/test_batch_get.py    # or: python tests/test_batch_get.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.inprocess import create_device, create_orders, run
+
+ENTITIES = ("orders", "devices", "users", "payments", "assigns")
+
+
+async def _create_rows(client) -> None:
+    """Three rows of every batch-get entity, ids 1 to 3"""
+    for i in range(3):
+        user = {"full_name": f"Customer {i}", "phone": f"984000000{i}", "password": "secret123"}
+        assert (await client.post("/v1/users", json=user)).status_code == 201
+        await create_device(client)
+    await create_orders(client, 3)
+    for order_id in (1, 2, 3):
+        payment = {"order_id": order_id, "due_amount": "100", "amount": "10", "status": "Partial"}
+        assert (await client.post("/v1/payments", json=payment)).status_code == 201
+        assert (await client.post("/v1/assigns", json={"order_id": order_id, "user_id": order_id})).status_code == 201
+
+
+def test_items_follow_request_order_without_duplicates():
+    async def scenario(client):
+        await _create_rows(client)
+        for entity in ENTITIES:
+            response = await client.post(f"/v1/{entity}/batch-get", json={"ids": [3, 99, 1, 3, 2, 1, 42]})
+            assert response.status_code == 200, f"{entity}: {response.text}"
+            body = response.json()
+            assert [item["id"] for item in body["items"]] == [3, 1, 2], entity
+            assert body["missing"] == [99, 42], entity
+            # One query (raise mode fails the request otherwise)
+            assert response.headers["x-query-count"] == "1", entity
+
+    run(scenario)
+
+
+def test_nothing_found():
+    async def scenario(client):
+        for entity in ENTITIES:
+            response = await client.post(f"/v1/{entity}/batch-get", json={"ids": [5, 6, 5]})
+            assert response.status_code == 200, f"{entity}: {response.text}"
+            assert response.json() == {"items": [], "missing": [5, 6]}
+
+    run(scenario)
+
+
+def test_id_count_is_validated():
+    async def scenario(client):
+        from core.config import settings
+
+        for entity in ENTITIES:
+            too_many = list(range(1, settings.BATCH_GET_MAX_IDS + 2))
+            assert (await client.post(f"/v1/{entity}/batch-get", json={"ids": too_many})).status_code == 422, entity
+            assert (await client.post(f"/v1/{entity}/batch-get", json={"ids": []})).status_code == 422, entity
+            at_limit = list(range(1, settings.BATCH_GET_MAX_IDS + 1))
+            assert (await client.post(f"/v1/{entity}/batch-get", json={"ids": at_limit})).status_code == 200, entity
+
+    run(scenario)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
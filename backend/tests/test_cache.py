@@ -0,0 +1,165 @@
+"""
+Application cache (``core.cache``) on the memory backend and on the redis
+backend against ``tests/fake_redis.py``; needs no database or Redis server:
+
+    cd backend
+    pytest tests/test_cache.py    # or: python tests/test_cache.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from core.cache import Cache
+from core.cache.memory import MemoryBackend
+from core.cache.redis_backend import RedisBackend
+from tests.fake_redis import FakeRedisServer
+
+
+@asynccontextmanager
+async def memory_cache():
+    yield Cache(MemoryBackend(max_entries=100, max_bytes=1024 * 1024), default_ttl=60)
+
+
+@asynccontextmanager
+async def redis_cache():
+    server = await FakeRedisServer().start()
+    cache = Cache(RedisBackend(server.url, "test:", tag_ttl=3600), default_ttl=60)
+    try:
+        yield cache
+    finally:
+        await cache.close()
+        await server.stop()
+
+
+BACKENDS = {"memory": memory_cache, "redis": redis_cache}
+
+
+def _on_each_backend(scenario):
+    async def main():
+        for name, make in BACKENDS.items():
+            async with make() as cache:
+                try:
+                    await scenario(cache)
+                except AssertionError as e:
+                    raise AssertionError(f"{name} backend: {e}") from e
+
+    asyncio.run(main())
+
+
+def test_get_set_and_ttl():
+    async def scenario(cache):
+        assert await cache.get("missing") is None
+        assert await cache.get("missing", "default") == "default"
+
+        await cache.set("order", {"id": 1, "items": [1, 2]})
+        assert await cache.get("order") == {"id": 1, "items": [1, 2]}
+        await cache.set("order", {"id": 2})
+        assert await cache.get("order") == {"id": 2}
+
+        await cache.set("short", 1, ttl=0.05)
+        assert await cache.get("short") == 1
+        await asyncio.sleep(0.1)
+        assert await cache.get("short") is None
+
+        await cache.delete("order")
+        assert await cache.get("order") is None
+
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            return "computed"
+
+        assert await cache.get_or_set("lazy", factory) == "computed"
+        assert await cache.get_or_set("lazy", factory) == "computed"
+        assert len(calls) == 1
+
+    _on_each_backend(scenario)
+
+
+def test_tag_invalidation():
+    async def scenario(cache):
+        await cache.set("brands:list", [1], tags=["brands"])
+        await cache.set("brands:models", [2], tags=["brands", "models"])
+        await cache.set("models:list", [3], tags=["models"])
+        await cache.set("untagged", [4])
+
+        assert await cache.invalidate("brands") == 2
+        assert await cache.get("brands:list") is None
+        assert await cache.get("brands:models") is None
+        assert await cache.get("models:list") == [3]
+        assert await cache.get("untagged") == [4]
+
+        assert await cache.invalidate("brands") == 0
+        assert await cache.invalidate("models", "unknown") == 1
+        assert await cache.get("models:list") is None
+
+        # A key stored again after invalidation is tracked afresh
+        await cache.set("brands:list", [5], tags=["brands"])
+        assert await cache.invalidate("brands") == 1
+
+    _on_each_backend(scenario)
+
+
+def test_backend_errors_are_misses():
+    async def main():
+        # Nothing listens on port 1
+        cache = Cache(RedisBackend("redis://127.0.0.1:1/0", "test:", tag_ttl=3600), default_ttl=60)
+        await cache.set("key", 1)
+        assert await cache.get("key") is None
+        assert await cache.invalidate("tag") == 0
+        assert cache.stats.errors == 3
+        await cache.close()
+
+    asyncio.run(main())
+
+
+def test_memory_lru_eviction_by_entries():
+    async def main():
+        backend = MemoryBackend(max_entries=3, max_bytes=1024 * 1024)
+        for key in ("a", "b", "c"):
+            await backend.set(key, b"1", 60, tags=["t"])
+        await backend.get("a")  # now the most recently used
+        await backend.set("d", b"1", 60, tags=["t"])
+
+        assert await backend.get("b") is None
+        assert [await backend.get(key) for key in ("a", "c", "d")] == [b"1"] * 3
+        assert backend.evictions == 1
+        assert backend.tags["t"] == {"a", "c", "d"}  # evicted keys leave their tags
+
+    asyncio.run(main())
+
+
+def test_memory_lru_eviction_by_bytes():
+    async def main():
+        backend = MemoryBackend(max_entries=100, max_bytes=50)
+        await backend.set("k1", b"x" * 20, 60)  # 22 bytes with the key
+        await backend.set("k2", b"x" * 20, 60)
+        assert backend.bytes == 44
+        await backend.set("k3", b"x" * 20, 60)
+
+        assert await backend.get("k1") is None
+        assert backend.bytes == 44 and backend.evictions == 1
+
+        # Larger than the whole cache: not stored, nothing else evicted
+        await backend.set("big", b"x" * 60, 60)
+        assert await backend.get("big") is None
+        assert await backend.get("k2") == b"x" * 20 and await backend.get("k3") == b"x" * 20
+
+        # Replacing a key accounts for the new size only
+        await backend.set("k2", b"y" * 5, 60)
+        assert backend.bytes == 29
+        assert backend.gauges() == {"entries": 2, "bytes": 29}
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,119 @@
+"""
+Change feed (GET /v1/changes) paging, run in-process:
+
+    cd backend
+    pytest tests/test_change_feed.py    # or: python tests/test_change_feed.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.inprocess import create_device, create_orders, run
+
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, text, update
+
+
+async def _sync(client, cursor=None, **params):
+    """Follow has_more to the end; returns (cursor, order ids, deleted order ids)"""
+    ids, deleted = [], []
+    while True:
+        if cursor:
+            params["since"] = cursor
+        response = await client.get("/v1/changes", params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        ids += [order["id"] for order in page["orders"]]
+        deleted += page["deleted"]["orders"]
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            return cursor, ids, deleted
+
+
+def test_change_in_same_second_as_cursor():
+    """A lower id updated in the cursor's second (DATETIME precision) is still returned"""
+    async def scenario(client):
+        import db
+
+        # What MySQL's DATETIME stores for writes made within one second
+        second = {"ts": datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)}
+        await create_device(client)
+        await create_orders(client, 5)
+        async with db.engine.begin() as conn:
+            await conn.execute(text("UPDATE orders SET updated_at = :ts"), second)
+        cursor, ids, _ = await _sync(client, entities="orders", limit=2)
+        assert sorted(ids) == [1, 2, 3, 4, 5]
+
+        # Order 3 changes later in that same second, below the cursor's last id (5)
+        response = await client.patch("/v1/orders/3", json={"status": "Repairing"})
+        assert response.status_code == 200, response.text
+        async with db.engine.begin() as conn:
+            await conn.execute(text("UPDATE orders SET updated_at = :ts WHERE id = 3"), second)
+
+        _, ids, _ = await _sync(client, cursor, entities="orders")
+        assert ids == [3]
+
+    run(scenario)
+
+
+def test_deletes_are_reported():
+    async def scenario(client):
+        await create_device(client)
+        await create_orders(client, 2)
+        await client.post("/v1/payments", json={"order_id": 2, "due_amount": "100", "amount": "40", "status": "Partial"})
+        cursor, _, _ = await _sync(client)
+
+        assert (await client.delete("/v1/orders/2")).status_code == 204
+        response = await client.get("/v1/changes", params={"since": cursor})
+        deleted = response.json()["deleted"]
+        assert deleted["orders"] == [2]
+        assert deleted["payments"] == [1]  # removed by ON DELETE CASCADE
+
+    run(scenario)
+
+
+def test_uncommitted_gap_is_not_skipped():
+    """A transaction committing after a later id must not be passed over"""
+    async def scenario(client):
+        import db
+        from models.change_log import ChangeLog
+
+        await create_device(client)
+        await create_orders(client, 2)
+        cursor, _, _ = await _sync(client)
+        async with db.engine.begin() as conn:
+            last_id = (await conn.execute(text("SELECT MAX(id) FROM change_log"))).scalar()
+            # The id before it is still "in flight"
+            await conn.execute(insert(ChangeLog), {"id": last_id + 2, "entity": "orders", "entity_id": 1, "action": "upsert",
+                                                   "created_at": datetime.now(timezone.utc)})
+
+        held, ids, _ = await _sync(client, cursor)
+        assert ids == [] and held == cursor
+
+        async with db.engine.begin() as conn:
+            await conn.execute(insert(ChangeLog), {"id": last_id + 1, "entity": "orders", "entity_id": 2, "action": "upsert",
+                                                   "created_at": datetime.now(timezone.utc)})
+        held, ids, _ = await _sync(client, held)
+        assert ids == [2, 1]
+
+        # A gap that stays open (e.g. a rolled back insert) is skipped once it is old
+        async with db.engine.begin() as conn:
+            await conn.execute(insert(ChangeLog), {"id": last_id + 4, "entity": "orders", "entity_id": 2, "action": "upsert",
+                                                   "created_at": datetime.now(timezone.utc)})
+        held, ids, _ = await _sync(client, held)
+        assert ids == []
+        async with db.engine.begin() as conn:
+            await conn.execute(update(ChangeLog).where(ChangeLog.id == last_id + 4)
+                               .values(created_at=datetime.now(timezone.utc) - timedelta(minutes=1)))
+        _, ids, _ = await _sync(client, held)
+        assert ids == [2]
+
+    run(scenario)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,58 @@
+"""
+Total counts for list endpoints (``?include_total=true``), run in-process:
+
+    cd backend
+    pytest tests/test_counts.py    # or: python tests/test_counts.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.inprocess import create_device, create_orders, run
+
+
+async def _total(client, **params):
+    response = await client.get("/v1/orders", params={"include_total": "true", "offset": 1, **params})
+    assert response.status_code == 200, response.text
+    return int(response.headers["x-total-count"]), response.headers.get("x-total-count-approximate")
+
+
+def test_exact_approximate_and_cached_totals():
+    async def scenario(client):
+        from core.cache import cache
+        from core.config import settings
+        from core.counts import local_totals
+
+        assert cache.backend.name == "off"
+        await local_totals.clear()
+        threshold = settings.COUNT_EXACT_THRESHOLD
+        settings.COUNT_EXACT_THRESHOLD = 3
+        try:
+            await create_device(client)
+            await create_orders(client, 3)
+            assert await _total(client, status="Pending") == (3, None)
+
+            await create_orders(client, 2)
+            assert await _total(client, status="Pending") == (5, "true")
+
+            # Later pages reuse the total without counting, even with the cache off
+            await create_orders(client, 1)
+            response = await client.get("/v1/orders", params={"include_total": "true", "offset": 2, "status": "Pending"})
+            assert response.headers["x-total-count"] == "5"
+            assert response.headers["x-query-count"] == "1"
+
+            # Each filter combination has its own total
+            assert await _total(client) == (6, "true")
+            await local_totals.clear()
+            assert await _total(client, status="Pending") == (6, "true")
+        finally:
+            settings.COUNT_EXACT_THRESHOLD = threshold
+            await local_totals.clear()
+
+    run(scenario)
+
+
+if __name__ == "__main__":
+    test_exact_approximate_and_cached_totals()
+    print("[OK] test_exact_approximate_and_cached_totals")
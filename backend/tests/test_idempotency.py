@@ -0,0 +1,133 @@
+"""
+Idempotency-Key handling (``core.idempotency``), run in-process:
+
+    cd backend
+    pytest tests/test_idempotency.py    # or: python tests/test_idempotency.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.inprocess import run
+
+from datetime import timedelta
+from sqlalchemy import select, update
+
+import httpx
+
+RESPONSE_HEADERS = [
+    (b"content-type", b"application/json"),
+    (b"etag", b'"1"'),
+    (b"location", b"/v1/orders/1"),
+    (b"set-cookie", b"session=abc"),
+    (b"date", b"Mon, 19 Oct 2026 12:00:00 GMT"),
+]
+
+
+class Handler:
+    """Stands in for the app behind the middleware and counts its calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        body = (await receive())["body"]
+        await send({"type": "http.response.start", "status": 201, "headers": RESPONSE_HEADERS})
+        await send({"type": "http.response.body", "body": b'{"created": %d, "echo": %s}' % (self.calls, body)})
+
+
+def _client(handler, address=("127.0.0.1", 123)):
+    from core.idempotency import IdempotencyMiddleware
+
+    transport = httpx.ASGITransport(app=IdempotencyMiddleware(handler), client=address)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def _forget_cached():
+    from core.idempotency import response_cache
+
+    response_cache.entries.clear()
+
+
+def test_retry_replays_the_stored_response():
+    async def scenario(_):
+        handler = Handler()
+        async with _client(handler) as client:
+            first = await client.post("/v1/orders", json={"cost": 1}, headers={"Idempotency-Key": "replay"})
+            assert first.status_code == 201
+            assert "idempotent-replayed" not in first.headers
+
+            # From the per-process LRU, then from the table
+            for _ in range(2):
+                retry = await client.post("/v1/orders", json={"cost": 1}, headers={"Idempotency-Key": "replay"})
+                assert retry.status_code == 201
+                assert retry.content == first.content
+                assert retry.headers["idempotent-replayed"] == "true"
+                assert retry.headers["etag"] == '"1"'
+                assert retry.headers["location"] == "/v1/orders/1"
+                assert retry.headers["content-type"] == "application/json"
+                assert "set-cookie" not in retry.headers and "date" not in retry.headers
+                _forget_cached()
+            assert handler.calls == 1
+
+        # Keys are per caller: another client using the same key runs its own request
+        async with _client(handler, ("10.0.0.2", 123)) as client:
+            other = await client.post("/v1/orders", json={"cost": 1}, headers={"Idempotency-Key": "replay"})
+            assert "idempotent-replayed" not in other.headers
+            assert handler.calls == 2
+
+    run(scenario)
+
+
+def test_key_reused_with_a_different_body():
+    async def scenario(_):
+        handler = Handler()
+        async with _client(handler) as client:
+            await client.post("/v1/orders", json={"cost": 1}, headers={"Idempotency-Key": "reuse"})
+            for _ in range(2):
+                response = await client.post("/v1/orders", json={"cost": 2}, headers={"Idempotency-Key": "reuse"})
+                assert response.status_code == 422
+                _forget_cached()
+            assert handler.calls == 1
+
+    run(scenario)
+
+
+def test_retry_while_in_progress_and_after_the_lease():
+    async def scenario(_):
+        import db
+        from core.config import settings
+        from models.idempotency import IdempotencyKey
+
+        handler = Handler()
+        async with _client(handler) as client:
+            await client.post("/v1/orders", json={"cost": 1}, headers={"Idempotency-Key": "running"})
+            _forget_cached()
+            # As if the first request were still running
+            async with db.engine.begin() as conn:
+                claimed_at = (await conn.execute(select(IdempotencyKey.claimed_at))).scalar_one()
+                await conn.execute(update(IdempotencyKey).values(status_code=None))
+
+            response = await client.post("/v1/orders", json={"cost": 1}, headers={"Idempotency-Key": "running"})
+            assert response.status_code == 409
+            assert handler.calls == 1
+
+            # Its worker died: once the lease is over a retry runs the request
+            lease = timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS + 1)
+            async with db.engine.begin() as conn:
+                await conn.execute(update(IdempotencyKey).values(claimed_at=claimed_at - lease))
+            response = await client.post("/v1/orders", json={"cost": 1}, headers={"Idempotency-Key": "running"})
+            assert response.status_code == 201
+            assert "idempotent-replayed" not in response.headers
+            assert handler.calls == 2
+
+    run(scenario)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,91 @@
+"""
+Phone keys (``core.phone.normalize_phone``) and duplicate key detection
+(``core.utils.duplicate_key_column``); needs no database:
+
+    cd backend
+    pytest tests/test_phone.py    # or: python tests/test_phone.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy.exc import IntegrityError
+
+from core.config import settings
+from core.phone import normalize_phone
+from core.utils import duplicate_key_column
+
+COUNTRY = settings.PHONE_DEFAULT_COUNTRY_CODE
+
+
+def _raises(phone, **kwargs) -> bool:
+    try:
+        normalize_phone(phone, **kwargs)
+    except ValueError:
+        return True
+    return False
+
+
+def test_national_numbers_get_the_default_country_code():
+    assert normalize_phone("9841234567") == f"+{COUNTRY}9841234567"
+    assert normalize_phone("09841234567") == f"+{COUNTRY}9841234567"  # trunk 0 dropped
+    assert normalize_phone(f"{COUNTRY}9841234567") == f"+{COUNTRY}9841234567"
+
+
+def test_international_prefixes_are_kept():
+    assert normalize_phone("+1 415 555 0100") == "+14155550100"
+    assert normalize_phone("0014155550100") == "+14155550100"
+
+
+def test_separators_are_ignored():
+    expected = f"+{COUNTRY}9841234567"
+    for phone in (f"+{COUNTRY} 984-1234567", f"00{COUNTRY} (984) 123 4567", " 984.123.4567 ", f"+{COUNTRY}/9841234567"):
+        assert normalize_phone(phone) == expected, phone
+
+
+def test_strict_rejects_what_cannot_be_a_number():
+    for phone in ("", None, "abc", "+12", "+1234567890123456", "1 2"):
+        assert _raises(phone), phone
+    # Partial input, e.g. a search prefix, is allowed when not strict
+    assert normalize_phone("98", strict=False) == f"+{COUNTRY}98"
+    assert normalize_phone("", strict=False) == f"+{COUNTRY}"
+
+
+def test_normalizing_a_key_returns_it_unchanged():
+    for phone in ("9841234567", "+1 415 555 0100", "0014155550100", f"{COUNTRY}9841234567"):
+        key = normalize_phone(phone)
+        assert normalize_phone(key) == key
+
+
+def _integrity_error(message: str) -> IntegrityError:
+    return IntegrityError("INSERT INTO users ...", {}, Exception(message))
+
+
+def test_duplicate_key_column_on_mysql():
+    columns = ("phone", "phone_key", "email")
+    error = _integrity_error("(1062, \"Duplicate entry '+9779841234567' for key 'users.ix_users_phone_key'\")")
+    assert duplicate_key_column(error, "users", columns) == "phone_key"
+    # MySQL 5.7 leaves out the table name
+    error = _integrity_error("(1062, \"Duplicate entry 'a@example.com' for key 'ix_users_email'\")")
+    assert duplicate_key_column(error, "users", columns) == "email"
+    # Matched on the key, not on a value that happens to contain a column name
+    error = _integrity_error("(1062, \"Duplicate entry 'phone_key email' for key 'users.ix_users_phone'\")")
+    assert duplicate_key_column(error, "users", columns) == "phone"
+    error = _integrity_error("(1062, \"Duplicate entry 'email' for key 'users.PRIMARY'\")")
+    assert duplicate_key_column(error, "users", columns) is None
+
+
+def test_duplicate_key_column_on_sqlite():
+    columns = ("phone", "phone_key", "email")
+    assert duplicate_key_column(_integrity_error("UNIQUE constraint failed: users.phone_key"), "users", columns) == "phone_key"
+    assert duplicate_key_column(_integrity_error("UNIQUE constraint failed: users.email"), "users", columns) == "email"
+    assert duplicate_key_column(_integrity_error("UNIQUE constraint failed: users.username"), "users", columns) is None
+    assert duplicate_key_column(_integrity_error("NOT NULL constraint failed: users.email"), "users", columns) is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
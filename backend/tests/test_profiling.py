@@ -0,0 +1,132 @@
+"""
+On-demand request profiling (``core.profiling``), run in-process around a
+stand-in app:
+
+    cd backend
+    pytest tests/test_profiling.py    # or: python tests/test_profiling.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.inprocess import run
+
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import event
+
+
+async def app(scope, receive, send):
+    deadline = time.perf_counter() + 0.03
+    while time.perf_counter() < deadline:  # something for the sampler to see
+        pass
+    await asyncio.sleep(0)
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _client():
+    from core.profiling import ProfilingMiddleware
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=ProfilingMiddleware(app)), base_url="http://test")
+
+
+def _headers(**claims):
+    from utils.security import create_access_token
+
+    return {"X-Profile": "1", "Authorization": f"Bearer {create_access_token(claims)}"}
+
+
+async def _create_users(client) -> None:
+    """User 1 is an admin, user 2 is not"""
+    for i in (1, 2):
+        user = {"full_name": f"User {i}", "phone": f"984000000{i}", "password": "secret123"}
+        assert (await client.post("/v1/users", json=user)).status_code == 201
+    role = await client.post("/v1/users/roles", json={"name": "Admin"})
+    assert role.status_code == 201, role.text
+    enroll = await client.post("/v1/users/roles/enroll", json={"user_id": 1, "role_id": role.json()["id"]})
+    assert enroll.status_code == 201, enroll.text
+
+
+def _reset_rate_limiter():
+    from core.profiling import rate_limiter
+
+    rate_limiter.started.clear()
+    rate_limiter.active = False
+    return rate_limiter
+
+
+def test_admin_request_is_profiled():
+    async def scenario(api):
+        from apps.api.debug import get_profile, list_profiles
+
+        await _create_users(api)
+        _reset_rate_limiter()
+        async with _client() as client:
+            response = await client.get("/v1/orders", headers=_headers(sub="1"))
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+
+        assert (await list_profiles(limit=1))[0]["id"] == profile_id
+        profile = await get_profile(profile_id)
+        assert profile.body.startswith(b"GET /v1/orders;")
+
+    run(scenario)
+
+
+def test_other_requests_are_served_without_a_profile():
+    async def scenario(api):
+        await _create_users(api)
+        limiter = _reset_rate_limiter()
+        async with _client() as client:
+            for headers in (
+                {"X-Profile": "1"},
+                {"X-Profile": "1", "Authorization": "Bearer not-a-token"},
+                _headers(),  # valid token without a subject
+                _headers(sub="not-a-number"),
+                _headers(sub="2"),  # not an admin
+            ):
+                response = await client.get("/v1/orders", headers=headers)
+                assert response.status_code == 200, headers
+                assert "x-profile-id" not in response.headers
+        # None of them used up a profiling slot
+        assert not limiter.started and not limiter.active
+
+    run(scenario)
+
+
+def test_rate_limit_is_checked_before_the_admin_lookup():
+    async def scenario(api):
+        import db
+
+        await _create_users(api)
+        limiter = _reset_rate_limiter()
+        limiter.started.extend([time.monotonic()] * limiter.per_minute)
+
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+
+        event.listen(db.engine.sync_engine, "before_cursor_execute", count)
+        try:
+            async with _client() as client:
+                response = await client.get("/v1/orders", headers=_headers(sub="1"))
+        finally:
+            event.remove(db.engine.sync_engine, "before_cursor_execute", count)
+            _reset_rate_limiter()
+        assert response.status_code == 200
+        assert response.headers["x-profile-skipped"] == "rate limited"
+        assert statements == []
+
+    run(scenario)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,71 @@
+"""
+Query budgets (``@query_budget``) and the N+1 check for every benchmark
+scenario, run in-process with ``QUERY_BUDGET_MODE=raise`` so a route that
+issues more SQL than it declares fails here instead of in production:
+
+    cd backend
+    pytest tests/test_query_budgets.py    # or: python tests/test_query_budgets.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.inprocess import run
+
+import random
+
+REQUESTS_PER_SCENARIO = 5
+
+
+def test_benchmark_scenarios_stay_within_query_budgets():
+    async def scenario(client):
+        import db
+        from benchmarks.dataset import DatasetSize, build_dataset
+        from benchmarks.run_api import SCENARIOS, table_counts
+        from core.config import settings
+
+        assert settings.QUERY_BUDGET_MODE == "raise", "run without QUERY_BUDGET_MODE set"
+        await build_dataset(db.engine, DatasetSize(orders=300), workers=1)
+        counts = await table_counts()
+
+        failures = []
+        for case in SCENARIOS:
+            rng = random.Random(case.name)
+            for _ in range(REQUESTS_PER_SCENARIO):
+                method, url, kwargs = case.build(rng, counts)
+                response = await client.request(method, url, **kwargs)
+                if response.status_code != case.expect:
+                    failures.append(f"{case.name}: {method} {url} -> {response.status_code} {response.text[:300]}")
+                    break
+        assert not failures, "\n".join(failures)
+
+    run(scenario)
+
+
+def test_middleware_queries_do_not_count_against_the_route():
+    """The idempotency claim runs before the route; the route's budget still applies"""
+    async def scenario(client):
+        from apps.api.v1.devices import batch_get_devices
+
+        response = await client.post("/v1/devices/batch-get", json={"ids": [1]}, headers={"Idempotency-Key": "budget-1"})
+        assert response.status_code == 200, response.text
+        assert response.headers["x-query-count"] == "1"
+
+        batch_get_devices.__query_budget__ = 0
+        try:
+            for headers in ({}, {"Idempotency-Key": "budget-2"}):
+                response = await client.post("/v1/devices/batch-get", json={"ids": [1]}, headers=headers)
+                assert response.status_code == 500, response.text
+                assert "Query budget exceeded" in response.json()["detail"]
+        finally:
+            batch_get_devices.__query_budget__ = 1
+
+    run(scenario)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
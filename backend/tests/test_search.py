@@ -0,0 +1,86 @@
+"""
+Customer and device search (GET /v1/search) on both backends, run in-process
+(the ``mysql`` backend falls back to prefix ``LIKE`` on SQLite):
+
+    cd backend
+    pytest tests/test_search.py    # or: python tests/test_search.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.inprocess import create_device, run
+
+USERS = [
+    {"full_name": "Ram Bahadur", "phone": "+977 984-1234567", "email": "rbahadur@example.com", "password": "secret123"},
+    {"full_name": "Sita Sharma", "phone": "9801112222", "email": "sharma.s@repairshop.com", "password": "secret123"},
+]
+
+
+async def _top(client, q, **params):
+    """(type, id, matched_field) of the best hit"""
+    response = await client.get("/v1/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert results, f"no results for {q!r}"
+    return results[0]["type"], results[0]["id"], results[0]["matched_field"]
+
+
+def _reset_index():
+    from core.search import search_index
+
+    search_index.postings.clear()
+    search_index.docs.clear()
+    search_index.loaded = False  # rebuilt on the next search
+
+
+def _with_backend(backend):
+    def test():
+        async def scenario(client):
+            from core.config import settings
+
+            previous = settings.SEARCH_BACKEND
+            settings.SEARCH_BACKEND = backend
+            _reset_index()
+            try:
+                for user in USERS:
+                    response = await client.post("/v1/users", json=user)
+                    assert response.status_code == 201, response.text
+                device_id = await create_device(client)
+                await client.patch(f"/v1/devices/{device_id}", json={"serial_number": "SN-ABC123"})
+
+                assert await _top(client, "Ra") == ("user", 1, "full_name")
+                assert await _top(client, "sita") == ("user", 2, "full_name")
+                # Phone prefixes, typed nationally, internationally or with separators
+                assert await _top(client, "984123") == ("user", 1, "phone")
+                assert await _top(client, "+977 980-111") == ("user", 2, "phone")
+                if backend == "ngram":
+                    assert await _top(client, "4567") == ("user", 1, "phone")  # infix
+                assert await _top(client, "sharma.s@rep") == ("user", 2, "email")
+                assert await _top(client, "SN-AB", types="devices") == ("device", device_id, "serial_number")
+
+                # Written after the index was loaded
+                response = await client.post("/v1/users", json={**USERS[0], "full_name": "Gita Rai", "phone": "9812223333", "email": "g.rai@example.com"})
+                assert response.status_code == 201, response.text
+                assert await _top(client, "gita") == ("user", 3, "full_name")
+
+                response = await client.get("/v1/search", params={"q": "zzzz"})
+                assert response.json()["results"] == []
+            finally:
+                settings.SEARCH_BACKEND = previous
+                _reset_index()
+
+        run(scenario)
+    return test
+
+
+test_sql_backend_prefix_matches = _with_backend("mysql")
+test_ngram_backend_prefix_matches = _with_backend("ngram")
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
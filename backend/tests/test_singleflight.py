@@ -0,0 +1,160 @@
+"""
+Request coalescing (``core.singleflight``), run in-process:
+
+    cd backend
+    pytest tests/test_singleflight.py    # or: python tests/test_singleflight.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.inprocess import create_device, create_orders, run
+
+import asyncio
+from contextlib import contextmanager
+
+from sqlalchemy import event, text
+
+
+@contextmanager
+def order_queries():
+    """Collects the SELECTs on ``orders`` issued inside the block"""
+    import db
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM orders" in statement:
+            statements.append(statement)
+
+    event.listen(db.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _counters():
+    from core.singleflight import group
+
+    return group.leaders, group.followers
+
+
+def test_concurrent_identical_requests_share_one_call():
+    async def scenario(client):
+        await create_device(client)
+        await create_orders(client, 3)
+        leaders, followers = _counters()
+
+        with order_queries() as queries:
+            responses = await asyncio.gather(*(client.get("/v1/orders", params={"limit": 5}) for _ in range(5)))
+        assert {r.status_code for r in responses} == {200}
+        assert len({r.content for r in responses}) == 1
+        assert len(responses[0].json()) == 3
+        assert _counters() == (leaders + 1, followers + 4)
+        assert len(queries) == 1
+
+    run(scenario)
+
+
+def test_different_parameters_do_not_share():
+    async def scenario(client):
+        await create_device(client)
+        await create_orders(client, 3)
+        leaders, followers = _counters()
+
+        with order_queries() as queries:
+            first, second = await asyncio.gather(
+                client.get("/v1/orders", params={"limit": 1}),
+                client.get("/v1/orders", params={"limit": 2}),
+            )
+        assert len(first.json()) == 1 and len(second.json()) == 2
+        assert _counters() == (leaders + 2, followers)
+        assert len(queries) == 2
+
+    run(scenario)
+
+
+def test_list_orders_only_coalesces_the_plain_first_page():
+    async def scenario(client):
+        await create_device(client)
+        await create_orders(client, 3)
+
+        leaders, _ = _counters()
+        assert (await client.get("/v1/orders")).status_code == 200
+        assert _counters()[0] == leaders + 1
+
+        # Later pages and counted requests run the handler directly
+        leaders, followers = _counters()
+        for params in ({"offset": 1}, {"include_total": "true"}, {"offset": 2, "include_total": "true"}):
+            response = await client.get("/v1/orders", params=params)
+            assert response.status_code == 200, response.text
+        assert _counters() == (leaders, followers)
+        assert (await client.get("/v1/orders", params={"include_total": "true"})).headers["x-total-count"] == "3"
+
+    run(scenario)
+
+
+def test_disconnected_leader_does_not_cancel_followers():
+    async def scenario(client):
+        import db
+        from core.singleflight import coalesce
+
+        started, release = asyncio.Event(), asyncio.Event()
+        sessions = []
+
+        @coalesce()
+        async def handler(n: int, session=None):
+            sessions.append(session)
+            started.set()
+            await release.wait()
+            return (await session.execute(text("SELECT :n"), {"n": n})).scalar()
+
+        leader_session = db.AsyncSessionLocal()
+        leader = asyncio.create_task(handler(7, session=leader_session))
+        await started.wait()
+        follower = asyncio.create_task(handler(7, session=db.AsyncSessionLocal()))
+        await asyncio.sleep(0)
+
+        # The leader's client goes away and FastAPI closes its session
+        leader.cancel()
+        await leader_session.close()
+        release.set()
+
+        assert (await follower).body == b"7"
+        assert leader.cancelled()
+        assert len(sessions) == 1 and sessions[0] is not leader_session
+
+    run(scenario)
+
+
+def test_errors_reach_every_waiter_and_free_the_key():
+    async def main():
+        from core.singleflight import SingleFlight
+
+        group = SingleFlight()
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(group.do("key", failing) for _ in range(3)), return_exceptions=True)
+        assert [type(r) for r in results] == [ValueError] * 3
+        assert len(calls) == 1 and group.in_flight == 0
+
+        async def succeeding():
+            return "ok"
+
+        assert await group.do("key", succeeding) == "ok"
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -0,0 +1,103 @@
+"""
+Optimistic concurrency (``ETag`` / ``If-Match``) on orders and payments, run
+in-process:
+
+    cd backend
+    pytest tests/test_versioning.py    # or: python tests/test_versioning.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.inprocess import create_device, create_orders, run
+
+
+async def _patch(client, url, if_match=None, **fields):
+    headers = {"If-Match": if_match} if if_match is not None else {}
+    return await client.patch(url, json=fields, headers=headers)
+
+
+def test_matching_version_updates_and_bumps_etag():
+    async def scenario(client):
+        await create_device(client)
+        await create_orders(client, 1)
+        response = await client.get("/v1/orders/1")
+        assert response.headers["etag"] == '"1"'
+
+        response = await _patch(client, "/v1/orders/1", response.headers["etag"], status="Repairing")
+        assert response.status_code == 200, response.text
+        assert response.headers["etag"] == '"2"'
+        assert response.json()["version"] == 2
+
+        # Weak tags and * are accepted too
+        assert (await _patch(client, "/v1/orders/1", 'W/"2"', note="weak")).headers["etag"] == '"3"'
+        assert (await _patch(client, "/v1/orders/1", "*", note="any")).headers["etag"] == '"4"'
+
+    run(scenario)
+
+
+def test_stale_version_is_rejected():
+    async def scenario(client):
+        await create_device(client)
+        await create_orders(client, 1)
+        assert (await _patch(client, "/v1/orders/1", '"1"', status="Repairing")).status_code == 200
+
+        response = await _patch(client, "/v1/orders/1", '"1"', status="Completed")
+        assert response.status_code == 412
+        order = (await client.get("/v1/orders/1")).json()
+        assert order["status"] == "Repairing" and order["version"] == 2
+
+    run(scenario)
+
+
+def test_missing_or_malformed_if_match():
+    async def scenario(client):
+        await create_device(client)
+        await create_orders(client, 1)
+
+        # Without If-Match the update is unconditional
+        response = await _patch(client, "/v1/orders/1", status="Repairing")
+        assert response.status_code == 200
+        assert response.headers["etag"] == '"2"'
+
+        response = await _patch(client, "/v1/orders/1", "not-a-version", status="Completed")
+        assert response.status_code == 400
+        assert (await client.get("/v1/orders/1")).json()["version"] == 2
+
+    run(scenario)
+
+
+def test_missing_row_is_404_not_412():
+    async def scenario(client):
+        await create_device(client)
+        await create_orders(client, 1)
+        for if_match in (None, '"1"', '"7"'):
+            assert (await _patch(client, "/v1/orders/99", if_match, status="Repairing")).status_code == 404
+            assert (await _patch(client, "/v1/payments/99", if_match, amount="10")).status_code == 404
+
+    run(scenario)
+
+
+def test_payment_versions():
+    async def scenario(client):
+        await create_device(client)
+        await create_orders(client, 1)
+        response = await client.post("/v1/payments", json={"order_id": 1, "due_amount": "100", "amount": "10", "status": "Partial"})
+        assert response.status_code == 201, response.text
+        payment_id = response.json()["id"]
+
+        etag = (await client.get(f"/v1/payments/{payment_id}")).headers["etag"]
+        response = await _patch(client, f"/v1/payments/{payment_id}", etag, amount="20")
+        assert response.status_code == 200, response.text
+        assert response.headers["etag"] == '"2"'
+        assert (await _patch(client, f"/v1/payments/{payment_id}", etag, amount="30")).status_code == 412
+
+    run(scenario)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -3,11 +3,23 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from db import get_db
-from models.user import User
+from models.user import User, Role, RoleEnroll
 from utils.security import decode_token
 
 security = HTTPBearer()
 
+ADMIN_ROLE = "Admin"
+
+
+async def user_has_role(db: AsyncSession, user_id: int, role_name: str) -> bool:
+    result = await db.execute(
+        select(RoleEnroll.id)
+        .join(Role, Role.id == RoleEnroll.role_id)
+        .where(RoleEnroll.user_id == user_id, Role.name == role_name)
+        .limit(1)
+    )
+    return result.scalar_one_or_none() is not None
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -34,3 +46,14 @@ async def get_current_user(
     
     return user
 
+
+async def require_admin(
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    if not await user_has_role(db, user.id, ADMIN_ROLE):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return user
@@ -1,9 +1,47 @@
+import logging
+import math
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from core.config import settings
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUNDS = 12  # bcrypt.gensalt() default, used until calibrated
+MAX_ROUNDS = 16
+CURRENT_PREFIX = "$2b$"
+
+_rounds: Optional[int] = None
+
+
+def calibrate_rounds(target_ms: float, min_rounds: int) -> int:
+    """Cost whose hash time is closest to ``target_ms`` on this machine.
+
+    Each extra round doubles the work, so one timed hash at ``min_rounds`` is
+    enough to extrapolate; the best of two probes filters out a cold start.
+    """
+    elapsed_ms = float("inf")
+    for _ in range(2):
+        started = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(min_rounds))
+        elapsed_ms = min(elapsed_ms, (time.perf_counter() - started) * 1000)
+    rounds = min_rounds + round(math.log2(target_ms / max(elapsed_ms, 0.01)))
+    return max(min_rounds, min(MAX_ROUNDS, rounds))
+
+
+def configure_rounds() -> int:
+    """Fix the cost for this process: ``BCRYPT_ROUNDS`` or calibrated (blocks ~2 hashes)"""
+    global _rounds
+    _rounds = settings.BCRYPT_ROUNDS or calibrate_rounds(settings.BCRYPT_TARGET_MS, settings.BCRYPT_MIN_ROUNDS)
+    logger.info("Using bcrypt cost %d", _rounds)
+    return _rounds
+
+
+def bcrypt_rounds() -> int:
+    return _rounds or settings.BCRYPT_ROUNDS or DEFAULT_ROUNDS
+
 
 def hash_password(password: str) -> str:
     """Hash password using bcrypt"""
@@ -12,11 +50,25 @@ def hash_password(password: str) -> str:
     # Ensure password is bytes
     password_bytes = password.encode('utf-8')
     # Generate salt and hash
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(bcrypt_rounds())
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def needs_rehash(hashed: str) -> bool:
+    """True for a (verified) hash with a legacy prefix or a lower cost than ours.
+
+    Only upgrades: workers that calibrate one round apart must not keep
+    rewriting each other's hashes.
+    """
+    if not hashed.startswith(CURRENT_PREFIX):
+        return True
+    try:
+        return int(hashed[4:6]) < bcrypt_rounds()
+    except ValueError:
+        return True
+
+
 def verify_password(plain: str, hashed: str) -> bool:
     """Verify password against hash"""
     if not plain or not hashed:
@@ -59,3 +111,17 @@ def decode_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
+
+def bearer_user_id(headers) -> Optional[int]:
+    """User id from a valid access token in raw ASGI ``headers``, else None"""
+    authorization = dict(headers).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = decode_token(token.strip())
+    if not payload or payload.get("type") != "access":
+        return None
+    try:
+        return int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None